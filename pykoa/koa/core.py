@@ -49,2666 +49,4261 @@ POSSIBILITY OF SUCH DAMAGE.
 """
 
 import os 
+import re
 import sys
 import io
+import csv
 import getpass 
 import logging
 import time
+import threading
 import json
+import functools
+import itertools
+import asyncio
 import lxml
+from lxml import etree
 #import ijson
-import xmltodict 
-import tempfile
-import bs4 as bs
 
 import requests
 import urllib 
 import http.cookiejar
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 #from astropy.coordinates import name_resolve
 from astropy.table import Table, Column
+from astropy.io.votable import parse_single_table
 
 from . import conf
 
-class Archive:
+_log = logging.getLogger ('pykoa.koa')
+
 #
-#{ Archive class
+#    case-insensitive 'error' scan of the send_async return string; the
+#    search runs in C without building a lowercased copy
 #
-    """
-    The 'Archive' class provides functions for accessing data stored in the 
-    Keck Observatory Archive (KOA). Queries are performed via the nexsciTAP
-    server.
-    
-    Keck PIs can use the KOA credentials assigned to them when data were 
-    acquired (given at login) to search for their proprietary data.
-
-    Example:
-    --------
-
-    import os
-    import sys 
-
-    from pykoa.koa import Koa 
-
-    Koa.query_datetime ('hires', \
-        '2018-03-16 00:00:00/2018-03-18 00:00:00', \
-        outpath= './meta.xml', \
-        format='ipac') 
-    """
-    
-    tap = None
-
-    parampath = ''
-    outpath = ''
-    format = 'ipac'
-    maxrec = -1 
-    query = ''
-    propflag = 1
-
-    content_type = ''
-    outdir = ''
-    astropytbl = None
-
-    ndnloaded = 0
-    ndnloaded_lev1 = 0
-    nlev1list = 0
-    ndnloaded_calib = 0
-    ncaliblist = 0
- 
-    status = ''
-    msg = ''
-    
-    debugfname = './koa.debug'    
-    debug = 0    
+_error_pat = re.compile ('error', re.IGNORECASE)
 
-    def __init__(self, **kwargs):
 #
-#{ Archive.init
+#    the INFO element of a TAP error VOTable, see KoaTap.extract_xmlerr
 #
-        """
-        'init' method initializes the class with optional debugfile flag.
-
-        Optional inputs:
-        ----------------
-        debugfile: a file path for the debug output
- 
-	"""
-        
-        if ('debugfile' in kwargs):
-            
-            self.debug = 1
-            self.debugfname = kwargs.get ('debugfile')
-
-            if (len(self.debugfname) > 0):
-      
-                logging.basicConfig (filename=self.debugfname, \
-                    level=logging.DEBUG)
-    
-                with open (self.debugfname, 'w') as fdebug:
-                    pass
- 
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter koa.init:')
+_xmlerr_info = etree.XPath ('/*[local-name()="VOTABLE"]' \
+    '/*[local-name()="RESOURCE"]/*[local-name()="INFO"]')
 
 #
-#    retrieve baseurl from conf class;
-#
-#    during dev or test, baseurl will be a keyword input
+#    the fields of a UWS job status document read on every poll, see 
+#    KoaJob.__parse_statusjob
 #
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'conf.server= {conf.server:s}')
+_UWS_NS = {'uws': 'http://www.ivoa.net/xml/UWS/v1.0', \
+    'xlink': 'http://www.w3.org/1999/xlink'}
 
-        self.baseurl = conf.server
-        if ('server' in kwargs):
-            self.baseurl = kwargs.get ('server')
-        
-        len_baseurl = len (self.baseurl)
-        if (self.baseurl[len_baseurl-1] != '/'):
-            self.baseurl + '/'
+_uws_phase = etree.XPath ('string(uws:phase)', namespaces=_UWS_NS)
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'baseurl= {self.baseurl:s}')
-            logging.debug ('')
-            logging.debug (f'conf.cgipgm= {conf.cgipgm:s}')
+_uws_resulthref = etree.XPath ( \
+    'string(uws:results/uws:result/@xlink:href)', namespaces=_UWS_NS)
 
-        self.cgipgm = conf.cgipgm
-        if ('cgipgm' in kwargs):
-            self.cgipgm = kwargs.get ('cgipgm')
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'cgipgm= {self.cgipgm:s}')
+_uws_errmsg = etree.XPath ('string(uws:errorSummary/uws:message)', \
+    namespaces=_UWS_NS)
+
+_uws_parameters = etree.XPath ('uws:parameters', namespaces=_UWS_NS)
 
 #
-#    urls for nph-tap.py, nph-koaLogin, nph-makeQyery, 
-#    nph-getKoa, and nph-getCaliblist
+#    per-thread lxml parsers of the TAP status and error documents, see
+#    _xml_parser
 #
-        self.tap_url = self.baseurl + self.cgipgm
-        
-        self.login_url = self.baseurl + 'cgi-bin/KoaAPI/nph-koaLogin?'
-        self.makequery_url = self.baseurl + 'cgi-bin/KoaAPI/nph-makeQuery?'
-        self.caliblist_url = self.baseurl+ 'cgi-bin/KoaAPI/nph-getCaliblist?'
-        self.lev1list_url = self.baseurl + 'cgi-bin/KoaAPI/nph-getL1list?'
-        self.getkoa_url = self.baseurl + 'cgi-bin/getKOA/nph-getKOA?return_mode=json&'
+_xml_parsers = threading.local ()
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'login_url= [{self.login_url:s}]')
-            logging.debug (f'tap_url= [{self.tap_url:s}]')
-            logging.debug (f'makequery_url= [{self.makequery_url:s}]')
-            logging.debug (f'self.getkoa_url= {self.getkoa_url:s}')
-            logging.debug (f'self.caliblist_url= {self.caliblist_url:s}')
-      
-        return
 #
-#} end Archive.init
+#    block size of the streamed downloads and of their file buffers
 #
+_DOWNLOAD_CHUNK = 1 << 20
 
-
-    def login (self, cookiepath, **kwargs):
 #
-#{ Archive.login
+#    times a 429/503 reply is sent again once the _RateLimiter's wait is 
+#    over, see _KoaSession.request
 #
-        """
-        'login' method validates a user has a valid KOA account; it takes two
-        'keyword' arguments: userid and password. If the inputs are not 
-        provided in the keyword, the login method prompts for inputs.
+_RATE_RETRIES = 3
 
-        Required input:
-        ---------------     
-        cookiepath (string): a file path provided by the user to save 
-                 returned cookie (in login method) or to serve
-                 as input parameter for the subsequent koa 
-                 query and download methods.
-        
-        Keyword input:
-        ---------------     
-	userid     (string): a valid user id assigned by KOA;
-        
-        password   (string): a valid password in the KOA's user table; 
+#
+#    KOA table format -> astropy Table.read format
+#
+_FMT_MAP = {'tsv': 'ascii.tab', \
+    'csv': 'ascii.csv', \
+    'ipac': 'ascii.ipac', \
+    'votable': 'votable'}
 
-        
-        Calling synopsis: 
-    
-        koa.login (cookiepath, userid='xxxx', password='xxxxxx'), or
+#
+#    lowercased UWS phases after which a TAP job is no longer polled
+#
+_TERMINAL_PHASES = frozenset (('completed', 'error'))
 
-        koa.login (cookiepath): and the program will prompt for 
-                                 userid and password 
-        """
+#
+#    debug files already truncated in this session, see _ensure_debug
+#
+_debug_truncated = set ()
 
-        if (self.debug == 0):
 
-            if ('debugfile' in kwargs):
-            
-                self.debug = 1
-                self.debugfname = kwargs.get ('debugfile')
+@functools.lru_cache (maxsize=8)
+def _service_urls (server, cgipgm):
+    """
+    '_service_urls' derives the KOA service urls from the server and the
+    TAP program alias; it returns the tuple (baseurl, tap_url, login_url, 
+    makequery_url, caliblist_url, lev1list_url, getkoa_url).
+
+    The urls are computed once per (server, cgipgm) pair and shared by 
+    every Archive instance and method call; keying the cache on the 
+    values, rather than fixing them at import time, keeps a conf.server 
+    changed at run time effective.
+    """
 
-                if (len(self.debugfname) > 0):
-      
-                    logging.basicConfig (filename=self.debugfname, \
-                        level=logging.DEBUG)
-    
-                    with open (self.debugfname, 'w') as fdebug:
-                        pass
+    if (not server.endswith ('/')):
+        server = f'{server}/'
 
-            if self.debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
-        
-#
-#    if server keyword represent during dev/test, modify baseurl
-#
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'conf.server= {conf.server:s}')
+    api = f'{server}cgi-bin/KoaAPI/'
 
-        self.baseurl = conf.server
+    return (server, \
+        f'{server}{cgipgm}', \
+        f'{api}nph-koaLogin?', \
+        f'{api}nph-makeQuery?', \
+        f'{api}nph-getCaliblist?', \
+        f'{api}nph-getL1list?', \
+        f'{server}cgi-bin/getKOA/nph-getKOA?return_mode=json&')
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'baseurl (from conf)= {self.baseurl:s}')
-        
-        if ('server' in kwargs):
-            self.baseurl = kwargs.get ('server')
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'baseurl= {self.baseurl:s}')
-        
 
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('')
-            logging.debug ('Enter login:')
-            logging.debug (f'cookiepath= [{cookiepath:s}]')
+@functools.lru_cache (maxsize=8)
+def _load_jar (cookiepath, mtime):
+    """
+    '_load_jar' reads a cookie file saved by the login method into a
+    MozillaCookieJar.  The jar is cached by (cookiepath, mtime): repeated
+    queries in one process skip the disk read and parse, and a new login
+    rewrites the file, changing its mtime and so invalidating the cache.
 
-        if (len(cookiepath) == 0):
-            print ('A cookiepath is required if you wish to login to KOA')
-            return
+    The returned jar is shared; it is only ever passed to requests as 
+    per-request cookies, which requests copies rather than modifies.
+    """
 
-        userid= ''
-        password = ''
-        if ('userid' in kwargs):
-            userid = kwargs.get ('userid')
+    cookiejar = http.cookiejar.MozillaCookieJar (cookiepath)
+    cookiejar.load (ignore_discard=True, ignore_expires=True)
 
-        if ('password' in kwargs):
-            password = kwargs.get ('password')
+    return (cookiejar)
 
-        url = ''
-        response = ''
-        jsondata = ''
 
-        status = ''
-        msg = ''
+@functools.lru_cache (maxsize=128)
+def _encode_params (pairs):
+    """
+    '_encode_params' url-encodes a tuple of (key, value) pairs; the 
+    result is cached, so a query repeated in a batch (same instrument, 
+    date, ...) is quoted only once.
+    """
 
-#
-#    get userid and password via keyboard input
-#
-        if (len(userid) == 0):
-            userid = input ("Userid: ")
+    return (urllib.parse.urlencode (pairs))
 
-        if (len(password) == 0):
-            password = getpass.getpass ("Password: ")
 
-        password = urllib.parse.quote (password)
+def _query_string (param):
+    """
+    '_query_string' returns the encoded query string of a parameter dict
+    through the _encode_params cache; values that cannot be hashed (e.g.
+    lists) are encoded directly.
+    """
 
+    pairs = tuple (param.items())
 
-        self.login_url = self.baseurl + 'cgi-bin/KoaAPI/nph-koaLogin?'
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'login_url= [{self.login_url:s}]')
+    try:
+        return (_encode_params (pairs))
 
-        param = dict()
-        param['userid'] = userid
-        param['password'] = password
-    
-        data_encoded = urllib.parse.urlencode (param)
-    
-        url = self.login_url + data_encoded
+    except TypeError:
+        return (urllib.parse.urlencode (pairs))
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'url= [{url:s}]')
 
+def _list_files (*dirs):
+    """
+    '_list_files' snapshots the given download directories with one 
+    os.scandir each and returns the set of their 'dir/name' paths, built
+    the way the download methods build their file paths; the existence
+    checks of a download are then set lookups instead of stat calls.
+    """
 
-#
-#     cookiejar declared and linked to cookiepath
-#
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('declare request session with cookie')
+    existing = set ()
+    
+    for d in set (dirs):
         
-        session = requests.Session()
-        session.cookies = http.cookiejar.MozillaCookieJar (cookiepath)
-        cookiejar = session.cookies
-
-        response = None
         try:
-            response = session.get (url, cookies=cookiejar)
+            with os.scandir (d) as it:
+                for entry in it:
+                    existing.add (d + '/' + entry.name)
         
-        except Exception as e:
-
-            msg = 'Failed to login: ' + str(e)
-            print (msg)
-            return
+        except OSError:
+            pass
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('response.text: ')
-            logging.debug (response.text)
-            logging.debug ('response.headers: ')
-            logging.debug (response.headers)
-       
-#
-#    check content-type in response header: 
-#    it should be an 'application/json' structure, 
-#    parse for return status and message
-#
-        contenttype = response.headers['Content-type']
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'contenttype= {contenttype:s}')
+    return (existing)
 
-        jsondata = json.loads (response.text);
-   
-        for key,val in jsondata.items():
-                
-            if (key == 'status'):
-                status = val
-                
-            if (key == 'msg'):
-                msg =  val
-		
-        if self.debug:
-            logging.debug ('')
-            logging.debug (f'status= {status:s}')
-            logging.debug (f'msg= {msg:s}')
 
+def _drop_cache (fd):
+    """
+    '_drop_cache' flushes a downloaded data file and advises the kernel 
+    that its pages will not be read again soon, so a download of many GB 
+    does not push everything else out of the page cache; it does nothing 
+    where posix_fadvise is not available.
+    """
 
-        if (status == 'ok'):
-#            cookiejar.save (cookiepath, ignore_discard=True);
-            
-            cookiejar.save ()
-        
-            msg = 'Successfully login as ' + userid
-            self.cookie_loaded = 1
+    if not hasattr (os, 'posix_fadvise'):
+        return
 
-#
-#    print out cookie values in debug file
-#   
-            for cookie in cookiejar:
-                    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug ('cookie saved:')
-                    logging.debug (cookie)
-                    logging.debug (f'cookie.name= {cookie.name:s}')
-                    logging.debug (f'cookie.value= {cookie.value:s}')
-                    logging.debug (f'cookie.domain= {cookie.domain:s}')
- 
-        else:       
-            msg = 'Failed to login: ' + msg
+    try:
+        fd.flush ()
+        os.posix_fadvise (fd.fileno (), 0, 0, os.POSIX_FADV_DONTNEED)
 
-        print (msg)
-        return
-#
-#} end Archive.login
-#
+    except OSError:
+        pass
 
 
-    def query_datetime (self, instrument, datetime, outpath, **kwargs):
-#
-#{ Archive.query_datetime
-#
-        
-        """
-        'query_datetime' method searches KOA by 'datetime' range
-        
-        Required Inputs:
-        ---------------    
-        instrument (string): HIRES
+def _copy_stream (raw, fd):
+    """
+    '_copy_stream' copies a decoded response stream to an open file 
+    through one reused _DOWNLOAD_CHUNK bytearray: each block is read into
+    the buffer and written from a memoryview of it, where copyfileobj
+    would make a new bytes object for every block of a multi-GB file.
+    """
 
-        datetime (string): a datetime string in the format of 
-            datetime1/datetime2 where '/' separates the two datetime values
-            of format 'yyyy-mm-dd hh:mm:ss'
+    buf = bytearray (_DOWNLOAD_CHUNK)
+    view = memoryview (buf)
 
-            the following inputs are acceptable:
+    while True:
+        n = raw.readinto (view)
+        if not n:
+            break
+        fd.write (view[:n])
 
-            datetime1/: will search data with datetime later than (>=) 
-                        datetime1
-            
-            /datetime2: will search data with datetime earlier than (<=)
-                        datetime2
 
-            datetime1: will search data with datetime equal to (=) datetime1
+def _discard (path):
+    """
+    '_discard' removes the '.part' file of a failed download, if any.
+    """
 
-        outpath (string): a full output filepath of the returned metadata 
-            table
+    try:
+        os.unlink (path)
     
-        e.g. 
-            instrument = 'hires',
-            datetime = '2018-03-16 06:10:55/2018-03-18 00:00:00' 
+    except OSError:
+        pass
 
-        e.g. 
-            instrument = 'hires',
-            datetime = '2018-03-16 06:10:55/' 
 
-        e.g. 
-            instrument = 'hires',
-            datetime = '/2018-03-18 00:00:00' 
+def _load_validators (filepath):
+    """
+    '_load_validators' returns the conditional request headers 
+    (If-None-Match, If-Modified-Since) for a downloaded file from the 
+    ETag and Last-Modified kept in its '.meta' sidecar; no headers when 
+    the file or its sidecar is missing or unreadable.
+    """
 
-        e.g. 
-            instrument = 'hires',
-            datetime = '2018-03-16 06:10:55' 
+    headers = {}
+    
+    if not os.path.exists (filepath):
+        return (headers)
 
-        Optional inputs:
-	----------------
-        cookiepath (string): cookie file path for query the proprietary 
-                             KOA data
-        
-	format (string):  Output format: votable, ipac, csv, or tsv 
-	                  (default: ipac)
+    try:
+        with open (filepath + '.meta', 'r') as fp:
+            validators = json.load (fp)
+
+        if ('etag' in validators):
+            headers['If-None-Match'] = validators['etag']
         
-	maxrec (integer):  maximum records to be returned 
-	         default: -1 or not specified will return all requested records
-        """
+        if ('last_modified' in validators):
+            headers['If-Modified-Since'] = validators['last_modified']
 
-        debug = 0
-        debugfname = ''
+    except (OSError, ValueError, TypeError):
+        pass
 
-        if ('debugfile' in kwargs):
-            
-            debugfname = kwargs.get ('debugfile')
+    return (headers)
 
-            if (len(debugfname) > 0):
-      
-                debug = 1
 
-                logging.basicConfig (filename=debugfname, \
-                    level=logging.DEBUG)
+def _save_validators (filepath, headers):
+    """
+    '_save_validators' keeps the ETag and Last-Modified response headers 
+    of a downloaded file in its '.meta' sidecar, for _load_validators.
+    """
+
+    validators = {}
+
+    if ('ETag' in headers):
+        validators['etag'] = headers['ETag']
     
-                with open (debugfname, 'w') as fdebug:
-                    pass
+    if ('Last-Modified' in headers):
+        validators['last_modified'] = headers['Last-Modified']
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('Enter query_datetime:')
-      
-#
-#    modify baseurl if server keyword exists
-#
-        self.baseurl = conf.server
+    if (len(validators) == 0):
+        return
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'baseurl (from conf)= {self.baseurl:s}')
+    partpath = filepath + '.meta.part'
+    
+    try:
+        with open (partpath, 'w') as fp:
+            json.dump (validators, fp)
+    
+        os.replace (partpath, filepath + '.meta')
 
-        instrument = str(instrument)
+    except OSError:
+        _discard (partpath)
+        raise
 
-        if (len(instrument) == 0):
-            print ('Failed to find required parameter: instrument')
-            return
 
-        datetime = str(datetime)
+def _poll_delays (first=0.25, factor=1.5, cap=30.0):
+    """
+    '_poll_delays' yields the waits between the status polls of a job,
+    growing geometrically from first up to cap: a quick job is seen done
+    within a fraction of a second, and a long one is polled rarely.
+    """
 
-        if (len(datetime) == 0):
-            print ('Failed to find required parameter: datetime')
-            return
+    delay = first
+    
+    while True:
+        yield (delay)
+        delay = min (cap, delay*factor)
 
-        if (len(outpath) == 0):
-            print ('Failed to find required parameter: outpath')
-            return
 
-        self.instrument = instrument
-        self.datetime = datetime
-        self.outpath = outpath
+def _fail (obj, e, debug):
+    """
+    '_fail' records an exception caught by a KoaTap or KoaJob method as 
+    the object's error status and message, and returns the message for 
+    the method to return or raise.
+    """
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'instrument= {self.instrument:s}')
-            logging.debug (f'datetime= {self.datetime:s}')
-            logging.debug (f'outpath= {self.outpath:s}')
+    obj.status = 'error'
+    obj.msg = str(e)
 
-#
-#    send url to server to construct the select statement
-#
-        param = dict()
-        param['instrument'] = self.instrument
-        param['datetime'] = self.datetime
-       
-        if debug:
-            logging.debug ('')
-            logging.debug ('call query_criteria')
+    if debug:
+        _log.debug ('\nexception: e= %s', e)
 
-        self.query_criteria (param, outpath, **kwargs)
+    return (obj.msg)
 
-        return
-#
-#} end Archive.query_datetime
-#
- 
 
-    def query_date (self, instrument, date, outpath, **kwargs):
-#
-#{ Archive.query_date
-#
-        
-        """
-        'query_date' method searches KOA by 'date_obs' range
-        
-        Required Inputs:
-        ---------------    
-        instrument (string): HIRES
+def _xml_parser ():
+    """
+    '_xml_parser' returns the XMLParser of the calling thread for the 
+    small TAP status and error documents, created on first use: an lxml
+    parser may not be shared between threads, but is reused by every 
+    parse in its own.  Entities are not resolved and no DTD is fetched.
+    """
 
-        date (string): a date_obs string in the format of 
-            date1/date2 where '/' separates the two date values` 
-            of format 'yyyy-mm-dd'
+    parser = getattr (_xml_parsers, 'parser', None)
+    
+    if (parser is None):
+        parser = etree.XMLParser (remove_blank_text=True, \
+            resolve_entities=False, no_network=True)
+        _xml_parsers.parser = parser
 
-            the following inputs are acceptable:
+    return (parser)
 
-            date1/: will search data with date later than (>=) 
-                        date1
-            
-            /date2: will search data with date earlier than (<=)
-                        date2
 
-            date1: will search data with date equal to (=) date1
+def _retry_after (headers):
+    """
+    '_retry_after' returns the wait in seconds asked for by the 
+    Retry-After header of a job status reply, 0 when there is none (or 
+    it is given as a date).
+    """
 
-        outpath (string): a full output filepath of the returned metadata 
-            table
-    
-        e.g. 
-            instrument = 'hires',
-            date = '2018-03-16/2018-03-18' 
+    try:
+        return (max (0.0, float (headers.get ('Retry-After', ''))))
 
-        e.g. 
-            instrument = 'hires',
-            date = '2018-03-16/' 
+    except ValueError:
+        return (0.0)
 
-        e.g. 
-            instrument = 'hires',
-            date = '/2018-03-18' 
 
-        e.g. 
-            instrument = 'hires',
-            date = '2018-03-16' 
+def _is_httpx (session):
+    """
+    '_is_httpx' tells whether an asyncio session is an httpx.AsyncClient 
+    rather than an aiohttp.ClientSession.
+    """
 
-        Optional inputs:
-	----------------
-        cookiepath (string): cookie file path for querying the proprietary 
-                             KOA data
-        
-	format (string):  Output format: votable, ipac, csv, or tsv 
-	                  (default: ipac)
-        
-	maxrec (integer):  maximum records to be returned 
-	         default: -1 or not specified will return all requested records
-        """
+    return ((httpx is not None) and isinstance (session, httpx.AsyncClient))
 
-        debug = 0
-        debugfname = ''
-        if (debug == 0):
 
-            if ('debugfile' in kwargs):
-            
-                debug = 1
-                debugfname = kwargs.get ('debugfile')
+class _AsyncGet:
+#
+#{ _AsyncGet class
+#
+    """
+    _AsyncGet sends a GET with an aiohttp or httpx asyncio session; as
+    an async context manager it returns the status code, the headers, 
+    and an async iterator over the body of the reply in _DOWNLOAD_CHUNK
+    pieces, and releases the reply when the block ends.
+    """
 
-                if (len(debugfname) > 0):
-      
-                    logging.basicConfig (filename=debugfname, \
-                        level=logging.DEBUG)
-    
-                    with open (debugfname, 'w') as fdebug:
-                        pass
+    def __init__ (self, session, url, headers=None):
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('')
-            logging.debug ('Enter query_date:')
-       
-        instrument = str(instrument)
+        self._session = session
+        self._url = url
+        self._headers = headers
+        self._context = None
 
-        if (len(instrument) == 0):
-            print ('Failed to find required parameter: instrument')
-            return
 
-        date = str(date)
+    async def __aenter__ (self):
 
-        if (len(date) == 0):
-            print ('Failed to find required parameter: date')
-            return
+        if _is_httpx (self._session):
 
-        if (len(outpath) == 0):
-            print ('Failed to find required parameter: outpath')
-            return
+            self._context = self._session.stream ('GET', self._url, \
+                headers=self._headers)
+            response = await self._context.__aenter__ ()
 
-        self.instrument = instrument
-        self.date = date
-        self.outpath = outpath
+            return (response.status_code, response.headers, \
+                response.aiter_bytes (_DOWNLOAD_CHUNK))
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'instrument= {self.instrument:s}')
-            logging.debug (f'date= {self.date:s}')
-            logging.debug (f'outpath= {self.outpath:s}')
+        self._context = self._session.get (self._url, headers=self._headers)
+        response = await self._context.__aenter__ ()
 
-#
-#    send url to server to construct the select statement
-#
-        param = dict()
-        param['instrument'] = self.instrument
-        param['date'] = self.date
-       
-        if debug:
-            logging.debug ('')
-            logging.debug ('call query_criteria')
+        return (response.status, response.headers, \
+            response.content.iter_chunked (_DOWNLOAD_CHUNK))
 
-        self.query_criteria (param, outpath, **kwargs)
 
-        return
+    async def __aexit__ (self, exc_type, exc, tb):
+
+        return (await self._context.__aexit__ (exc_type, exc, tb))
 #
-#} end Archive.query_date
+#} end _AsyncGet class
 #
 
 
-    def query_position (self, instrument, pos, outpath, **kwargs):
-#
-#{ Archive.query_position
-#
-        """
-        'query_position' method searches KOA by 'position' 
+async def _aget (session, url, headers=None):
+    """
+    '_aget' sends a GET with an aiohttp or httpx asyncio session and 
+    returns the status code, the headers, and the body of the reply.
+    """
+
+    async with _AsyncGet (session, url, headers) as (status, reply, chunks):
         
-        Required Inputs:
-        ---------------    
+        body = b''.join ([chunk async for chunk in chunks])
 
-        instrument (string): HIRES
+    return (status, reply, body)
 
-        pos (string): a position string in the format of 
-	
-	1.  circle ra dec radius;
-	
-	2.  polygon ra1 dec1 ra2 dec2 ra3 dec3 ra4 dec4;
-	
-	3.  box ra dec width height;
-	
-	All RA Dec in decimal degree J2000 coordinate.
-             
-        e.g. 
-            instrument = 'hires',
-            pos = 'circle 230.0 45.0 0.5'
 
-        outpath (string): a full filepath for the returned metadata table
-        
-        Optional Input:
-        ---------------    
-        cookiepath (string): cookie file path for querying the proprietary 
-                             KOA data.
-        
-        format (string): votable, ipac, csv, tsv  (default: ipac)
-	
-	maxrec (integer):  maximum records to be returned 
-	         default: -1 or not specified will return all requested records
-        """
-        
-        debug = 0
-        debugfname = ''
-        if (debug == 0):
+async def _astream (session, url, outpath):
+    """
+    '_astream' writes the reply to a GET with an aiohttp or httpx asyncio
+    session to outpath, in _DOWNLOAD_CHUNK pieces; a reply other than 200
+    raises before the file is opened.
+    """
 
-            if ('debugfile' in kwargs):
-            
-                debug = 1
-                debugfname = kwargs.get ('debugfile')
+    async with _AsyncGet (session, url) as (status, reply, chunks):
 
-                if (len(debugfname) > 0):
-      
-                    logging.basicConfig (filename=debugfname, \
-                        level=logging.DEBUG)
-    
-                    with open (debugfname, 'w') as fdebug:
-                        pass
+        if (status != 200):
+            raise Exception ('Failed to retrieve the result: status ' \
+                + str (status))
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('')
-            logging.debug ('Enter query_position:')
-      
-        
-        instrument = str(instrument)
+        with open (outpath, "wb", buffering=_DOWNLOAD_CHUNK) as fp:
+            async for chunk in chunks:
+                fp.write (chunk)
 
-        if (len(instrument) == 0):
-            print ('Failed to find required parameter: instrument')
-            return
- 
-        if (len(pos) == 0):
-            print ('Failed to find required parameter: time')
-            return
 
-        if (len(outpath) == 0):
-            print ('Failed to find required parameter: outpath')
-            return
+@functools.lru_cache (maxsize=1024)
+def _resolve_object (name_norm):
+    """
+    '_resolve_object' resolves a normalized object name (whitespace 
+    collapsed, lower case) with objLookup, so a target queried again in
+    the same process skips the round-trip to the name resolver; the 
+    lookups share the pooled session of the Archive methods.  A failed
+    lookup raises instead of returning, so errors are never cached.
+    """
 
-        self.instrument = instrument
-        self.pos = pos
-        self.outpath = outpath
- 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'instrument=  {self.instrument:s}')
-            logging.debug (f'pos=  {self.pos:s}')
-            logging.debug (f'outpath= {self.outpath:s}')
+    lookup = objLookup (name_norm, session=Archive._get_session ())
+
+    if (lookup.status == 'error'):
+        raise Exception (lookup.msg)
+
+    return (lookup)
 
+
+class _RateLimiter:
 #
-#    send url to server to construct the select statement
+#{ _RateLimiter class
 #
-        param = dict()
-        param['instrument'] = self.instrument
-        param['pos'] = self.pos
+    """
+    _RateLimiter paces the requests sent to the KOA server by the server's
+    own rate-limit headers, for both the shared requests session and the
+    aiohttp (or httpx) session of adownload.
+
+    Every reply updates the limiter: X-RateLimit-Remaining is the number
+    of requests left in the current window, and each request sent takes 
+    one of them.  Once none are left, or after a 429/503 reply, new 
+    requests wait until the window reopens (X-RateLimit-Reset, 
+    Retry-After, or else a backoff doubling from one second).  A server 
+    that sends none of these headers and no 429/503 is never paced.
+    """
 
-        self.query_criteria (param, outpath, **kwargs)
+    def __init__ (self):
 
-        return
+        self._lock = threading.Lock ()
+        self._tokens = None
+        self._resume = 0.0
+        self._reset = 0.0
+        self._backoff = 1.0
+
+
+    def _reserve (self):
 #
-#} end Archive.query_position
+#    seconds to wait before a request may go out; 0 takes a token
 #
-        
+        with self._lock:
+            
+            now = time.monotonic ()
+            
+            if (self._resume > now):
+                return (self._resume - now)
+
+            if (self._tokens is None):
+                return (0.0)
+
+            if (self._tokens > 0):
+                self._tokens = self._tokens - 1
+                return (0.0)
 
-    def query_object (self, instrument, object, outpath, **kwargs):
 #
-#{ Archive.query_object
+#    window used up: wait for X-RateLimit-Reset, or back off if the 
+#    server did not say when it reopens
 #
-        
-        """
-        'query_object' method searches KOA by 'object name' 
-        
-        Required Inputs:
-        ---------------    
+            self._tokens = None
 
-        instrument: HIRES
+            if (self._reset > now):
+                self._resume = self._reset
+            else:
+                self._resume = now + self._backoff
+                self._backoff = min (2.0*self._backoff, 60.0)
 
-        object (string): an object name resolvable by SIMBAD, NED, and
-            ExoPlanet's name_resolve; 
-       
-        This method resolves the object name into coordiates to be used as the
-	center of the circle position search with default radius of 0.5 deg.
+            return (self._resume - now)
 
-        e.g. 
-            instrument = 'hires',
-            object = 'WD 1145+017'
 
-        Optional Input:
-        ---------------    
-        cookiepath (string): cookie file path for query the proprietary 
-                             KOA data.
-        
-	format (string):  Output format: votable, ipac, csv, tsv (default: ipac)
+    def acquire (self):
 
-        radius (float): search radius in deg (default = 0.5 deg)
+        delay = self._reserve ()
+        while (delay > 0.0):
+            time.sleep (delay)
+            delay = self._reserve ()
 
-	maxrec (integer):  maximum records to be returned 
-	         default: -1 or not specified will return all requested records
-        """
-        
-        debug = 0
-        debugfname = ''
-        if (debug == 0):
 
-            if ('debugfile' in kwargs):
+    async def aacquire (self):
+
+        delay = self._reserve ()
+        while (delay > 0.0):
+            await asyncio.sleep (delay)
+            delay = self._reserve ()
+
+
+    def update (self, status, headers):
+
+        remaining = headers.get ('X-RateLimit-Remaining')
+        reset = headers.get ('X-RateLimit-Reset')
+        retry_after = headers.get ('Retry-After')
+
+        with self._lock:
+
+            now = time.monotonic ()
+            wait = None
+
+            try:
+                if (remaining is not None):
+                    self._tokens = int (remaining)
             
-                debug = 1
-                debugfname = kwargs.get ('debugfile')
+                if (reset is not None):
+#
+#    X-RateLimit-Reset is either a delay or an epoch time
+#
+                    delay = float (reset)
+                    if (delay > 1.0e9):
+                        delay = delay - time.time ()
+                    self._reset = now + delay
 
-                if (len(debugfname) > 0):
-      
-                    logging.basicConfig (filename=debugfname, \
-                        level=logging.DEBUG)
-    
-                    with open (debugfname, 'w') as fdebug:
-                        pass
+                if ((status in (429, 503)) and (retry_after is not None)):
+                    wait = float (retry_after)
+            
+                elif ((self._tokens == 0) and (reset is not None)):
+                    wait = self._reset - now
+            
+            except ValueError:
+                pass
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('')
-            logging.debug ('Enter query_object_name:')
+            if ((status in (429, 503)) and (wait is None)):
+                wait = self._backoff
+                self._backoff = min (2.0*self._backoff, 60.0)
 
-        instrument = str(instrument)
+            if (wait is not None and wait > 0.0):
+                self._resume = max (self._resume, now + wait)
 
-        if (len(instrument) == 0):
-            print ('Failed to find required parameter: instrument')
-            return
- 
-        if (len(object) == 0):
-            print ('Failed to find required parameter: object')
-            return
+            if (status < 400):
+                self._backoff = 1.0
 
-        if (len(outpath) == 0):
-            print ('Failed to find required parameter: outpath')
-            return
 
-        self.instrument = instrument
-        self.object = object
-        self.outpath = outpath
+    def response_hook (self, response, *args, **kwargs):
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'instrument= {self.instrument:s}')
-            logging.debug (f'object= {self.object:s}')
-            logging.debug (f'outpath= {self.outpath:s}')
+        self.update (response.status_code, response.headers)
 
-        radius = 0.5 
-        if ('radius' in kwargs):
-            radius_str = kwargs.get('radius')
-            radius = float(radius_str)
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'radius= {radius:f}')
+    async def on_request_start (self, session, context, params):
 
-        """
-        coords = None
-        try:
-            print (f'resolving object name')
- 
-            coords = name_resolve.get_icrs_coordinates (object)
-        
-        except Exception as e:
+        await self.aacquire ()
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'name_resolve error: {str(e):s}')
-            
-            print (str(e))
-            return
 
-        ra = coords.ra.value
-        dec = coords.dec.value
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'ra= {ra:f}')
-            logging.debug (f'dec= {dec:f}')
-        
-        self.pos = 'circle ' + str(ra) + ' ' + str(dec) \
-            + ' ' + str(radius)
-	
-        """
+    async def on_request_end (self, session, context, params):
 
-        lookup = None
-        try:
-            if debug:
-                lookup = objLookup (object, debug=1)
-            else:
-                lookup = objLookup (object)
-        
-            if debug:
-                logging.debug ('')
-                logging.debug ('objLookup run successful and returned')
-        
-        except Exception as e:
+        self.update (params.response.status, params.response.headers)
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'objLookup error: {str(e):s}')
-            
-            print (str(e))
-            return 
 
-        if (lookup.status == 'error'):
-            
-            msg = 'Input object [' + object + '] lookup error: ' + \
-                lookup.msg
-            
-            print (msg)
-            return
+    async def on_request (self, request):
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'source= {lookup.source:s}')
-            logging.debug (f'objname= {lookup.objname:s}')
-            logging.debug (f'objtype= {lookup.objtype:s}')
-            logging.debug (f'objdesc= {lookup.objdesc:s}')
-            logging.debug (f'parsename= {lookup.parsename:s}')
-            logging.debug (f'ra2000= {lookup.ra2000:s}')
-            logging.debug (f'dec2000= {lookup.dec2000:s}')
-            logging.debug (f'cra2000= {lookup.cra2000:s}')
-            logging.debug (f'cdec2000= {lookup.cdec2000:s}')
+        await self.aacquire ()
 
-       
-        ra2000 = lookup.ra2000
-        dec2000 = lookup.dec2000
 
-        self.pos = 'circle ' + ra2000 + ' ' + dec2000 + ' ' + str(radius)
-	
-        if debug:
-            logging.debug ('')
-            logging.debug (f'pos= {self.pos:s}')
-       
-        print (f'object name resolved: ra= {ra2000:s}, dec={dec2000:s}')
- 
- 
+    async def on_response (self, response):
+
+        self.update (response.status_code, response.headers)
 #
-#    send url to server to construct the select statement
+#} end _RateLimiter class
 #
-        param = dict()
-        
-        param['instrument'] = self.instrument
-        param['pos'] = self.pos
 
-        self.query_criteria (param, outpath, **kwargs)
 
-        return
-#
-#} end  Archive.query_object
-#
-        
-    
-    def query_criteria (self, param, outpath, **kwargs):
+class _KoaSession (requests.Session):
 #
-#{ Archive.query_criteria
+#{ _KoaSession class
 #
-        
-        """
-        'query_criteria' method allows searches of KOA by multiple
-        parameters specified in a python dictionary (param).
+    """
+    _KoaSession is the requests.Session shared by the Archive methods;
+    every request waits on the session's _RateLimiter before it is sent,
+    and every reply is fed back to the limiter through a response hook.
+    """
 
-        param: a dictionary containing a list of acceptable parameters:
+    def __init__ (self):
 
-            instrument (required): HIRES
+        super().__init__ ()
 
-            datetime (string): a datetime range string in the format of 
-                datetime1/datetime2, '/' being the separator between first
-                and second datetime valaues where datetime format is 
-                'yyyy-mm-dd hh:mm:ss'
-            
-            date (string): a date range string in the format of 
-                date1/date2, '/' being the separator between first
-                and second date valaues where date format is 'yyyy-mm-dd'
-            
-            pos (string): a position string in the format of 
-	
-	        1.  circle ra dec radius;
-	
-	        2.  polygon ra1 dec1 ra2 dec2 ra3 dec3 ra4 dec4;
-	
-	        3.  box ra dec width height;
-	
-	        all RA Dec in decimal degree J2000 coordinate.
-             
-	    target (string): target name used in the project, this will be 
-                searched against the database -- not SIMBAD or NED.
+        self.limiter = _RateLimiter ()
+        self.hooks['response'].append (self.limiter.response_hook)
 
-        outpath (string): file path for the returned metadata table 
 
-        Optional parameters:
-        --------------------
-        cookiepath (string): cookie file path obtained via login method, only
-                             required for querying the proprietary KOA data.
-        
-	format (string): output table format -- votable, ipac, csv, or tsv;
-            default: ipac
-	    
-	maxrec (integer):  maximum records to be returned 
-	         default: -1 or not specified will return all requested records
-        """
-        
-        debug = 0
-        debugfname = ''
-        if (debug == 0):
+    def request (self, method, url, *args, **kwargs):
 
-            if ('debugfile' in kwargs):
-            
-                debug = 1
-                debugfname = kwargs.get ('debugfile')
+#
+#    the adapter does not retry 429/503: the reply reaches the response 
+#    hook, which sets the limiter's wait, and the request is sent again 
+#    once the limiter lets it go
+#
+        ntry = 0
 
-                if (len(debugfname) > 0):
-      
-                    logging.basicConfig (filename=debugfname, \
-                        level=logging.DEBUG)
-    
-                    with open (debugfname, 'w') as fdebug:
-                        pass
+        while True:
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
+            self.limiter.acquire ()
 
+            response = super().request (method, url, *args, **kwargs)
 
+            if ((response.status_code not in (429, 503)) or \
+                (ntry >= _RATE_RETRIES)):
+                return (response)
+
+            response.close ()
+            ntry = ntry + 1
 #
-#    during dev/test: if server keyword exists, modify baseurl
+#} end _KoaSession class
 #
-#    retrieve baseurl from conf class;
+
+
+class _Http2Session:
+#
+#{ _Http2Session class
 #
-        self.baseurl = conf.server
+    """
+    _Http2Session is the http2=1 counterpart of _KoaSession: an httpx
+    Client with HTTP/2 enabled behind the part of the requests.Session 
+    interface used by Archive, KoaTap, and KoaJob, so that the queries, 
+    the TAP job polling, and the file downloads share one multiplexed 
+    connection.  It is paced by the same _RateLimiter as the requests 
+    session and, like it, never stores the cookies returned by the server.
+    """
 
-        if ('server' in kwargs):
-            self.baseurl = kwargs.get ('server')
+    def __init__ (self, limiter):
 
-        self.cgipgm = conf.cgipgm
-        if ('cgipgm' in kwargs):
-            self.cgipgm = kwargs.get ('cgipgm')
+        self.limiter = limiter
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'baseurl= {self.baseurl:s}')
-            logging.debug (f'cgipgm= {self.cgipgm:s}')
-            logging.debug ('')
-            logging.debug ('Enter query_criteria')
+        transport = httpx.HTTPTransport (http2=True, retries=3, \
+            limits=httpx.Limits (max_connections=32, \
+                max_keepalive_connections=16))
+
+        self.client = httpx.Client (transport=transport, timeout=None)
         
+        self.client.cookies.jar.set_policy (\
+            http.cookiejar.DefaultCookiePolicy (allowed_domains=[]))
+
+
+    def request (self, method, url, params=None, data=None, \
+        headers=None, cookies=None, allow_redirects=True, stream=False, \
+        timeout=None):
+
 #
-#    send url to server to construct the select statement
+#    httpx deprecates per-request cookies: send the jar as a header
 #
-        self.outpath = outpath
- 
-        len_param = len(param)
+        headers = dict (headers or {})
+        if (cookies is not None):
+            cookie = '; '.join (c.name + '=' + c.value for c in cookies)
+            if (len(cookie) > 0):
+                headers['Cookie'] = cookie
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'outpath= {self.outpath:s}')
-            
-            logging.debug ('')
-            logging.debug (f'len_param= {len_param:d}')
+#
+#    requests' (connect, read) timeout 
+#
+        if isinstance (timeout, tuple):
+            timeout = httpx.Timeout (None, connect=timeout[0])
 
-            for k,v in param.items():
-                logging.debug (f'k, v= {k:s}, {str(v):s}')
+        request = self.client.build_request (method, url, params=params, \
+            data=data, headers=headers, timeout=timeout)
 
-        self.cookiepath = ''
-        if ('cookiepath' in kwargs): 
-            self.cookiepath = kwargs.get('cookiepath')
+        ntry = 0
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'cookiepath= {self.cookiepath:s}')
+        while True:
 
-        self.format ='ipac'
-        if ('format' in kwargs): 
-            self.format = kwargs.get('format')
+            self.limiter.acquire ()
 
-        self.maxrec = -1 
-        if ('maxrec' in kwargs): 
-            self.maxrec = kwargs.get('maxrec')
-        
+            response = self.client.send (request, stream=stream, \
+                follow_redirects=allow_redirects)
 
-#        datatype = type (self.maxrec).__name__
-#        print (f'datatype= {datatype:s}')
+            self.limiter.update (response.status_code, response.headers)
 
-        try:
-            self.maxrec = float(self.maxrec)
-            self.maxrec = int(self.maxrec)
-        except Exception as e:
-            print (f'Failed to convert maxrec: ' + str(self.maxrec) + \
-                ' to integer.')
-            return
+            if ((response.status_code not in (429, 503)) or \
+                (ntry >= _RATE_RETRIES)):
+                return (_Http2Response (response))
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'format= {self.format:s}')
-            logging.debug (f'maxrec= {self.maxrec:d}')
+            response.close ()
+            ntry = ntry + 1
+
+
+    def get (self, url, **kwargs):
+
+        return (self.request ('GET', url, **kwargs))
 
-        data = urllib.parse.urlencode (param)
 
+    def post (self, url, **kwargs):
 
+        return (self.request ('POST', url, **kwargs))
 #
-#    urls for nph-tap.py, nph-koaLogin, nph-makeQyery, 
-#    nph-getKoa, and nph-getCaliblist
+#} end _Http2Session class
+#
+
+
+class _Http2Response:
 #
-        self.tap_url = self.baseurl + self.cgipgm
+#{ _Http2Response class
+#
+    """
+    _Http2Response gives an httpx.Response the requests.Response 
+    attributes read by this module; raw is the response itself, read in 
+    decoded chunks by _copy_stream.
+    """
+
+    def __init__ (self, response):
+
+        self._response = response
+        self._chunks = None
+        self._buffer = b''
+
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str (response.url)
         
-        self.makequery_url = self.baseurl + 'cgi-bin/KoaAPI/nph-makeQuery?'
+        self.raw = self
+        self.decode_content = True
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'tap_url= [{self.tap_url:s}]')
-            logging.debug (f'makequery_url= [{self.makequery_url:s}]')
 
+    @property
+    def encoding (self):
 
-        url = self.makequery_url + data            
+        return (self._response.encoding)
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'url= {url:s}')
 
-        query = ''
-        try:
-            query = self.__make_query (url) 
+    @property
+    def content (self):
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('returned __make_query')
-  
-        except Exception as e:
+        return (self._response.read ())
+
+
+    @property
+    def text (self):
+
+        self._response.read ()
+        return (self._response.text)
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'Error: {str(e):s}')
-            
-            print (str(e))
-            return 
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'query= {query:s}')
-       
-        self.query = query
+
+    def json (self):
+
+        return (_json.loads (self.content))
+
+
+    def read (self, size=-1):
 
 #
-#    send tap query
+#    like a raw stream, read (size) may return fewer bytes than asked for;
+#    b'' is the end of the body, and read () returns all of the rest
 #
-        self.tap = None
-        if (len(self.cookiepath) > 0):
-            
-            if debug:
-                logging.debug ('')
-                logging.debug (f'cookiepath= {self.cookiepath:s}')
-       
-            if debug:
-                
-                try:
-                    self.tap = KoaTap (self.tap_url, \
-                        format=self.format, \
-                        maxrec=self.maxrec, \
-                        cookiefile=self.cookiepath, \
-	                debug=1)
-                
-                except Exception as e:
-            
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'Error: {str(e):s}')
-                    
-                    print (str(e))
-                    return 
+        if (self._chunks is None):
+            self._chunks = self._response.iter_bytes (_DOWNLOAD_CHUNK)
 
-            else:
-                try:
-                    self.tap = KoaTap (self.tap_url, \
-                        format=self.format, \
-                        maxrec=self.maxrec, \
-                        cookiefile=self.cookiepath)
-                
-                except Exception as e:
-            
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'Error: {str(e):s}')
-                    
-                    print (str(e))
-                    return 
-        
-        else: 
-            if debug:
-                try:
-                    self.tap = KoaTap (self.tap_url, \
-                        format=self.format, \
-                        maxrec=self.maxrec, \
-	                debug=1)
-                
-                except Exception as e:
-            
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'Error: {str(e):s}')
-                    
-                    print (str(e))
-                    return 
-        
-            else:
-                try:
-                    self.tap = KoaTap (self.tap_url, \
-                        format=self.format, \
-                        maxrec=self.maxrec)
-        
-                except Exception as e:
-            
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'Error: {str(e):s}')
-                    
-                    print (str(e))
-                    return 
-        
-        if debug:
-            logging.debug('')
-            logging.debug('koaTap initialized')
-            logging.debug('')
-            logging.debug(f'query= {query:s}')
+        if (size < 0):
+            data = self._buffer + b''.join (self._chunks)
+            self._buffer = b''
+            return (data)
 
-        print ('submitting request...')
+        if (len (self._buffer) == 0):
+            self._buffer = next (self._chunks, b'')
 
-        if debug:
-            logging.debug('')
-            logging.debug('call self.tap.send_async with debug')
-            
-            retstr = self.tap.send_async (query, \
-                outpath=self.outpath, \
-                format=self.format, \
-                maxrec=self.maxrec, debug=1)
-        else:
-            logging.debug('')
-            logging.debug('call self.tap.send_async NO debug')
-            
-            retstr = self.tap.send_async (query, \
-                outpath=self.outpath, \
-                format=self.format, \
-                maxrec=self.maxrec)
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'return self.tap.send_async:')
-            logging.debug (f'retstr= {retstr:s}')
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
 
-        retstr_lower = retstr.lower()
+        return (data)
 
-        indx = retstr_lower.find ('error')
-    
-#        if debug:
-#            logging.debug ('')
-#            logging.debug (f'indx= {indx:d}')
 
-        if (indx >= 0):
-            print (retstr)
-            return
-            #sys.exit()
+    def readinto (self, b):
 
+        chunk = self.read (len (b))
+        b[:len (chunk)] = chunk
+
+        return (len (chunk))
+
+
+    def close (self):
+
+        self._response.close ()
 #
-#    no error: 
-#
-        print (retstr)
-        return
-#
-#} end Archive.query_criteria
+#} end _Http2Response class
 #
-        
-    
-    def query_adql (self, query, outpath, **kwargs):
+
+
+class _PathClaims:
 #
-#{ Archive.query_adql
+#{ _PathClaims class
 #
-       
-        """
-        'query_adql' method receives a qualified ADQL query string from
-	the user input.
-        
-        Required Inputs:
-        ---------------    
-            query (string):  an ADQL query
+    """
+    _PathClaims makes sure that a file wanted by several rows of a 
+    threaded download is fetched by only one of the threads: claim 
+    returns True the first time a path is claimed, False afterwards.
+    """
 
-            outpath (string): the output filename of the returned metadata table
-        
-        Optional inputs:
-	----------------
-            cookiepath (string): cookie file path for query the proprietary 
-                                 KOA data.
-        
-	    format (string):  output format: votable, ipac, csv, or tsv 
-	             (default: ipac)
-        
-	    maxrec (integer):  maximum records to be returned 
-	         default: -1 or not specified will return all requested records
-        """
-  
-        debug = 0
-        debugfname = ''
-        if (debug == 0):
+    def __init__ (self):
 
-            if ('debugfile' in kwargs):
-            
-                debug = 1
-                debugfname = kwargs.get ('debugfile')
+        self._lock = threading.Lock ()
+        self._claimed = set ()
 
-                if (len(debugfname) > 0):
-      
-                    logging.basicConfig (filename=debugfname, \
-                        level=logging.DEBUG)
-    
-                    with open (debugfname, 'w') as fdebug:
-                        pass
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('debug turned on')
-        
+    def claim (self, path):
+
+        with self._lock:
+
+            if (path in self._claimed):
+                return (False)
+            
+            self._claimed.add (path)
+            
+            return (True)
 #
-#    retrieve baseurl from conf class;
+#} end _PathClaims class
 #
-#    during dev or test, baseurl will be a keyword input
+
+
+class _UwsElement:
 #
-        self.baseurl = conf.server
-        if ('server' in kwargs):
-            self.baseurl = kwargs.get ('server')
+#{ _UwsElement class
+#
+    """
+    _UwsElement is a read-only, xmltodict-style view of an lxml element 
+    of a UWS job status document: ['uws:phase'] is the text of a child
+    element that has neither children nor attributes, a _UwsElement of 
+    the child otherwise, and a list of those when the child element is 
+    repeated (e.g. ['uws:parameter'] of the uws:parameters element); 
+    ['@xlink:href'] is an attribute and ['#text'] the element's own text.
+    Prefixes are resolved through the namespaces declared in the 
+    document.
+    """
 
-        self.cgipgm = conf.cgipgm
-        if ('cgipgm' in kwargs):
-            self.cgipgm = kwargs.get ('cgipgm')
+    _missing = object ()
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'baseurl= {self.baseurl:s}')
-            logging.debug (f'cgipgm= {self.cgipgm:s}')
-            logging.debug ('')
-            logging.debug ('Enter query_adql:')
-        
-        if (len(query) == 0):
-            print ('Failed to find required parameter: query')
-            return
-        
-        if (len(outpath) == 0):
-            print ('Failed to find required parameter: outpath')
-            return
-        
-        self.query = query
-        self.outpath = outpath
- 
-        if debug:
-            logging.debug ('')
-            logging.debug ('')
-            logging.debug (f'query= {self.query:s}')
-            logging.debug (f'outpath= {self.outpath:s}')
-       
-        self.cookiepath = '' 
-        if ('cookiepath' in kwargs): 
-            self.cookiepath = kwargs.get('cookiepath')
+    def __init__ (self, elem):
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'cookiepath= {self.cookiepath:s}')
+        self._elem = elem
 
-        self.format = 'ipac'
-        if ('format' in kwargs): 
-            self.format = kwargs.get('format')
 
-        self.maxrec = -1 
-        if ('maxrec' in kwargs): 
-            self.maxrec = kwargs.get('maxrec')
-        
-        self.propflag = 1 
-        if ('propflag' in kwargs): 
-            self.propflag = kwargs.get('propflag')
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'format= {self.format:s}')
-            logging.debug (f'maxrec= {self.maxrec:d}')
-            logging.debug (f'propflag= {self.propflag:d}')
+    def _qname (self, key):
+
+        prefix, sep, local = key.rpartition (':')
+
+        ns = self._elem.nsmap.get (prefix if sep else None)
+        if (ns is None):
+            return (local)
+
+        return ('{%s}%s' % (ns, local))
+
+
+    def __getitem__ (self, key):
+
+        value = self.get (key, self._missing)
+        if (value is self._missing):
+            raise KeyError (key)
 
+        return (value)
+
+
+    def get (self, key, default=None):
 
 #
-#    urls for nph-tap.py
+#    a missing element or attribute returns the default directly: the
+#    getters look up optional fields such as uws:endTime on every poll
 #
-        self.tap_url = self.baseurl + self.cgipgm
+        if key.startswith ('@'):
+            return (self._elem.get (self._qname (key[1:]), default))
+
+        if (key == '#text'):
+            return (self._elem.text)
+
+        children = self._elem.findall (self._qname (key))
         
-        if debug:
-            logging.debug ('')
-            logging.debug (f'tap_url= [{self.tap_url:s}]')
+        if (len(children) == 0):
+            return (default)
+
+        if (len(children) == 1):
+            return (self._value (children[0]))
+
+        return ([self._value (child) for child in children])
+
 
+    @staticmethod
+    def _value (child):
+
+        if ((len(child) == 0) and (len(child.attrib) == 0)):
+            return (child.text)
+
+        return (_UwsElement (child))
+
+
+    def __repr__ (self):
+
+        return (etree.tostring (self._elem, encoding='unicode'))
 #
-#    send tap query
+#} end _UwsElement class
 #
-        self.tap = None
 
-        if (len(self.cookiepath) > 0):
-           
-            if debug:
-                self.tap = KoaTap (self.tap_url, \
-                    format=self.format, \
-                    maxrec=self.maxrec, \
-                    cookiefile=self.cookiepath, \
-	            debug=1)
-            else:
-                self.tap = KoaTap (self.tap_url, \
-                    format=self.format, \
-                    maxrec=self.maxrec, \
-                    cookiefile=self.cookiepath)
-        else: 
-            if debug:
-                self.tap = KoaTap (self.tap_url, \
-                    format=self.format, \
-                    maxrec=self.maxrec, \
-	            debug=1)
-                
-                #self.tap = KoaTap (self.tap_url, \
-                #    format=self.format, \
-                #    maxrec=self.maxrec, \
-                #    propflag=self.propflag, \
-	        #    debug=1)
-            else:
-                self.tap = KoaTap (self.tap_url, \
-                    format=self.format, \
-                    propflag=self.propflag, \
-                    maxrec=self.maxrec)
-        
-        if debug:
-            logging.debug('')
-            logging.debug('koaTap initialized')
-            logging.debug(f'query= {query:s}')
-            logging.debug('call self.tap.send_async')
 
-        print ('submitting request...')
+class Archive:
+#
+#{ Archive class
+#
+    """
+    The 'Archive' class provides functions for accessing data stored in the 
+    Keck Observatory Archive (KOA). Queries are performed via the nexsciTAP
+    server.
+    
+    Keck PIs can use the KOA credentials assigned to them when data were 
+    acquired (given at login) to search for their proprietary data.
 
-        if debug:
-            if (len(self.outpath) > 0):
-                retstr = self.tap.send_async (query, \
-                    outpath=self.outpath, \
-                    format=self.format, \
-                    maxrec=self.maxrec, \
-                    debug=1)
-                
-                #retstr = self.tap.send_async (query, \
-                #    outpath=self.outpath, \
-                #    format=self.format, \
-                #    maxrec=self.maxrec, \
-                #    propflag=self.propflag, \
-                #    debug=1)
-            else:
-                retstr = self.tap.send_async (query, \
-                    format=self.format, \
-                    maxrec=self.maxrec, \
-                    debug=1)
-        else:
-            if (len(self.outpath) > 0):
-                retstr = self.tap.send_async (query, \
-                    outpath=self.outpath, \
-                    format=self.format, \
-                    maxrec=self.maxrec)
-            else:
-                retstr = self.tap.send_async (query, \
-                    format=self.format, \
-                    maxrec=self.maxrec)
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'return self.tap.send_async:')
-            logging.debug (f'retstr= {retstr:s}')
+    Example:
+    --------
+
+    import os
+    import sys 
 
-        retstr_lower = retstr.lower()
+    from pykoa.koa import Koa 
 
-        indx = retstr_lower.find ('error')
+    Koa.query_datetime ('hires', \
+        '2018-03-16 00:00:00/2018-03-18 00:00:00', \
+        outpath= './meta.xml', \
+        format='ipac') 
+    """
     
-        if (indx >= 0):
-            print (retstr)
-            return
-            #sys.exit()
+#
+#    fixed attribute set: no per-instance __dict__; the defaults are set
+#    in __init__
+#
+    __slots__ = ('tap', 'baseurl', 'cgipgm', 'tap_url', 'login_url', \
+        'makequery_url', 'caliblist_url', 'lev1list_url', 'getkoa_url', \
+        'instrument', 'datetime', 'date', 'pos', 'object', 'outpath', \
+        'format', 'maxrec', 'query', 'propflag', 'cookiepath', \
+        'cookie_loaded', 'msg', 'debug', 'debugfname', 'http2', \
+        '_tap_cache')
 
 #
-#    no error: 
+#    requests.Session shared by all Archive instances, see _get_session
 #
-        print (retstr)
-        return
+    _session = None
+
 #
-#} end Archive.query_adql
+#    per-instrument query parameter templates, see _param_for
 #
+    _PARAM_TEMPLATE = {}
 
+#
+#    httpx session shared by the Archive instances created with http2=1, 
+#    see _get_http
+#
+    _http2_session = None
 
-    def query_moving_object (self, **kwargs):
+    def __init__(self, **kwargs):
 #
-#{ Archive.query_moving_object
+#{ Archive.init
 #
         """
-        'query_moving_object' method searches KOA for moving object. 
-        Due to the high number of input parameters, all inputs are made 
-        to be keyword parameters.
-        
-        Required Inputs:
-        ---------------    
-        instrument (string): one of KOA instruments e.g. nirc2, nirspec, etc..;
-        
-        object (string): moving object to search e.g. pluto, jupiter, etc.. 
+        'init' method initializes the class with optional debugfile flag.
 
-        startdate (string): a date string in the format of 'yyyy-mm-dd'
+        Optional inputs:
+        ----------------
+        debugfile: a file path for the debug output
 
-        outdir (string): a output directory for the returned output files: 
-        
-        outfile (string): output result list file name (a json file),
+        http2: 1 to send the queries, the TAP job polling, and the file 
+               downloads with httpx over a multiplexed HTTP/2 connection, 
+               and to let adownload fetch the files the same way 
+               (pip install 'httpx[http2]'); default is 0 (requests and 
+               aiohttp).
+ 
+	"""
         
-        Output files contains the following:
+        self.tap = None
+        self._tap_cache = {}
+        self.outpath = ''
+        self.format = 'ipac'
+        self.maxrec = -1
+        self.query = ''
+        self.propflag = 1
+        self.cookiepath = ''
+        self.cookie_loaded = 0
+        self.msg = ''
+        self.debugfname = './koa.debug'
 
-            --  a json formated result lists that contains the information of 
-                the moving objects found including:
-            
-                input parameters,
-                numbers of moving objects found,
-                metadata,
-                URL link to the file that is the same metadata in IPAC format,
-                URL link to the PNG files showing the intersections of the KOA 
-                observation with the moving objects' trajectory.
-            
-            -- the metadata files associated the moving objects.
+        self.http2 = 0
+        if ('http2' in kwargs):
+            self.http2 = int(kwargs.get('http2'))
 
+        if (self.http2 and (httpx is None)):
+            print ('http2 requires the httpx package: ' + \
+                "pip install 'httpx[http2]'; using requests")
+            self.http2 = 0
 
-        Optional inputs:
-	----------------
-        enddate (string): a date string in the format of 'yyyy-mm'dd';
-            if missing the default is the current date,
-            
-        naifid (integer): JPL's NAIF object ID number to more precisely 
-            identify the moving object; this is needed when the object name
-            such as 'pluto' which results in multiple targets.
-        
-        cookiepath (string): a cookie file path obtained via login method, only
-                             required for querying the proprietary KOA data.
-        
-        datatype (string): "image", "spec", or "both" -- to search for either
-            the image data, the spectra data, or both; default is "both",
-        
-        graphoption (integer): 0 or 1 -- indicates whether to create graphic 
-            png files of moving object tracjectories; default is 1,
-
-        orbitalinput (int): 0 or 1 indicates whether the precise orbital 
-            input parameters are provided; default is 0,
-       
-        The orbital input contains the following parameters:
-    
-            epoch (mjd),  
-	    ec (eccentricity),
-	    om (deg): longitude of ascending node, 
-	    w (deg) : argument of perihelion,
-	    inc (deg): inclination,
-	  
-            qr (au) (perihelion distance -- for Comet),
-	    tp (JD) (perihelion Julian date -- for Comet),
-        
-            or 
-        
-            a (au):   semi-major axis -- for Asteroid,
-	    m0 (deg):  mean anomaly -- for Asteroid
+        self.debug = self._ensure_debug (kwargs)
+ 
+        if self.debug:
+            _log.debug ('\nEnter koa.init:')
 
+#
+#    urls for nph-tap.py, nph-koaLogin, nph-makeQyery, 
+#    nph-getKoa, and nph-getCaliblist: from conf class, or from the 
+#    server keyword during dev or test
+#
+        self._set_urls (kwargs)
 
-        where the notations are consistent with the inputs to the JPL's url
-        for obtaining bsp file which constains the object's SPK ID:
+        if self.debug:
+            _log.debug ('\nconf.server= %s' \
+                '\nbaseurl= %s' \
+                '\ncgipgm= %s', \
+                conf.server, self.baseurl, self.cgipgm)
+            _log.debug ('\nlogin_url= [%s]' \
+                '\ntap_url= [%s]' \
+                '\nmakequery_url= [%s]' \
+                '\nself.getkoa_url= %s' \
+                '\nself.caliblist_url= %s', \
+                self.login_url, self.tap_url, self.makequery_url, \
+                self.getkoa_url, self.caliblist_url)
+      
+        return
+#
+#} end Archive.init
+#
 
-	    -EPOCH: epoch, 
-	    -EC:    eccentricity,
-	    -OM:    longitude of ascending node,
-            -W:     argument of perihelion,	
-	    -INC:    inclination,
-	    -QR:    perihelion distance,
-	    -TP:    perihelion Julian date,
 
-        
-        Calling synopsis:
-	----------------
-        e.g. 
-            Koa.query_moving_object ( \
-                instrument = 'nirspec', \
-                object = 'pluto', \
-                startdate = '1995-01-01', \
-                enddate = '2020-07-08', \
-                outdir = './nirspec_pluto', \
-                outfile = 'nirspec_pluto.json', \
-                naifid = '999', \
-                datatype = 'both', \
-                graphoption = 1)
+    @classmethod
+    def _get_session (cls):
+#
+#{ Archive._get_session
+#
+        """
+        '_get_session' returns the requests.Session shared by all the Archive
+        methods.  The session is created on first use and mounted with a
+        pooled HTTPAdapter so that consecutive requests to the KOA server
+        reuse the same keep-alive connection instead of paying a new TCP
+        and TLS handshake each time; transient 502/504 replies are retried
+        by the adapter with a short backoff.  429/503 replies are left to 
+        the session's _RateLimiter, which paces all requests by the 
+        server's rate-limit headers and sends a rate-limited request 
+        again after the server's Retry-After (see _KoaSession).
+
+        Cookies are always passed explicitly with each request; the cookie
+        policy of the shared session refuses to store the returned cookies
+        so that a proprietary login cookie is never sent with a request
+        that was not given a cookiepath.
         """
-        debug = 0
-        debugfname = ''
-        if ('debugfile' in kwargs):
-            
-            debug = 1
-            debugfname = kwargs.get ('debugfile')
 
-            if (len(debugfname) > 0):
-      
-                logging.basicConfig (filename=debugfname, \
-                    level=logging.DEBUG)
-    
-                with open (debugfname, 'w') as fdebug:
-                    pass
+        if (cls._session is None):
+
+            session = _KoaSession()
 
 #
-#    retrieve baseurl from conf class;
-#
-#    during dev or test, baseurl will be a keyword input
+#    urllib3 retries a reply with a Retry-After by itself unless told not
+#    to: leave those to the limiter as well
 #
-        self.baseurl = conf.server
+            retry = Retry (total=3, backoff_factor=0.3, \
+                status_forcelist=(502, 504), \
+                respect_retry_after_header=False)
 
-        if ('server' in kwargs):
-            self.baseurl = kwargs.get ('server')
+            adapter = HTTPAdapter (pool_connections=4, pool_maxsize=32, \
+                max_retries=retry)
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('Enter query_moving_object:')
-            logging.debug (f'baseurl= {self.baseurl:s}')
-       
-        instrument = ''
-        if ('instrument' in kwargs): 
-            instrument = str(kwargs.get('instrument'))
+            session.mount ('https://', adapter)
+            session.mount ('http://', adapter)
 
-        if (len(instrument) == 0):
-            print ('Failed to find required parameter: instrument')
-            return
+            session.cookies.set_policy (\
+                http.cookiejar.DefaultCookiePolicy (allowed_domains=[]))
 
-        object = ''
-        if ('object' in kwargs): 
-            object = str(kwargs.get('object'))
+            cls._session = session
 
-        if (len(object) == 0):
-            print ('Failed to find required parameter: object')
-            return
+        return (cls._session)
+#
+#} end Archive._get_session
+#
 
-        outdir = ''
-        if ('outdir' in kwargs): 
-            outdir = str(kwargs.get('outdir'))
-        
-        if (len(outdir) == 0):
-            print ('Failed to find required parameter: outdir')
-            return
-        
-        outfile = ''
-        if ('outfile' in kwargs): 
-            outfile = str(kwargs.get('outfile'))
-        
-        if (len(outfile) == 0):
-            print ('Failed to find required parameter: outfile')
-            return
-        
-        startdate = ''
-        if ('startdate' in kwargs): 
-            startdate = str(kwargs.get('startdate'))
 
-        if (len(startdate) == 0):
-            print ('Failed to find required parameter: startdate')
-            return
+    def _get_http (self):
+#
+#{ Archive._get_http
+#
+        """
+        '_get_http' returns the session the query and download methods 
+        send their requests with: the shared _Http2Session when the 
+        instance was created with http2=1, the shared requests session 
+        otherwise.  Login always uses the requests session, whose cookies
+        it saves to the cookie file.
+        """
 
-        enddate = ''
-        if ('enddate' in kwargs): 
-            enddate = str(kwargs.get('enddate'))
+        if not self.http2:
+            return (self._get_session ())
 
-        if (len(enddate) == 0):
-            today = date.today()
-            enddate = today.strftime ("%Y-%m-%d")
+        cls = type (self)
         
-            if debug:
-                logging.debug ('')
-                logging.debug (f'today= {enddate:s}')
-
-        if debug:
-            logging.debug ('')
-            logging.debug (f'instrument= {instrument:s}')
-            logging.debug (f'object= {object:s}')
-            logging.debug (f'outdir= {outdir:s}')
-            logging.debug (f'outfile= {outfile:s}')
-            logging.debug (f'startdate= {startdate:s}')
-            logging.debug (f'enddate= {enddate:s}')
-
-        cookiepath = ''
-        if ('cookiepath' in kwargs): 
-            cookiepath = kwargs.get('cookiepath')
-
-        naifid = '' 
-        if ('naifid' in kwargs): 
-            naifid = str (kwargs.get('naifid'))
+        if (cls._http2_session is None):
+            cls._http2_session = \
+                _Http2Session (cls._get_session ().limiter)
 
-        datatype = 'both'
-        if ('datatype' in kwargs): 
-            datatype = str (kwargs.get('datatype'))
+        return (cls._http2_session)
+#
+#} end Archive._get_http
+#
 
-        graphoption = 1 
-        if ('graphoption' in kwargs): 
-            graphoption = int (kwargs.get('graphoption'))
 
-        orbitalinput = 0 
-        if ('orbitalinput' in kwargs): 
-            orbitalinput = int (kwargs.get('orbitalinput'))
+    def _get_tap (self, tap_kwargs):
+#
+#{ Archive._get_tap
+#
+        """
+        '_get_tap' returns the KoaTap for tap_url and tap_kwargs; the one 
+        built by an earlier query with the same arguments is reused.  The
+        cookie file mtime is part of the key, so a new login builds a new 
+        KoaTap with the new cookie.
+        """
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'cookiepath= {cookiepath:s}')
-            logging.debug (f'naifid= {naifid:s}')
-            logging.debug (f'datatype= {datatype:s}')
-            logging.debug (f'graphoption= {graphoption:d}')
-            logging.debug (f'orbitalinput= {orbitalinput:d}')
+        key = (self.tap_url,) + tuple (sorted (tap_kwargs.items()))
+        
+        if ('cookiefile' in tap_kwargs):
+            try:
+                key += (os.path.getmtime (tap_kwargs['cookiefile']),)
+            except OSError:
+                pass
 
-        epoch = ''
-        ecstr = ''
-        omstr = ''
-        wstr = ''
-        instr = ''
-        qrstr = ''
-        tpstr = ''
-        astr = ''
-        m0str = ''
+        tap = self._tap_cache.get (key)
+        
+        if (tap is None):
+            tap = KoaTap (self.tap_url, **tap_kwargs)
+            self._tap_cache[key] = tap
 
-        if (orbitalinput == 1):
+        return (tap)
+#
+#} end Archive._get_tap
+#
 
-            if ('epoch' in kwargs): 
-                epoch = kwargs.get('epoch')
 
-            if ('ec' in kwargs): 
-                ecstr = kwargs.get('ec')
+    def _param_for (self, **kv):
+#
+#{ Archive._param_for
+#
+        """
+        '_param_for' returns the query_criteria parameters for the current
+        instrument plus the given keys, copied from a cached 
+        per-instrument template.
+        """
 
-            if ('om' in kwargs): 
-                omstr = kwargs.get('om')
+        param = self._PARAM_TEMPLATE.setdefault (self.instrument, \
+            {'instrument': self.instrument}).copy()
+        
+        param.update (kv)
+        
+        return (param)
+#
+#} end Archive._param_for
+#
 
-            if ('w' in kwargs): 
-                wstr = kwargs.get('w')
 
-            if ('inc' in kwargs): 
-                instr = kwargs.get('inc')
+    def _set_urls (self, kwargs):
+#
+#{ Archive._set_urls
+#
+        """
+        '_set_urls' points the instance at the KOA server: conf.server and
+        conf.cgipgm, or the 'server' and 'cgipgm' keywords when given 
+        (during dev or test).  The urls themselves come from the cached 
+        _service_urls.
+        """
 
-            if ('qr' in kwargs): 
-                qrstr = kwargs.get('qr')
+        server = conf.server
+        if ('server' in kwargs):
+            server = kwargs.get ('server')
 
-            if ('tp' in kwargs): 
-                tpstr = kwargs.get('tp')
+        self.cgipgm = conf.cgipgm
+        if ('cgipgm' in kwargs):
+            self.cgipgm = kwargs.get ('cgipgm')
 
-            if ('a' in kwargs): 
-                astr = kwargs.get('a')
+        (self.baseurl, self.tap_url, self.login_url, self.makequery_url, \
+            self.caliblist_url, self.lev1list_url, self.getkoa_url) = \
+            _service_urls (server, self.cgipgm)
+        
+        return
+#
+#} end Archive._set_urls
+#
 
-            if ('m0' in kwargs): 
-                m0str = kwargs.get('m0')
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'epoch= {epoch:s}')
-                logging.debug (f'ecstr= {ecstr:s}')
-                logging.debug (f'omstr= {omstr:s}')
-                logging.debug (f'wstr= {wstr:s}')
-                logging.debug (f'instr= {instr:s}')
-                logging.debug (f'qrstr= {qrstr:s}')
-                logging.debug (f'tpstr= {tpstr:s}')
-                logging.debug (f'astr= {astr:s}')
-                logging.debug (f'm0str= {m0str:s}')
+    def _ensure_debug (self, kwargs):
+#
+#{ Archive._ensure_debug
+#
+        """
+        '_ensure_debug' turns on debug output when a 'debugfile' keyword
+        is given.  The first time a file is named, a DEBUG-level file 
+        handler opened with mode 'w' is attached to the module logger;
+        later calls naming the same file reuse it, so the per-call prelude
+        no longer reconfigures logging or truncates the file again.  A file
+        is truncated once per session: switching back to an earlier file
+        appends to it.
+
+        Returns 1 if debug output is on, 0 otherwise.
+        """
 
+        if ('debugfile' not in kwargs):
+            return (0)
+        
+        self.debugfname = kwargs.get ('debugfile')
+        
+        if (len(self.debugfname) == 0):
+            return (0)
 
-        moss_url = self.baseurl + 'cgi-bin/MossAPI/nph-mossSearch?'
+        path = os.path.abspath (self.debugfname)
 
-        param = dict()
-        param['instrument'] = instrument
-        param['target'] = object
-        param['starttime'] = startdate
-        param['endtime'] = enddate
+        for handler in _log.handlers:
+            if (isinstance (handler, logging.FileHandler) and \
+                handler.baseFilename == path):
+                return (1)
 
-        if (len(naifid) > 0):
-            param['naifid'] = naifid
+#
+#    a different debugfile replaces the previous one
+#
+        for handler in list (_log.handlers):
+            if isinstance (handler, logging.FileHandler):
+                _log.removeHandler (handler)
+                handler.close()
 
-        if ((instrument.lower() == 'hires') and (datatype.lower() == 'both')):
-            datatype = 'spec'
+        mode = 'w'
+        if (path in _debug_truncated):
+            mode = 'a'
+        _debug_truncated.add (path)
 
-        if (len(datatype) > 0):
-            param['datatype'] = datatype
-        
-        param['graphoption'] = graphoption 
+        handler = logging.FileHandler (path, mode=mode)
+        handler.setFormatter (logging.Formatter (logging.BASIC_FORMAT))
         
-        param['orbitalinput'] = orbitalinput
+        _log.addHandler (handler)
+        _log.setLevel (logging.DEBUG)
         
-        if (orbitalinput == 1):
+        return (1)
+#
+#} end Archive._ensure_debug
+#
 
-            param['epoch'] = epoch
-            param['ec'] = ecstr
-            param['om'] = omstr
-            param['w'] = wstr
-            param['in'] = instr
-            param['qr'] = qrstr
-            param['tp'] = tpstr
-            param['a'] = astr
-            param['m0'] = m0str
 
+    def login (self, cookiepath, **kwargs):
 #
-#    These two parameters are for development debugging during development only;
-#    take them out before release.
+#{ Archive.login
 #
-        workspace = ''
-        if ('workspace' in kwargs): 
-            workspace = kwargs.get('workspace')
+        """
+        'login' method validates a user has a valid KOA account; it takes two
+        'keyword' arguments: userid and password. If the inputs are not 
+        provided in the keyword, they are taken from the KOA_USERID and 
+        KOA_PASSWORD environment variables; failing that, the login method 
+        prompts for inputs when run from a terminal.
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'workspace= {workspace:s}')
+        Required input:
+        ---------------     
+        cookiepath (string): a file path provided by the user to save 
+                 returned cookie (in login method) or to serve
+                 as input parameter for the subsequent koa 
+                 query and download methods.
+        
+        Keyword input:
+        ---------------     
+	userid     (string): a valid user id assigned by KOA;
+        
+        password   (string): a valid password in the KOA's user table; 
 
-        data = urllib.parse.urlencode (param)
+        
+        Calling synopsis: 
+    
+        koa.login (cookiepath, userid='xxxx', password='xxxxxx'), or
 
-        url = moss_url + data 
+        koa.login (cookiepath): and the program will prompt for 
+                                 userid and password 
+        """
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'moss full url sent to server:')
-            logging.debug (f'url= {url:s}')
+        if (self.debug == 0):
 
+            self.debug = self._ensure_debug (kwargs)
+
+            if self.debug:
+                _log.debug ('\ndebug turned on')
+        
 #
-#    load cookie
+#    if server keyword represent during dev/test, modify baseurl
 #
-        cookiejar = None
+        self._set_urls (kwargs)
         
-        if (len(cookiepath) > 0):
-   
-            cookiejar = http.cookiejar.MozillaCookieJar (cookiepath)
-
-            try: 
-                cookiejar.load (ignore_discard=True, ignore_expires=True)
-    
-                if debug:
-                    logging.debug (\
-                        f'cookie loaded from file: {cookiepath:s}')
-        
-                for cookie in cookiejar:
-                    
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('cookie=')
-                        logging.debug (cookie)
-                        logging.debug (f'cookie.name= {cookie.name:s}')
-                        logging.debug (f'cookie.value= {cookie.value:s}')
-                        logging.debug (f'cookie.domain= {cookie.domain:s}')
-
-            except Exception as e:
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'loadCookie exception: {str(e):s}')
-                pass
-
+        if self.debug:
+            _log.debug ('\nbaseurl= %s' \
+                '\n\n\nEnter login:' \
+                '\ncookiepath= [%s]', \
+                self.baseurl, cookiepath)
 
-#
-#    if 'outdir' doesn't exist, create the directory,
-#
-#    decimal mode work for both python2.7 and python3;
-#    0755 also works for python 2.7 but not python3
-#    convert octal 0775 to decimal: 493
-#
-        d1 = int ('0775', 8)
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'd1= {d1:d}')
-                                                 
-        try:
-            os.makedirs (outdir, mode=d1, exist_ok=True)
-        
-        except Exception as e:
-            print (msg)
+        if (len(cookiepath) == 0):
+            print ('A cookiepath is required if you wish to login to KOA')
             return
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('returned os.makedirs')
-
-        outpath = outdir + '/' + outfile
-
-#
-#    send query in async mode and loop until done
-#
-        print ('submitting request...')
-
-        response = None
-        try:
-            if (cookiejar is not None):
-        
-                response = requests.post (moss_url, data=param, \
-	            cookies=cookiejar, allow_redirects=False)
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('request sent with cookiejar')
 
-            else: 
-                response = requests.post (moss_url, data= param, \
-	            allow_redirects=False)
+        userid= ''
+        password = ''
+        if ('userid' in kwargs):
+            userid = kwargs.get ('userid')
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('request sent without cookiejar')
+        if ('password' in kwargs):
+            password = kwargs.get ('password')
 
-        except Exception as e:
-           
-            status = 'error'
-            msg = str(e)
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-           
+        response = ''
+        jsondata = ''
 
-#
-# {  if response is a json structure: parse for status;
-#    or if it is a HTTP error, then it is text: just print the message
-#
-        jsondata = None
         status = ''
         msg = ''
-           
-        content_type = ''
-        try:
-            content_type = response.headers['Content-type']
-        except Exception as e:
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception extract content-type: {str(e):s}')
+#
+#    fall back on the KOA_USERID and KOA_PASSWORD environment variables,
+#    and prompt at the keyboard only when stdin is a terminal so that 
+#    scripts and batch jobs never block on input
+#
+        if (len(userid) == 0):
+            userid = os.environ.get ('KOA_USERID', '')
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'content_type= {content_type:s}')
+        if (len(password) == 0):
+            password = os.environ.get ('KOA_PASSWORD', '')
 
-        
-        if (content_type == 'application/json'):
-                
-            if debug:
-                logging.debug ('')
-                logging.debug ('case json errmsg:')
-      
-            try:
-                jsondata = response.json()
-                status = jsondata['status']
-                    
-            except Exception as e:
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'JSON object parse error: {str(e):s}')
-      
-                status = 'error'
-                msg = 'JSON parse error: ' + str(e)
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'status= {status:s}')
-                    logging.debug (f'msg= {msg:s}')
+        interactive = sys.stdin is not None and sys.stdin.isatty()
 
-                print (response.text)
-                return
+        if (len(userid) == 0 and interactive):
+            userid = input ("Userid: ")
 
+        if (len(password) == 0 and interactive):
+            password = getpass.getpass ("Password: ")
 
-        else:
-            print ('response:')
-            print (response)
-            if (response is not None):
-                print (response.text)
+        if (len(userid) == 0 or len(password) == 0):
+            print ('Failed to login: no userid/password given; pass them ' + \
+                'as keywords or set KOA_USERID and KOA_PASSWORD')
             return
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('here')
-            logging.debug (f'status= {status:s}')
+        
+        if self.debug:
+            _log.debug ('\nlogin_url= [%s]', self.login_url)
 
+        param = dict()
+        param['userid'] = userid
+        param['password'] = password
 
-#
-#} end extract status from json structure
-#
 
-        if (status.lower() == 'error'):
 #
-#    retrieve error message and return
+#     cookiejar declared and linked to cookiepath
 #
-            msg = jsondata['msg']
-            print (msg)
-            return
+        if self.debug:
+            _log.debug ('\ndeclare request session with cookie')
         
-        elif (status.lower() == 'executing'):
-#
-#    retrieve statusurl, and retrieve status in a loop 
-#    until status is 'completed' or 'error'
-#
-            statusurl = jsondata['statusurl']
-            
-            while ((status.lower() != 'completed') and \
-                (status.lower() != 'error')):
-                
-                time.sleep (2)
-                jsondata = self.__get_moss_status (statusurl, debug=1)
-       
-                status = jsondata['status']
+        session = self._get_session()
+        cookiejar = http.cookiejar.MozillaCookieJar (cookiepath)
 
-                if debug:
-                    logging.debug ('')
-                    #logging.debug (f'jsondata= ')
-                    #logging.debug (jsondata)
-                    logging.debug (f'status= {status:s}')
-             
-        if debug:
-            logging.debug ('')
-            logging.debug (f'out of while loop: status= {status:s}')
-       
+        response = None
+        try:
+            response = session.get (self.login_url, params=param, \
+                cookies=cookiejar)
         
-        if (status.lower() == 'error'):
-#
-#    retrieve error message and return
-#
-            msg = jsondata['msg']
+        except Exception as e:
+
+            msg = 'Failed to login: ' + str(e)
             print (msg)
             return
-        
-        elif (status.lower() == 'completed'):
+
+        if self.debug:
+            _log.debug ('\nresponse.text: ' \
+                '\n%s' \
+                '\nresponse.headers: ' \
+                '\n%s', \
+                response.text, response.headers)
+       
 #
-#    retrieve resulturl and retrieve resultfile
+#    check content-type in response header: 
+#    it should be an 'application/json' structure, 
+#    parse for return status and message
 #
-            resulturl = jsondata['resulturl']
+        contenttype = response.headers['Content-type']
         
-            if debug:
-                logging.debug ('')
-                logging.debug (f'XXX> resulturl= {resulturl:s}')
-       
-            try:
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('')
-                    logging.debug ('')
-                    logging.debug (f'XXX (before)> resulturl= {resulturl:s}')
+        if self.debug:
+            _log.debug ('\ncontenttype= %s', contenttype)
 
-                self.__get_moss_resultfile (resulturl, outpath) 
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'XXX (after) > resulturl= {resulturl:s}')
-                    logging.debug ('')
-                    logging.debug ('')
-                    logging.debug ('')
+        jsondata = _json.loads (response.content)
+   
+        status = jsondata.get ('status', '')
+        msg = jsondata.get ('msg', '')
+		
+        if self.debug:
+            _log.debug ('\nstatus= %s\nmsg= %s', status, msg)
 
-                    logging.debug ('returned __get_moss_resultfile')
-             
-            except Exception as e:
-           
-                if debug:
-                    logging.debug ('')
-                    logging.debug (
-                        f'Exception error get_moss_resultfile: {str(e):s}')
-                print (str(e))
-                return
 
-        msg = 'result metafile list written to ' + outpath
-        print (msg)
+        if (status == 'ok'):
+#            cookiejar.save (cookiepath, ignore_discard=True);
+            
+            for cookie in response.cookies:
+                cookiejar.set_cookie (cookie)
+
+            cookiejar.save ()
+        
+            msg = 'Successfully login as ' + userid
+            self.cookie_loaded = 1
 
 #
-#    download metadata files
-#
-        try:
-            if debug:
-                logging.debug ('')
-                logging.debug ('call __download_moving_object_metadata')
-             
-            #self.__download_moving_object_metadata (outpath, outdir, debug=1)
-            self.__download_moving_object_metadata (outpath, outdir)
-                
-            if debug:
-                logging.debug ('')
-                logging.debug ('returned __download_moving_object_metadata')
-             
-        except Exception as e:
-           
-            if debug:
-                logging.debug ('')
-                logging.debug (
-                    f'Exception error get_moss_resultfile: {str(e):s}')
-            print (str(e))
-            return
+#    print out cookie values in debug file
+#   
+            if self.debug:
+                for cookie in cookiejar:
+                    _log.debug ('\ncookie saved:' \
+                        '\n%s' \
+                        '\ncookie.name= %s' \
+                        '\ncookie.value= %s' \
+                        '\ncookie.domain= %s', \
+                        cookie, cookie.name, cookie.value, cookie.domain)
+ 
+        else:       
+            msg = 'Failed to login: ' + msg
 
-        return       
+        print (msg)
+        return
 #
-#} end Archive.query_moving_object
+#} end Archive.login
 #
 
-    
-    def __download_moving_object_metadata (self, jsonpath, outdir, **kwargs):
+
+    def query_datetime (self, instrument, datetime, outpath, **kwargs):
 #
-#{ Archive.download_moving_object_metadata
+#{ Archive.query_datetime
 #
-        """
-        'download_moving_object_metadata' method downloads moving object 
-        search's result metadata tables files and their optional associated 
-        graph files.
         
-        The result metadata tables contain the parameters and URL links of 
-        KOA's data; this table can be used as the input to 'download' method
-        for downloading KOA moving objects.
+        """
+        'query_datetime' method searches KOA by 'datetime' range
         
-        The graph metadata table contains the information of these KOA data 
-        detected in the moving object's trajectory and the links to the graph 
-        PNG files for visualization.
-    
-        The result metadata tables are all in IPAC ascii format.
+        Required Inputs:
+        ---------------    
+        instrument (string): HIRES
 
-        Required input:
-	----------------
-	jsonpath (string): The full path of result json file obtained from 
-            running 'query_moving_object' methods,    
-       
-        outdir (string): directory for the returned files,
-        
-        Optional input:
-	----------------
-        pngflag (0 or 1): 1 indicating that PNG files will be downloaded; 
-                          default is 1.
-        """
+        datetime (string): a datetime string in the format of 
+            datetime1/datetime2 where '/' separates the two datetime values
+            of format 'yyyy-mm-dd hh:mm:ss'
 
-        debug = 0
-        if ('debug' in kwargs):
-            debug = 1
+            the following inputs are acceptable:
+
+            datetime1/: will search data with datetime later than (>=) 
+                        datetime1
             
-        if debug:
-            logging.debug ('')
-            logging.debug ('Enter download_moving_object_metadata')
-            logging.debug (f'jsonpath= {jsonpath:s}')
-            logging.debug (f'outdir= {outdir:s}')
-            logging.debug (f'self.baseurl= {self.baseurl:s}')
+            /datetime2: will search data with datetime earlier than (<=)
+                        datetime2
 
-        baseurl = ''
-        len_baseurl = len(self.baseurl)
-        if (self.baseurl[len_baseurl-1] == '/'):
-            baseurl = self.baseurl[0:len_baseurl-1]
-        else:
-            baseurl = self.baseurl
+            datetime1: will search data with datetime equal to (=) datetime1
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'baseurl= {baseurl:s}') 
+        outpath (string): a full output filepath of the returned metadata 
+            table
+    
+        e.g. 
+            instrument = 'hires',
+            datetime = '2018-03-16 06:10:55/2018-03-18 00:00:00' 
 
+        e.g. 
+            instrument = 'hires',
+            datetime = '2018-03-16 06:10:55/' 
 
-        pngflag = 1 
-        if ('pngflag' in kwargs):
-            pngflag = int(kwargs.get ('pngflag'))
+        e.g. 
+            instrument = 'hires',
+            datetime = '/2018-03-18 00:00:00' 
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'pngflag= {pngflag:d}')
+        e.g. 
+            instrument = 'hires',
+            datetime = '2018-03-16 06:10:55' 
 
-#
-#    parse input json file for parameters
-#
-        fp = None
-        jsondata = None
-        try:
-            if debug:
-                logging.debug ('')
-                logging.debug ('here0-0') 
+        Optional inputs:
+	----------------
+        cookiepath (string): cookie file path for query the proprietary 
+                             KOA data
+        
+	format (string):  Output format: votable, ipac, csv, or tsv 
+	                  (default: ipac)
+        
+	maxrec (integer):  maximum records to be returned 
+	         default: -1 or not specified will return all requested records
+        """
 
-            with open (jsonpath) as fp:
+        debug = self._ensure_debug (kwargs)
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('here0-1') 
+        if debug:
+            _log.debug ('\ndebug turned on\n\nEnter query_datetime:')
+      
+        instrument = str(instrument)
 
-                jsondata = json.load (fp)
-            
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('here0-2') 
-        
-            if debug:
-                logging.debug ('')
-                logging.debug ('here0-3') 
-            
-            fp.close()
+        if (len(instrument) == 0):
+            print ('Failed to find required parameter: instrument')
+            return
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('here0-4') 
-            
-        except Exception as e:
+        datetime = str(datetime)
 
-            if debug:
-                logging.debug ('')
-                logging.debug ('here1-0') 
-            
-            if (fp is not None):
-                fp.close()
-            
-            if debug:
-                logging.debug ('')
-                logging.debug ('here1-1') 
+        if (len(datetime) == 0):
+            print ('Failed to find required parameter: datetime')
+            return
 
-            msg = 'Failed to read input JSON file: ' + jsonpath
-            print (msg)
-            if debug:
-                logging.debug ('')
-                logging.debug ('here1-2') 
+        if (len(outpath) == 0):
+            print ('Failed to find required parameter: outpath')
+            return
 
-            raise Exception (msg) 
-            
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('jsondata: ') 
-            logging.debug (jsondata) 
+        self.instrument = instrument
+        self.datetime = datetime
+        self.outpath = outpath
 
-        urlprefix = jsondata['urlprefix']
         if debug:
-            logging.debug ('')
-            logging.debug (f'urlprefix= {urlprefix:s}') 
+            _log.debug ('\ninstrument= %s' \
+                '\ndatetime= %s' \
+                '\noutpath= %s', \
+                self.instrument, self.datetime, self.outpath)
 
-        results = jsondata['results']
+#
+#    send url to server to construct the select statement
+#
+        param = self._param_for (datetime=self.datetime)
+       
         if debug:
-            logging.debug ('')
-            logging.debug ('results: ') 
-            logging.debug (results) 
-
-        nresulttbl = int(results['nresulttbl'])
-        
-        if (nresulttbl == 0):
-            print ("There is no result table in this MOSS search.")
-            raise Exception (msg) 
-            
+            _log.debug ('\ncall query_criteria')
 
-        ngraphtbl = 0
-        if (nresulttbl > 0):
-            ngraphtbl = int(results['ngraphtbl'])
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'nresulttbl= {nresulttbl:d}') 
-            logging.debug (f'ngraphtbl= {ngraphtbl:d}') 
+        self.query_criteria (param, outpath, **kwargs)
 
+        return
 #
-#    download result metadata tables: get rid of the last '/' from baseurl
+#} end Archive.query_datetime
 #
+ 
 
-        nmeta_total = nresulttbl + ngraphtbl  
-        msg = 'Start downloading ' +  str(nmeta_total) + ' metadata tables '
+    def query_date (self, instrument, date, outpath, **kwargs):
+#
+#{ Archive.query_date
+#
         
-        if (pngflag and ngraphtbl > 0):
-            msg = msg + 'and their associated graph PNG files ' 
-        msg = msg + 'you requested;'
+        """
+        'query_date' method searches KOA by 'date_obs' range
         
-        print (msg)
-        print (f'please check your outdir: {outdir:s} for  progress.')
+        Required Inputs:
+        ---------------    
+        instrument (string): HIRES
 
-        ndnloaded_metatbl = 0
-        ndnloaded_png = 0
+        date (string): a date_obs string in the format of 
+            date1/date2 where '/' separates the two date values` 
+            of format 'yyyy-mm-dd'
 
-        if (nresulttbl > 0):
+            the following inputs are acceptable:
 
-#
-# { download result metadata tables
-#
-            for l in range (nresulttbl):
-           
-                fileurl = jsondata['results']['resulttbls'][l]['fileurl']
+            date1/: will search data with date later than (>=) 
+                        date1
+            
+            /date2: will search data with date earlier than (<=)
+                        date2
+
+            date1: will search data with date equal to (=) date1
+
+        outpath (string): a full output filepath of the returned metadata 
+            table
+    
+        e.g. 
+            instrument = 'hires',
+            date = '2018-03-16/2018-03-18' 
+
+        e.g. 
+            instrument = 'hires',
+            date = '2018-03-16/' 
+
+        e.g. 
+            instrument = 'hires',
+            date = '/2018-03-18' 
+
+        e.g. 
+            instrument = 'hires',
+            date = '2018-03-16' 
+
+        Optional inputs:
+	----------------
+        cookiepath (string): cookie file path for querying the proprietary 
+                             KOA data
         
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'fileurl= {fileurl:s}') 
+	format (string):  Output format: votable, ipac, csv, or tsv 
+	                  (default: ipac)
+        
+	maxrec (integer):  maximum records to be returned 
+	         default: -1 or not specified will return all requested records
+        """
 
-                resultfile = ''
-                ind = fileurl.rfind ('/')
-                if (ind >= 0):
-                    resultfile = fileurl[ind+1:]
-                
-                resultpath = outdir + '/' + resultfile
+        debug = self._ensure_debug (kwargs)
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'resultfile= {resultfile:s}') 
-                    logging.debug (f'resultpath= {resultpath:s}') 
+        if debug:
+            _log.debug ('\ndebug turned on\n\n\nEnter query_date:')
+       
+        instrument = str(instrument)
 
-                url = baseurl + fileurl
-            
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'url= {url:s}') 
+        if (len(instrument) == 0):
+            print ('Failed to find required parameter: instrument')
+            return
 
-                try:
-                    self.__get_moss_resultfile (url, resultpath, debug=1)
-                
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('returned __get_moss_resultfile') 
+        date = str(date)
 
-                    #msg = 'Result metadata table downloaded to file [' + \
-                    #    resultpath + ']'
-                    #print (msg)
-                    
-                    ndnloaded_metatbl = ndnloaded_metatbl + 1 
-                
-                except Exception as e:
+        if (len(date) == 0):
+            print ('Failed to find required parameter: date')
+            return
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'get resultfile exception: {str(e):s}') 
+        if (len(outpath) == 0):
+            print ('Failed to find required parameter: outpath')
+            return
 
-#
-# } end download result metadata tables
-#
+        self.instrument = instrument
+        self.date = date
+        self.outpath = outpath
+
+        if debug:
+            _log.debug ('\ninstrument= %s' \
+                '\ndate= %s' \
+                '\noutpath= %s', \
+                self.instrument, self.date, self.outpath)
 
-        if (ngraphtbl > 0):
 #
-#{  download graph metadata tables: make png subdir
+#    send url to server to construct the select statement
 #
-            pngsubdir = ''
-            if pngflag:
-                pngsubdir = outdir + '/png'
+        param = self._param_for (date=self.date)
+       
+        if debug:
+            _log.debug ('\ncall query_criteria')
 
-                d1 = int ('0775', 8)
+        self.query_criteria (param, outpath, **kwargs)
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'd1= {d1:d}')
-    
+        return
 #
-#    a png file for each moss run have different file name (pid at the end)
-#    so need to have an empty png subdirectory for each run.
+#} end Archive.query_date
 #
-                isExist = os.path.exists (pngsubdir)
-            
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'pngsubdir isExist=  {isExist}')
-           
-                if (isExist):
-                    for f in os.listdir (pngsubdir):
-                        os.remove (os.path.join (pngsubdir, f))
+
+
+    def query_position (self, instrument, pos, outpath, **kwargs):
 #
-#    create pngsubdir if the subdir doesn't exist
+#{ Archive.query_position
 #
-                try:
-                    os.makedirs (pngsubdir, mode=d1, exist_ok=True) 
+        """
+        'query_position' method searches KOA by 'position' 
+        
+        Required Inputs:
+        ---------------    
+
+        instrument (string): HIRES
+
+        pos (string): a position string in the format of 
+	
+	1.  circle ra dec radius;
+	
+	2.  polygon ra1 dec1 ra2 dec2 ra3 dec3 ra4 dec4;
+	
+	3.  box ra dec width height;
+	
+	All RA Dec in decimal degree J2000 coordinate.
+             
+        e.g. 
+            instrument = 'hires',
+            pos = 'circle 230.0 45.0 0.5'
+
+        outpath (string): a full filepath for the returned metadata table
+        
+        Optional Input:
+        ---------------    
+        cookiepath (string): cookie file path for querying the proprietary 
+                             KOA data.
+        
+        format (string): votable, ipac, csv, tsv  (default: ipac)
+	
+	maxrec (integer):  maximum records to be returned 
+	         default: -1 or not specified will return all requested records
+        """
+        
+        debug = self._ensure_debug (kwargs)
+
+        if debug:
+            _log.debug ('\ndebug turned on\n\n\nEnter query_position:')
+      
+        
+        instrument = str(instrument)
+
+        if (len(instrument) == 0):
+            print ('Failed to find required parameter: instrument')
+            return
+ 
+        if (len(pos) == 0):
+            print ('Failed to find required parameter: time')
+            return
+
+        if (len(outpath) == 0):
+            print ('Failed to find required parameter: outpath')
+            return
+
+        self.instrument = instrument
+        self.pos = pos
+        self.outpath = outpath
+ 
+        if debug:
+            _log.debug ('\ninstrument=  %s' \
+                '\npos=  %s' \
+                '\noutpath= %s', \
+                self.instrument, self.pos, self.outpath)
+
+#
+#    send url to server to construct the select statement
+#
+        param = self._param_for (pos=self.pos)
+
+        self.query_criteria (param, outpath, **kwargs)
+
+        return
+#
+#} end Archive.query_position
+#
+        
+
+    def query_object (self, instrument, object, outpath, **kwargs):
+#
+#{ Archive.query_object
+#
+        
+        """
+        'query_object' method searches KOA by 'object name' 
+        
+        Required Inputs:
+        ---------------    
+
+        instrument: HIRES
+
+        object (string): an object name resolvable by SIMBAD, NED, and
+            ExoPlanet's name_resolve; 
+       
+        This method resolves the object name into coordiates to be used as the
+	center of the circle position search with default radius of 0.5 deg.
+
+        e.g. 
+            instrument = 'hires',
+            object = 'WD 1145+017'
+
+        Optional Input:
+        ---------------    
+        cookiepath (string): cookie file path for query the proprietary 
+                             KOA data.
+        
+	format (string):  Output format: votable, ipac, csv, tsv (default: ipac)
+
+        radius (float): search radius in deg (default = 0.5 deg)
+
+	maxrec (integer):  maximum records to be returned 
+	         default: -1 or not specified will return all requested records
+        """
+        
+        debug = self._ensure_debug (kwargs)
+
+        if debug:
+            _log.debug ('\ndebug turned on\n\n\nEnter query_object_name:')
+
+        instrument = str(instrument)
+
+        if (len(instrument) == 0):
+            print ('Failed to find required parameter: instrument')
+            return
+ 
+        if (len(object) == 0):
+            print ('Failed to find required parameter: object')
+            return
+
+        if (len(outpath) == 0):
+            print ('Failed to find required parameter: outpath')
+            return
+
+        self.instrument = instrument
+        self.object = object
+        self.outpath = outpath
+
+        if debug:
+            _log.debug ('\ninstrument= %s' \
+                '\nobject= %s' \
+                '\noutpath= %s', \
+                self.instrument, self.object, self.outpath)
+
+        radius = 0.5 
+        if ('radius' in kwargs):
+            radius_str = kwargs.get('radius')
+            radius = float(radius_str)
+
+        if debug:
+            _log.debug ('\nradius= %f', radius)
+
+        """
+        coords = None
+        try:
+            print (f'resolving object name')
+ 
+            coords = name_resolve.get_icrs_coordinates (object)
+        
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nname_resolve error: %s', e)
+            
+            print (str(e))
+            return
+
+        ra = coords.ra.value
+        dec = coords.dec.value
+        
+        if debug:
+            _log.debug ('\nra= %f\ndec= %f', ra, dec)
+        
+        self.pos = 'circle ' + str(ra) + ' ' + str(dec) \
+            + ' ' + str(radius)
+	
+        """
+
+        lookup = None
+        try:
+            lookup = _resolve_object (' '.join (object.split()).lower())
+        
+            if debug:
+                _log.debug ('\nobjLookup run successful and returned')
+        
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nobjLookup error: %s', e)
+            
+            msg = 'Input object [' + object + '] lookup error: ' + str(e)
+            
+            print (msg)
+            return 
+
+        if debug:
+            _log.debug ('\nsource= %s' \
+                '\nobjname= %s' \
+                '\nobjtype= %s' \
+                '\nobjdesc= %s' \
+                '\nparsename= %s' \
+                '\nra2000= %s' \
+                '\ndec2000= %s' \
+                '\ncra2000= %s' \
+                '\ncdec2000= %s', \
+                lookup.source, lookup.objname, lookup.objtype, \
+                lookup.objdesc, lookup.parsename, lookup.ra2000, \
+                lookup.dec2000, lookup.cra2000, lookup.cdec2000)
+
+       
+        ra2000 = lookup.ra2000
+        dec2000 = lookup.dec2000
+
+        self.pos = f'circle {ra2000} {dec2000} {radius}'
+	
+        if debug:
+            _log.debug ('\npos= %s', self.pos)
+       
+        print (f'object name resolved: ra= {ra2000:s}, dec={dec2000:s}')
+ 
+ 
+#
+#    send url to server to construct the select statement
+#
+        param = self._param_for (pos=self.pos)
+
+        self.query_criteria (param, outpath, **kwargs)
+
+        return
+#
+#} end  Archive.query_object
+#
+        
+    
+    def query_criteria (self, param, outpath, **kwargs):
+#
+#{ Archive.query_criteria
+#
+        
+        """
+        'query_criteria' method allows searches of KOA by multiple
+        parameters specified in a python dictionary (param).
+
+        param: a dictionary containing a list of acceptable parameters:
+
+            instrument (required): HIRES
+
+            datetime (string): a datetime range string in the format of 
+                datetime1/datetime2, '/' being the separator between first
+                and second datetime valaues where datetime format is 
+                'yyyy-mm-dd hh:mm:ss'
+            
+            date (string): a date range string in the format of 
+                date1/date2, '/' being the separator between first
+                and second date valaues where date format is 'yyyy-mm-dd'
+            
+            pos (string): a position string in the format of 
+	
+	        1.  circle ra dec radius;
+	
+	        2.  polygon ra1 dec1 ra2 dec2 ra3 dec3 ra4 dec4;
+	
+	        3.  box ra dec width height;
+	
+	        all RA Dec in decimal degree J2000 coordinate.
+             
+	    target (string): target name used in the project, this will be 
+                searched against the database -- not SIMBAD or NED.
+
+        outpath (string): file path for the returned metadata table 
+
+        Optional parameters:
+        --------------------
+        cookiepath (string): cookie file path obtained via login method, only
+                             required for querying the proprietary KOA data.
+        
+	format (string): output table format -- votable, ipac, csv, or tsv;
+            default: ipac
+	    
+	maxrec (integer):  maximum records to be returned 
+	         default: -1 or not specified will return all requested records
+        """
+        
+        debug = self._ensure_debug (kwargs)
+
+        if debug:
+            _log.debug ('\ndebug turned on')
+
+
+#
+#    during dev/test: if server keyword exists, modify baseurl
+#
+#    retrieve baseurl from conf class;
+#
+        self._set_urls (kwargs)
+
+        if debug:
+            _log.debug ('\nbaseurl= %s' \
+                '\ncgipgm= %s' \
+                '\n\nEnter query_criteria', \
+                self.baseurl, self.cgipgm)
+        
+#
+#    send url to server to construct the select statement
+#
+        self.outpath = outpath
+ 
+        len_param = len(param)
+
+        if debug:
+            _log.debug ('\noutpath= %s', self.outpath)
+            
+            _log.debug ('\nlen_param= %d', len_param)
+
+            for k,v in param.items():
+                _log.debug ('k, v= %s, %s', k, v)
+
+        self.cookiepath = ''
+        if ('cookiepath' in kwargs): 
+            self.cookiepath = kwargs.get('cookiepath')
+
+        if debug:
+            _log.debug ('\ncookiepath= %s', self.cookiepath)
+
+        self.format ='ipac'
+        if ('format' in kwargs): 
+            self.format = kwargs.get('format')
+
+        self.maxrec = -1 
+        if ('maxrec' in kwargs): 
+            self.maxrec = kwargs.get('maxrec')
+        
+
+#        datatype = type (self.maxrec).__name__
+#        print (f'datatype= {datatype:s}')
+
+#
+#    int() takes ints, floats, and integer strings directly; only strings
+#    such as '3e2' or '10.0' go through float
+#
+        try:
+            if (isinstance (self.maxrec, str) and \
+                (('e' in self.maxrec.lower()) or ('.' in self.maxrec))):
+                self.maxrec = int(float(self.maxrec))
+            else:
+                self.maxrec = int(self.maxrec)
+        
+        except (TypeError, ValueError, OverflowError):
+            print (f'Failed to convert maxrec: ' + str(self.maxrec) + \
+                ' to integer.')
+            return
+
+        if debug:
+            _log.debug ('\nformat= %s\nmaxrec= %d', self.format, self.maxrec)
+
+        if debug:
+            _log.debug ('\ntap_url= [%s]' \
+                '\nmakequery_url= [%s]', \
+                self.tap_url, self.makequery_url)
+
+
+        query = ''
+        try:
+            query = self.__make_query (self.makequery_url, param) 
+
+            if debug:
+                _log.debug ('\nreturned __make_query')
+  
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nError: %s', e)
+            
+            print (str(e))
+            return 
+        
+        if debug:
+            _log.debug ('\nquery= %s', query)
+       
+        self.query = query
+
+#
+#    send tap query
+#
+        tap_kwargs = {'session': self._get_http(), \
+            'format': self.format, \
+            'maxrec': self.maxrec}
+
+        if (len(self.cookiepath) > 0):
+            tap_kwargs['cookiefile'] = self.cookiepath
+
+        if debug:
+            tap_kwargs['debug'] = 1
+
+        self.tap = None
+        try:
+            self.tap = self._get_tap (tap_kwargs)
+                
+        except Exception as e:
+            
+            if debug:
+                _log.debug ('\nError: %s', e)
+                    
+            print (str(e))
+            return 
+        
+        if debug:
+            _log.debug ('\nkoaTap initialized\n\nquery= %s', query)
+
+        print ('submitting request...')
+
+        send_kwargs = {'format': self.format, \
+            'maxrec': self.maxrec}
+
+        if (len(self.outpath) > 0):
+            send_kwargs['outpath'] = self.outpath
+
+        if debug:
+            send_kwargs['debug'] = 1
+
+        retstr = self.tap.send_async (query, **send_kwargs)
+        
+        if debug:
+            _log.debug ('\nreturn self.tap.send_async:\nretstr= %s', retstr)
+
+        if (_error_pat.search (retstr) is not None):
+            print (retstr)
+            return
+            #sys.exit()
+
+#
+#    no error: 
+#
+        print (retstr)
+        return
+#
+#} end Archive.query_criteria
+#
+        
+    
+    def query_adql (self, query, outpath, **kwargs):
+#
+#{ Archive.query_adql
+#
+       
+        """
+        'query_adql' method receives a qualified ADQL query string from
+	the user input.
+        
+        Required Inputs:
+        ---------------    
+            query (string):  an ADQL query
+
+            outpath (string): the output filename of the returned metadata table
+        
+        Optional inputs:
+	----------------
+            cookiepath (string): cookie file path for query the proprietary 
+                                 KOA data.
+        
+	    format (string):  output format: votable, ipac, csv, or tsv 
+	             (default: ipac)
+        
+	    maxrec (integer):  maximum records to be returned 
+	         default: -1 or not specified will return all requested records
+        """
+  
+        debug = self._ensure_debug (kwargs)
+
+        if debug:
+            _log.debug ('\ndebug turned on')
+        
+#
+#    retrieve baseurl from conf class;
+#
+#    during dev or test, baseurl will be a keyword input
+#
+        self._set_urls (kwargs)
+
+        if debug:
+            _log.debug ('\nbaseurl= %s' \
+                '\ncgipgm= %s' \
+                '\n\nEnter query_adql:', \
+                self.baseurl, self.cgipgm)
+        
+        if (len(query) == 0):
+            print ('Failed to find required parameter: query')
+            return
+        
+        if (len(outpath) == 0):
+            print ('Failed to find required parameter: outpath')
+            return
+        
+        self.query = query
+        self.outpath = outpath
+ 
+        if debug:
+            _log.debug ('\n\nquery= %s\noutpath= %s', self.query, self.outpath)
+       
+        self.cookiepath = '' 
+        if ('cookiepath' in kwargs): 
+            self.cookiepath = kwargs.get('cookiepath')
+
+        if debug:
+            _log.debug ('\ncookiepath= %s', self.cookiepath)
+
+        self.format = 'ipac'
+        if ('format' in kwargs): 
+            self.format = kwargs.get('format')
+
+        self.maxrec = -1 
+        if ('maxrec' in kwargs): 
+            self.maxrec = kwargs.get('maxrec')
+        
+        self.propflag = 1 
+        if ('propflag' in kwargs): 
+            self.propflag = kwargs.get('propflag')
+        
+        if debug:
+            _log.debug ('\nformat= %s' \
+                '\nmaxrec= %d' \
+                '\npropflag= %d', \
+                self.format, self.maxrec, self.propflag)
+
+
+        if debug:
+            _log.debug ('\ntap_url= [%s]', self.tap_url)
+
+#
+#    send tap query
+#
+        tap_kwargs = {'session': self._get_http(), \
+            'format': self.format, \
+            'maxrec': self.maxrec}
+
+        if (len(self.cookiepath) > 0):
+            tap_kwargs['cookiefile'] = self.cookiepath
+
+        if debug:
+            tap_kwargs['debug'] = 1
+
+        self.tap = None
+        try:
+            self.tap = self._get_tap (tap_kwargs)
+                
+        except Exception as e:
+            
+            if debug:
+                _log.debug ('\nError: %s', e)
+                    
+            print (str(e))
+            return 
+        
+        if debug:
+            _log.debug ('\nkoaTap initialized' \
+                '\nquery= %s' \
+                '\ncall self.tap.send_async', \
+                query)
+
+        print ('submitting request...')
+
+        send_kwargs = {'format': self.format, \
+            'maxrec': self.maxrec}
+
+        if (len(self.outpath) > 0):
+            send_kwargs['outpath'] = self.outpath
+
+        if debug:
+            send_kwargs['debug'] = 1
+
+        retstr = self.tap.send_async (query, **send_kwargs)
+        
+        if debug:
+            _log.debug ('\nreturn self.tap.send_async:\nretstr= %s', retstr)
+
+        if (_error_pat.search (retstr) is not None):
+            print (retstr)
+            return
+            #sys.exit()
+
+#
+#    no error: 
+#
+        print (retstr)
+        return
+#
+#} end Archive.query_adql
+#
+
+
+    def query_moving_object (self, **kwargs):
+#
+#{ Archive.query_moving_object
+#
+        """
+        'query_moving_object' method searches KOA for moving object. 
+        Due to the high number of input parameters, all inputs are made 
+        to be keyword parameters.
+        
+        Required Inputs:
+        ---------------    
+        instrument (string): one of KOA instruments e.g. nirc2, nirspec, etc..;
+        
+        object (string): moving object to search e.g. pluto, jupiter, etc.. 
+
+        startdate (string): a date string in the format of 'yyyy-mm-dd'
+
+        outdir (string): a output directory for the returned output files: 
+        
+        outfile (string): output result list file name (a json file),
+        
+        Output files contains the following:
+
+            --  a json formated result lists that contains the information of 
+                the moving objects found including:
+            
+                input parameters,
+                numbers of moving objects found,
+                metadata,
+                URL link to the file that is the same metadata in IPAC format,
+                URL link to the PNG files showing the intersections of the KOA 
+                observation with the moving objects' trajectory.
+            
+            -- the metadata files associated the moving objects.
+
+
+        Optional inputs:
+	----------------
+        enddate (string): a date string in the format of 'yyyy-mm'dd';
+            if missing the default is the current date,
+            
+        naifid (integer): JPL's NAIF object ID number to more precisely 
+            identify the moving object; this is needed when the object name
+            such as 'pluto' which results in multiple targets.
+        
+        cookiepath (string): a cookie file path obtained via login method, only
+                             required for querying the proprietary KOA data.
+        
+        datatype (string): "image", "spec", or "both" -- to search for either
+            the image data, the spectra data, or both; default is "both",
+        
+        graphoption (integer): 0 or 1 -- indicates whether to create graphic 
+            png files of moving object tracjectories; default is 1,
+
+        orbitalinput (int): 0 or 1 indicates whether the precise orbital 
+            input parameters are provided; default is 0,
+       
+        The orbital input contains the following parameters:
+    
+            epoch (mjd),  
+	    ec (eccentricity),
+	    om (deg): longitude of ascending node, 
+	    w (deg) : argument of perihelion,
+	    inc (deg): inclination,
+	  
+            qr (au) (perihelion distance -- for Comet),
+	    tp (JD) (perihelion Julian date -- for Comet),
+        
+            or 
+        
+            a (au):   semi-major axis -- for Asteroid,
+	    m0 (deg):  mean anomaly -- for Asteroid
+
+
+        where the notations are consistent with the inputs to the JPL's url
+        for obtaining bsp file which constains the object's SPK ID:
+
+	    -EPOCH: epoch, 
+	    -EC:    eccentricity,
+	    -OM:    longitude of ascending node,
+            -W:     argument of perihelion,	
+	    -INC:    inclination,
+	    -QR:    perihelion distance,
+	    -TP:    perihelion Julian date,
+
+        
+        Calling synopsis:
+	----------------
+        e.g. 
+            Koa.query_moving_object ( \
+                instrument = 'nirspec', \
+                object = 'pluto', \
+                startdate = '1995-01-01', \
+                enddate = '2020-07-08', \
+                outdir = './nirspec_pluto', \
+                outfile = 'nirspec_pluto.json', \
+                naifid = '999', \
+                datatype = 'both', \
+                graphoption = 1)
+        """
+        debug = self._ensure_debug (kwargs)
+
+#
+#    retrieve baseurl from conf class;
+#
+#    during dev or test, baseurl will be a keyword input
+#
+        self._set_urls (kwargs)
+
+        if debug:
+            _log.debug ('\nEnter query_moving_object:' \
+                '\nbaseurl= %s', \
+                self.baseurl)
+       
+        instrument = ''
+        if ('instrument' in kwargs): 
+            instrument = str(kwargs.get('instrument'))
+
+        if (len(instrument) == 0):
+            print ('Failed to find required parameter: instrument')
+            return
+
+        object = ''
+        if ('object' in kwargs): 
+            object = str(kwargs.get('object'))
+
+        if (len(object) == 0):
+            print ('Failed to find required parameter: object')
+            return
+
+        outdir = ''
+        if ('outdir' in kwargs): 
+            outdir = str(kwargs.get('outdir'))
+        
+        if (len(outdir) == 0):
+            print ('Failed to find required parameter: outdir')
+            return
+        
+        outfile = ''
+        if ('outfile' in kwargs): 
+            outfile = str(kwargs.get('outfile'))
+        
+        if (len(outfile) == 0):
+            print ('Failed to find required parameter: outfile')
+            return
+        
+        startdate = ''
+        if ('startdate' in kwargs): 
+            startdate = str(kwargs.get('startdate'))
+
+        if (len(startdate) == 0):
+            print ('Failed to find required parameter: startdate')
+            return
+
+        enddate = ''
+        if ('enddate' in kwargs): 
+            enddate = str(kwargs.get('enddate'))
+
+        if (len(enddate) == 0):
+            today = date.today()
+            enddate = today.strftime ("%Y-%m-%d")
+        
+            if debug:
+                _log.debug ('\ntoday= %s', enddate)
+
+        if debug:
+            _log.debug ('\ninstrument= %s' \
+                '\nobject= %s' \
+                '\noutdir= %s' \
+                '\noutfile= %s' \
+                '\nstartdate= %s' \
+                '\nenddate= %s', \
+                instrument, object, outdir, outfile, startdate, enddate)
+
+        cookiepath = ''
+        if ('cookiepath' in kwargs): 
+            cookiepath = kwargs.get('cookiepath')
+
+        naifid = '' 
+        if ('naifid' in kwargs): 
+            naifid = str (kwargs.get('naifid'))
+
+        datatype = 'both'
+        if ('datatype' in kwargs): 
+            datatype = str (kwargs.get('datatype'))
+
+        graphoption = 1 
+        if ('graphoption' in kwargs): 
+            graphoption = int (kwargs.get('graphoption'))
+
+        orbitalinput = 0 
+        if ('orbitalinput' in kwargs): 
+            orbitalinput = int (kwargs.get('orbitalinput'))
+
+        if debug:
+            _log.debug ('\ncookiepath= %s' \
+                '\nnaifid= %s' \
+                '\ndatatype= %s' \
+                '\ngraphoption= %d' \
+                '\norbitalinput= %d', \
+                cookiepath, naifid, datatype, graphoption, orbitalinput)
+
+        epoch = ''
+        ecstr = ''
+        omstr = ''
+        wstr = ''
+        instr = ''
+        qrstr = ''
+        tpstr = ''
+        astr = ''
+        m0str = ''
+
+        if (orbitalinput == 1):
+
+            if ('epoch' in kwargs): 
+                epoch = kwargs.get('epoch')
+
+            if ('ec' in kwargs): 
+                ecstr = kwargs.get('ec')
+
+            if ('om' in kwargs): 
+                omstr = kwargs.get('om')
+
+            if ('w' in kwargs): 
+                wstr = kwargs.get('w')
+
+            if ('inc' in kwargs): 
+                instr = kwargs.get('inc')
+
+            if ('qr' in kwargs): 
+                qrstr = kwargs.get('qr')
+
+            if ('tp' in kwargs): 
+                tpstr = kwargs.get('tp')
+
+            if ('a' in kwargs): 
+                astr = kwargs.get('a')
+
+            if ('m0' in kwargs): 
+                m0str = kwargs.get('m0')
+
+            if debug:
+                _log.debug ('\nepoch= %s' \
+                    '\necstr= %s' \
+                    '\nomstr= %s' \
+                    '\nwstr= %s' \
+                    '\ninstr= %s' \
+                    '\nqrstr= %s' \
+                    '\ntpstr= %s' \
+                    '\nastr= %s' \
+                    '\nm0str= %s', \
+                    epoch, ecstr, omstr, wstr, instr, qrstr, tpstr, astr, \
+                    m0str)
+
+
+        moss_url = f'{self.baseurl}cgi-bin/MossAPI/nph-mossSearch?'
+
+        param = dict()
+        param['instrument'] = instrument
+        param['target'] = object
+        param['starttime'] = startdate
+        param['endtime'] = enddate
+
+        if (len(naifid) > 0):
+            param['naifid'] = naifid
+
+        if ((instrument.lower() == 'hires') and (datatype.lower() == 'both')):
+            datatype = 'spec'
+
+        if (len(datatype) > 0):
+            param['datatype'] = datatype
+        
+        param['graphoption'] = graphoption 
+        
+        param['orbitalinput'] = orbitalinput
+        
+        if (orbitalinput == 1):
+
+            param['epoch'] = epoch
+            param['ec'] = ecstr
+            param['om'] = omstr
+            param['w'] = wstr
+            param['in'] = instr
+            param['qr'] = qrstr
+            param['tp'] = tpstr
+            param['a'] = astr
+            param['m0'] = m0str
+
+#
+#    These two parameters are for development debugging during development only;
+#    take them out before release.
+#
+        workspace = ''
+        if ('workspace' in kwargs): 
+            workspace = kwargs.get('workspace')
+
+        if debug:
+            _log.debug ('\nworkspace= %s', workspace)
+
+        data = _query_string (param)
+
+        url = moss_url + data 
+
+        if debug:
+            _log.debug ('\nmoss full url sent to server:\nurl= %s', url)
+
+#
+#    load cookie
+#
+        cookiejar = None
+        
+        if (len(cookiepath) > 0):
+   
+            try: 
+                cookiejar = _load_jar (cookiepath, \
+                    os.path.getmtime (cookiepath))
+    
+                if debug:
+                    _log.debug ('cookie loaded from file: %s', cookiepath)
+#
+#    the cookie dump walks the jar only when debugging
+#
+                    for cookie in cookiejar:
+                        _log.debug ('\ncookie=' \
+                            '\n%s' \
+                            '\ncookie.name= %s' \
+                            '\ncookie.value= %s' \
+                            '\ncookie.domain= %s', \
+                            cookie, cookie.name, cookie.value, cookie.domain)
+
+            except Exception as e:
+                if debug:
+                    _log.debug ('\nloadCookie exception: %s', e)
+                pass
+
+
+#
+#    if 'outdir' doesn't exist, create the directory,
+#
+#    decimal mode work for both python2.7 and python3;
+#    0755 also works for python 2.7 but not python3
+#    convert octal 0775 to decimal: 493
+#
+        d1 = int ('0775', 8)
+        
+        if debug:
+            _log.debug ('\nd1= %d', d1)
+                                                 
+        try:
+            os.makedirs (outdir, mode=d1, exist_ok=True)
+        
+        except Exception as e:
+            print (msg)
+            return
+        
+        if debug:
+            _log.debug ('\nreturned os.makedirs')
+
+        outpath = outdir + '/' + outfile
+
+#
+#    send query in async mode and loop until done
+#
+        print ('submitting request...')
+
+        response = None
+        try:
+            if (cookiejar is not None):
+        
+                response = self._get_http().post (moss_url, \
+                    data=param, cookies=cookiejar, allow_redirects=False)
+                
+                if debug:
+                    _log.debug ('\nrequest sent with cookiejar')
+
+            else: 
+                response = self._get_http().post (moss_url, \
+                    data=param, allow_redirects=False)
+
+                if debug:
+                    _log.debug ('\nrequest sent without cookiejar')
+
+        except Exception as e:
+           
+            status = 'error'
+            msg = str(e)
+	    
+            if debug:
+                _log.debug ('\nexception: e= %s', e)
+           
+
+#
+# {  if response is a json structure: parse for status;
+#    or if it is a HTTP error, then it is text: just print the message
+#
+        jsondata = None
+        status = ''
+        msg = ''
+           
+        content_type = ''
+        try:
+            content_type = response.headers['Content-type']
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nexception extract content-type: %s', e)
+
+        if debug:
+            _log.debug ('\ncontent_type= %s', content_type)
+
+        
+        if (content_type == 'application/json'):
+                
+            if debug:
+                _log.debug ('\ncase json errmsg:')
+      
+            try:
+                jsondata = _json.loads (response.content)
+                status = jsondata['status']
+                    
+            except Exception as e:
+                
+                if debug:
+                    _log.debug ('\nJSON object parse error: %s', e)
+      
+                status = 'error'
+                msg = 'JSON parse error: ' + str(e)
+                
+                if debug:
+                    _log.debug ('\nstatus= %s\nmsg= %s', status, msg)
+
+                print (response.text)
+                return
+
+
+        else:
+            print ('response:')
+            print (response)
+            if (response is not None):
+                print (response.text)
+            return
+
+        if debug:
+            _log.debug ('\nhere\nstatus= %s', status)
+
+
+#
+#} end extract status from json structure
+#
+
+        if (status.lower() == 'error'):
+#
+#    retrieve error message and return
+#
+            msg = jsondata['msg']
+            print (msg)
+            return
+        
+        elif (status.lower() == 'executing'):
+#
+#    retrieve statusurl, and retrieve status in a loop 
+#    until status is 'completed' or 'error'
+#
+            statusurl = jsondata['statusurl']
+            
+            while ((status.lower() != 'completed') and \
+                (status.lower() != 'error')):
+                
+                time.sleep (2)
+                jsondata = self.__get_moss_status (statusurl, debug=1)
+       
+                status = jsondata['status']
+
+                if debug:
+                    _log.debug ('')
+                    #_log.debug ('jsondata= ')
+                    #_log.debug (jsondata)
+                    _log.debug ('status= %s', status)
+             
+        if debug:
+            _log.debug ('\nout of while loop: status= %s', status)
+       
+        
+        if (status.lower() == 'error'):
+#
+#    retrieve error message and return
+#
+            msg = jsondata['msg']
+            print (msg)
+            return
+        
+        elif (status.lower() == 'completed'):
+#
+#    retrieve resulturl and retrieve resultfile
+#
+            resulturl = jsondata['resulturl']
+        
+            if debug:
+                _log.debug ('\nXXX> resulturl= %s', resulturl)
+       
+            try:
+                if debug:
+                    _log.debug ('\n\n\nXXX (before)> resulturl= %s', resulturl)
+
+                self.__get_moss_resultfile (resulturl, outpath) 
+                
+                if debug:
+                    _log.debug ('\nXXX (after) > resulturl= %s' \
+                        '\n' \
+                        '\n' \
+                        '\n', \
+                        resulturl)
+
+                    _log.debug ('returned __get_moss_resultfile')
+             
+            except Exception as e:
+           
+                if debug:
+                    _log.debug ('\nException error get_moss_resultfile: %s', \
+                        str(e))
+                print (str(e))
+                return
+
+        msg = 'result metafile list written to ' + outpath
+        print (msg)
+
+#
+#    download metadata files
+#
+        try:
+            if debug:
+                _log.debug ('\ncall __download_moving_object_metadata')
+             
+            #self.__download_moving_object_metadata (outpath, outdir, debug=1)
+            self.__download_moving_object_metadata (outpath, outdir)
+                
+            if debug:
+                _log.debug ('\nreturned __download_moving_object_metadata')
+             
+        except Exception as e:
+           
+            if debug:
+                _log.debug ('\nException error get_moss_resultfile: %s', \
+                    str(e))
+            print (str(e))
+            return
+
+        return       
+#
+#} end Archive.query_moving_object
+#
+
+    
+    def __download_moving_object_metadata (self, jsonpath, outdir, **kwargs):
+#
+#{ Archive.download_moving_object_metadata
+#
+        """
+        'download_moving_object_metadata' method downloads moving object 
+        search's result metadata tables files and their optional associated 
+        graph files.
+        
+        The result metadata tables contain the parameters and URL links of 
+        KOA's data; this table can be used as the input to 'download' method
+        for downloading KOA moving objects.
+        
+        The graph metadata table contains the information of these KOA data 
+        detected in the moving object's trajectory and the links to the graph 
+        PNG files for visualization.
+    
+        The result metadata tables are all in IPAC ascii format.
+
+        Required input:
+	----------------
+	jsonpath (string): The full path of result json file obtained from 
+            running 'query_moving_object' methods,    
+       
+        outdir (string): directory for the returned files,
+        
+        Optional input:
+	----------------
+        pngflag (0 or 1): 1 indicating that PNG files will be downloaded; 
+                          default is 1.
+        """
+
+        debug = 0
+        if ('debug' in kwargs):
+            debug = 1
+            
+        if debug:
+            _log.debug ('\nEnter download_moving_object_metadata' \
+                '\njsonpath= %s' \
+                '\noutdir= %s' \
+                '\nself.baseurl= %s', \
+                jsonpath, outdir, self.baseurl)
+
+        baseurl = ''
+        len_baseurl = len(self.baseurl)
+        if (self.baseurl[len_baseurl-1] == '/'):
+            baseurl = self.baseurl[0:len_baseurl-1]
+        else:
+            baseurl = self.baseurl
+
+        if debug:
+            _log.debug ('\nbaseurl= %s', baseurl)
+
+
+        pngflag = 1 
+        if ('pngflag' in kwargs):
+            pngflag = int(kwargs.get ('pngflag'))
+
+        if debug:
+            _log.debug ('\npngflag= %d', pngflag)
+
+#
+#    parse input json file for parameters
+#
+        fp = None
+        jsondata = None
+        try:
+            if debug:
+                _log.debug ('\nhere0-0')
+
+            with open (jsonpath, 'rb') as fp:
+
+                if debug:
+                    _log.debug ('\nhere0-1')
+
+                jsondata = _json.loads (fp.read())
+            
+                if debug:
+                    _log.debug ('\nhere0-2')
+        
+            if debug:
+                _log.debug ('\nhere0-3')
+            
+            fp.close()
+
+            if debug:
+                _log.debug ('\nhere0-4')
+            
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nhere1-0')
+            
+            if (fp is not None):
+                fp.close()
+            
+            if debug:
+                _log.debug ('\nhere1-1')
+
+            msg = 'Failed to read input JSON file: ' + jsonpath
+            print (msg)
+            if debug:
+                _log.debug ('\nhere1-2')
+
+            raise Exception (msg) 
+            
+        
+        if debug:
+            _log.debug ('\njsondata: \n%s', jsondata)
+
+        urlprefix = jsondata['urlprefix']
+        if debug:
+            _log.debug ('\nurlprefix= %s', urlprefix)
+
+        results = jsondata['results']
+        if debug:
+            _log.debug ('\nresults: \n%s', results)
+
+        nresulttbl = int(results['nresulttbl'])
+        
+        if (nresulttbl == 0):
+            print ("There is no result table in this MOSS search.")
+            raise Exception (msg) 
+            
+
+        ngraphtbl = 0
+        if (nresulttbl > 0):
+            ngraphtbl = int(results['ngraphtbl'])
+        
+        if debug:
+            _log.debug ('\nnresulttbl= %d' \
+                '\nngraphtbl= %d', \
+                nresulttbl, ngraphtbl)
+
+#
+#    download result metadata tables: get rid of the last '/' from baseurl
+#
+
+        nmeta_total = nresulttbl + ngraphtbl  
+        msg = 'Start downloading ' +  str(nmeta_total) + ' metadata tables '
+        
+        if (pngflag and ngraphtbl > 0):
+            msg = msg + 'and their associated graph PNG files ' 
+        msg = msg + 'you requested;'
+        
+        print (msg)
+        print (f'please check your outdir: {outdir:s} for  progress.')
+
+        ndnloaded_metatbl = 0
+        ndnloaded_png = 0
+
+        if (nresulttbl > 0):
+
+#
+# { download result metadata tables
+#
+            for l in range (nresulttbl):
+           
+                fileurl = jsondata['results']['resulttbls'][l]['fileurl']
+        
+                if debug:
+                    _log.debug ('\nfileurl= %s', fileurl)
+
+                resultfile = ''
+                ind = fileurl.rfind ('/')
+                if (ind >= 0):
+                    resultfile = fileurl[ind+1:]
+                
+                resultpath = outdir + '/' + resultfile
+
+                if debug:
+                    _log.debug ('\nresultfile= %s' \
+                        '\nresultpath= %s', \
+                        resultfile, resultpath)
+
+                url = baseurl + fileurl
+            
+                if debug:
+                    _log.debug ('\nurl= %s', url)
+
+                try:
+                    self.__get_moss_resultfile (url, resultpath, debug=1)
+                
+                    if debug:
+                        _log.debug ('\nreturned __get_moss_resultfile')
+
+                    #msg = 'Result metadata table downloaded to file [' + \
+                    #    resultpath + ']'
+                    #print (msg)
+                    
+                    ndnloaded_metatbl = ndnloaded_metatbl + 1 
+                
+                except Exception as e:
+
+                    if debug:
+                        _log.debug ('\nget resultfile exception: %s', e)
+
+#
+# } end download result metadata tables
+#
+
+        if (ngraphtbl > 0):
+#
+#{  download graph metadata tables: make png subdir
+#
+            pngsubdir = ''
+            if pngflag:
+                pngsubdir = outdir + '/png'
+
+                d1 = int ('0775', 8)
+
+                if debug:
+                    _log.debug ('\nd1= %d', d1)
+    
+#
+#    a png file for each moss run have different file name (pid at the end)
+#    so need to have an empty png subdirectory for each run.
+#
+                isExist = os.path.exists (pngsubdir)
+            
+                if debug:
+                    _log.debug ('\npngsubdir isExist=  %s', isExist)
+           
+                if (isExist):
+                    for f in os.listdir (pngsubdir):
+                        os.remove (os.path.join (pngsubdir, f))
+#
+#    create pngsubdir if the subdir doesn't exist
+#
+                try:
+                    os.makedirs (pngsubdir, mode=d1, exist_ok=True) 
+
+                except Exception as e:
+            
+                    msg = f'Failed to create {pngsubdir:s}: {str(e):s}'
+                    print (msg)
+                    raise Exception (msg) 
+            
+
+                if debug:
+                    _log.debug ('\nreturned os.makedirs: pngsubdir')
+
+
+            for l in range (ngraphtbl):
+           
+                fileurl = \
+                    jsondata['results']['graphtbls'][l]['graphfileurl']
+        
+                if debug:
+                    _log.debug ('\nfileurl= %s', fileurl)
+
+                graphfile = ''
+                ind = fileurl.rfind ('/')
+                if (ind >= 0):
+                    graphfile = fileurl[ind+1:]
+                
+                graphpath = outdir + '/' + graphfile
+
+                if debug:
+                    _log.debug ('\ngraphfile= %s' \
+                        '\ngraphpath= %s', \
+                        graphfile, graphpath)
+
+                url = baseurl + fileurl
+            
+                if debug:
+                    _log.debug ('\nurl= %s', url)
+
+                try:
+                    self.__get_moss_resultfile (url, graphpath, debug=1)
+                
+                    if debug:
+                        _log.debug ('\nreturned __get_moss_resultfile')
+
+                    #msg = 'Graphic metadata table downloaded to file [' + \
+                    #    graphpath + ']'
+                    #print (msg)
+                    
+                    ndnloaded_metatbl = ndnloaded_metatbl + 1 
+                
+                except Exception as e:
+
+                    if debug:
+                        _log.debug ('\nget graphfile exception: %s', e)
+
+#
+#    if pngflag = 1: download graphic PNG files
+#
+                if pngflag:
+
+                    ind = -1
+                    ind = url.rfind('/')
+                    
+                    url_prefix = url[0:ind]
+                    
+                    if debug:
+                        _log.debug ('\nhrere0\nurl_prefix= %s', url_prefix)
+
+                    nrecstr = jsondata['results']['graphtbls'][l]['nrec']
+                    nrec_png = int(nrecstr)
+
+                    if debug:
+                        _log.debug ('\nnrec_png= %d', nrec_png)
+                   
+                    
+                    for ipng in range (nrec_png):
+
+                        pngfile = \
+                            jsondata['results']['graphtbls'][l]['metadata'][ipng]['pngfile']
+                        
+                        pngurl = url_prefix + '/' + pngfile
+                        pngpath = pngsubdir + '/' + pngfile
+
+
+                        if debug:
+                            _log.debug ('\nipng= %d' \
+                                '\npngfile= %s' \
+                                '\npngpath= %s' \
+                                '\npngurl= %s', \
+                                ipng, pngfile, pngpath, pngurl)
+
+                        try:
+                            self.__get_moss_resultfile (pngurl, pngpath)
+                
+                            if debug:
+                                _log.debug ('\nreturned __get_moss_resultfile')
+                            ndnloaded_png = ndnloaded_png + 1 
+                
+                        except Exception as e:
+
+                            if debug:
+                                _log.debug ('\nget pngfile exception: %s', e)
+                            msg = f'get pngfile exception: {str(e):s}' 
+                            raise Exception (msg) 
+            
+     
+        if (ngraphtbl == 0):
+            print (f'{ndnloaded_metatbl:d} metadata tables downloaded.')
+        elif (ngraphtbl > 0):
+            print (f'{ndnloaded_metatbl:d} metadata tables and {ndnloaded_png:d} graph PNG files downloaded.') 
+            
+#
+# } end download graph metadata tables
+#
+
+        return
+
+#
+#} end Archive.download_moving_object_metadata
+#
+
+    
+    def __get_moss_resultfile (self, resulturl, outpath, **kwargs):
+#
+#{ Archive.__get_moss_resultfile
+#
+        response = None
+        status = ''
+        msg = ''
+        
+        debug = 0 
+
+        if ('debug' in kwargs):
+            debug = int(kwargs.get ('debug'))
+
+        if debug:
+            _log.debug ('\nEnter __get_moss_resultfile:' \
+                '\nXXX> resulturl= %s' \
+                '\noutpath= %s', \
+                resulturl, outpath)
+
+
+#
+#   send resulturl to retrieve result table
+#
+        try:
+            response = self._get_http().get (resulturl, stream=True)
+        
+            if debug:
+                _log.debug ('\nresulturl request sent')
+
+        except Exception as e:
+           
+            status = 'error'
+            msg = str(e)
+	    
+            if debug:
+                _log.debug ('\nexception: e= %s', e)
+            
+            raise Exception (msg)    
+     
+       
+#
+# save table to file
+#
+        if debug:
+            _log.debug ('\nsave data to outpath')
+
+        try:
+            fp = open (outpath, "wb", buffering=_DOWNLOAD_CHUNK)
+        
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nsave_data error: %s', e)
+            
+            msg = 'Failed to open file [' + outpath + '] for write.'
+            raise Exception (msg)    
+
+        try:
+            response.raw.decode_content = True
+            _copy_stream (response.raw, fp)
+        
+            fp.close()
+
+        except Exception as e:
+
+            if debug:
+                _log.debug ('\nsave_data error: %s', e)
+            
+            self.msg = 'save_data error: ' + str(e)
+            raise Exception (msg)    
+
+        if debug:
+            _log.debug ('\ndata written to file: %s', outpath)
+                
+        #msg = 'Result downloaded to file [' + outpath + ']'
+        #print (msg)
+        return
+
+#
+#} end Archive.__get_moss_resultfile
+#
+
+
+    def __get_moss_status (self, statusurl, **kwargs):
+#
+#{ Archive.__get_moss_status
+#
+        status = ''
+        msg = ''
+
+        debug = 0
+        
+        if ('debug' in kwargs):
+            debug = int(kwargs.get ('debug'))
+
+        if debug:
+            _log.debug ('\nEnter Koa.__get_moss_status:')
+
+#
+#    get status from statusurl
+#
+        response = None
+        try:
+            response = self._get_http().get (statusurl)
+            
+            if debug:
+                _log.debug ('\nstatusurl request sent')
+
+        except Exception as e:
+           
+            msg = str(e)
+	    
+            if debug:
+                _log.debug ('\nexception: e= %s', e)
+            
+            raise Exception (msg)    
+
+        if debug:
+            _log.debug ('\nstatusurl response returned' \
+                '\nresponse= ' \
+                '\n%s', \
+                response)
+       
+        jsondata = None
+        try:
+            jsondata = _json.loads (response.content)
+                    
+        except Exception as e:
+                
+            if debug:
+                _log.debug ('\nJSON object parse error: %s', e)
+      
+            status = 'error'
+            msg = 'JSON parse error: ' + str(e)
+                
+            raise Exception (msg)    
+
+            if debug:
+                _log.debug ('\nstatus= %s\nmsg= %s', status, msg)
+
+        #status = jsondata['status']
+        return (jsondata)
+        
+#
+#} end Archive.__get_moss_status
+#
+
+
+    def print_data (self):
+#
+#{ Archive.print_date
+#
+
+        if self.debug:
+            _log.debug ('')
+            _log.debug ('Enter Koa.print_data:')
+
+        try:
+            self.tap.print_data ()
+        except Exception as e:
+                
+            msg = 'Error print data: ' + str(e)
+            print (msg)
+        
+        return
+#
+#} end Archive.print_date
+#
+
+
+    def download (self, metapath, format, outdir, **kwargs):
+#
+#{ Archive.download
+#
+    
+        """
+        'download' method allows download of FITS files shown in the 
+        metadata file. The same method has the option of download the
+        associated calibration files and level 1 files. 
+
+        *** Requirement: 
+            
+            To download FITS files, the following two columns: 
+            instrume and filehand must be included in the metadata file.
+
+            To download associated calibrated files, the following three 
+            columns: instrume, koaid, and filehand must be included in the 
+            metadata file.
+
+
+	Required input:
+	-----
+	metapath (string): a full path metadata table obtained from running
+	          query methods    
+       
+	format (string):   metadata table's format: ipac, votable, csv, or tsv.
+	
+        outdir (string):   the directory for depositing the returned files      
+
+        At least one of the following three optional parameters:
+        lev1file, lev1file, and calibfile should be set to 1.:
+
+	
+        Optional input:
+        ----------------
+        cookiepath (string): cookie file path for downloading the proprietary 
+                             KOA data;
+        
+        start_row (integer): default is start_row = 0;
+	
+        end_row (integer): default is end_row = nrows - 1 where nrows is the 
+                           number of rows in the metadata file;
+
+        lev0file (integer): 1/0; 
+            1: download level0 files (i.e. raw data) in 'lev0' directory;
+            0: do not download level0 files.
+            default is 1.
+        
+        calibfile (integer): 1/0;
+            1: download calibration files;
+            0: do not download calibration files.
+            default is 0.
+         
+            Note: The calibration files are saved in the directory determined 
+            by paramter 'calibdir' -- either in the 'calib' sub-directory, or
+            in the same directory as the raw data files.
 
-                except Exception as e:
-            
-                    msg = f'Failed to create {pngsubdir:s}: {str(e):s}'
-                    print (msg)
-                    raise Exception (msg) 
-            
+        lev1file (integer): 1/0;
+            1: download level1 files in 'lev1' directory;
+            0: do not download level1 files.
+            default is 0.
+        
+        calibdir (integer): 1/0; 
+            1: put calibration files in their own directory named 'calib'; 
+            0: put the calibration files in the 'lev0' directory with other 
+                raw, science files.
+            default is 1.
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('returned os.makedirs: pngsubdir') 
+        nthreads (integer): number of metadata rows downloaded 
+            concurrently; default is 10.
 
+        revalidate (integer): 1/0;
+            1: re-fetch a calibration file already on disk only if the 
+               server reports it has changed since, by the ETag/
+               Last-Modified kept in the '<koaid>.meta' file written next 
+               to every downloaded file; a file without one is skipped;
+            0: skip the calibration files already on disk.
+            default is 0.
+        """
+       
+        debug = self._ensure_debug (kwargs)
 
-            for l in range (ngraphtbl):
-           
-                fileurl = \
-                    jsondata['results']['graphtbls'][l]['graphfileurl']
+#
+#    retrieve baseurl from conf class;
+#
+#    during dev or test, baseurl will be a keyword input
+#
+        self._set_urls (kwargs)
+
+        if debug:
+            _log.debug ('\nbaseurl= %s\nEnter download:', self.baseurl)
         
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'fileurl= {fileurl:s}') 
+        if (len(metapath) == 0):
+            print ('Failed to find required input parameter: metapath')
+            return
 
-                graphfile = ''
-                ind = fileurl.rfind ('/')
-                if (ind >= 0):
-                    graphfile = fileurl[ind+1:]
-                
-                graphpath = outdir + '/' + graphfile
+        if (len(format) == 0):
+            print ('Failed to find required input parameter: format')
+            return
+
+        if (len(outdir) == 0):
+            print ('Failed to find required input parameter: outdir')
+            return
+ 
+
+        if debug:
+            _log.debug ('\nmetapath= %s' \
+                '\nformat= %s' \
+                '\noutdir= %s', \
+                metapath, format, outdir)
+
+        
+        cookiepath = ''
+        cookiejar = None
+        
+        if ('cookiepath' in kwargs): 
+            cookiepath = kwargs.get('cookiepath')
 
+        if debug:
+            _log.debug ('\ncookiepath= %s', cookiepath)
+
+        if (len(cookiepath) > 0):
+   
+            try: 
+                cookiejar = _load_jar (cookiepath, \
+                    os.path.getmtime (cookiepath))
+    
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'graphfile= {graphfile:s}') 
-                    logging.debug (f'graphpath= {graphpath:s}') 
+                    _log.debug ('cookie loaded from file: %s', cookiepath)
+#
+#    the cookie dump walks the jar only when debugging
+#
+                    for cookie in cookiejar:
+                        _log.debug ('\ncookie=' \
+                            '\n%s' \
+                            '\ncookie.name= %s' \
+                            '\ncookie.value= %s' \
+                            '\ncookie.domain= %s', \
+                            cookie, cookie.name, cookie.value, cookie.domain)
 
-                url = baseurl + fileurl
-            
+            except Exception as e:
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'url= {url:s}') 
+                    _log.debug ('\nloadCookie exception: %s', e)
+                pass
 
-                try:
-                    self.__get_moss_resultfile (url, graphpath, debug=1)
-                
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('returned __get_moss_resultfile') 
+#        endif (cookiepath)
 
-                    #msg = 'Graphic metadata table downloaded to file [' + \
-                    #    graphpath + ']'
-                    #print (msg)
-                    
-                    ndnloaded_metatbl = ndnloaded_metatbl + 1 
-                
-                except Exception as e:
+#
+#    read metadata table and locate the instrume, koaid, and filehand columns
+#
+        rows = {key: kwargs.get (key) for key in ('start_row', 'end_row') \
+            if (key in kwargs)}
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'get graphfile exception: {str(e):s}') 
+        try:
+            astropytbl, ind_instrume, ind_koaid, ind_filehand = \
+                self.__read_metadata (metapath, format, debug=debug, \
+                    **rows)
+
+        except Exception as e:
+            print (str(e))
+            return
+
+        len_tbl = astropytbl.meta.get ('nrows', len(astropytbl))
+        
+        lev0file = 1 
+        if ('lev0file' in kwargs): 
+            lev0file = kwargs.get('lev0file')
+         
+        calibfile = 0 
+        if ('calibfile' in kwargs): 
+            calibfile = kwargs.get('calibfile')
+         
+        lev1file = 0 
+        if ('lev1file' in kwargs): 
+            lev1file = kwargs.get('lev1file')
+         
+        calibdir = 1 
+        if ('calibdir' in kwargs): 
+            calibdir = kwargs.get('calibdir')
+         
+        revalidate = 0 
+        if ('revalidate' in kwargs): 
+            revalidate = int(kwargs.get('revalidate'))
+         
+        nthreads = 10 
+        if ('nthreads' in kwargs): 
+            nthreads = int(kwargs.get('nthreads'))
+         
+        if debug:
+            _log.debug ('\nlev0file= %d' \
+                '\ncalibfile= %d' \
+                '\nlev1file= %d' \
+                '\ncalibdir= %d', \
+                lev0file, calibfile, lev1file, calibdir)
+
+        """
+        if ((lev0file == 0) and \
+            (lev1file == 0) and \
+            (calibfile == 0)):
+            
+            print ('Please choose which types of data you wish to download: lev0file, lev1file, and calibfile, more than one choice is allowed.')
+            return
+        """
+
+        srow = 0;
+        erow = len_tbl - 1
+
+        if ('start_row' in kwargs): 
+            srow = kwargs.get('start_row')
+
+        if debug:
+            _log.debug ('\nsrow= %d', srow)
+     
+        if ('end_row' in kwargs): 
+            erow = kwargs.get('end_row')
+        
+        if debug:
+            _log.debug ('\nerow= %d', erow)
+     
+        if (srow < 0):
+            srow = 0 
+        if (erow > len_tbl - 1):
+            erow = len_tbl - 1 
+ 
+        if debug:
+            _log.debug ('\nsrow= %d\nerow= %d', srow, erow)
+     
 
 #
-#    if pngflag = 1: download graphic PNG files
+#    create outdir for lev0, lev1, calib data if it doesn't exist
 #
-                if pngflag:
+#    decimal mode work for both python2.7 and python3;
+#
+#    0755 also works for python 2.7 but not python3
+#  
+#    convert octal 0775 to decimal: 493 
+#
+        d1 = int ('0775', 8)
 
-                    ind = -1
-                    ind = url.rfind('/')
-                    
-                    url_prefix = url[0:ind]
-                    
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('hrere0')
-                        logging.debug (f'url_prefix= {url_prefix:s}') 
+        if debug:
+            _log.debug ('\nd1= %d', d1)
+#
+#    lev0 subdir 
+#
+        outdir_lev0 = outdir
+        if (lev0file == 1):
+            outdir_lev0 = outdir + '/lev0'
+            
+        try:
+            os.makedirs (outdir_lev0, mode=d1, exist_ok=True) 
 
-                    nrecstr = jsondata['results']['graphtbls'][l]['nrec']
-                    nrec_png = int(nrecstr)
+        except Exception as e:
+            
+            msg = f'Failed to create {outdir:s}: {str(e):s}'
+            print (msg)
+            return
+            #sys.exit()
+   
+        if debug:
+            _log.debug ('\nreturned os.makedirs for lev0 data subdir')
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'nrec_png= {nrec_png:d}') 
-                   
-                    
-                    for ipng in range (nrec_png):
+#
+#    lev1 subdir 
+#
+        outdir_lev1 = outdir
+        if (lev1file == 1):
+            outdir_lev1 = outdir + '/lev1'
+            
+        try:
+            os.makedirs (outdir_lev1, mode=d1, exist_ok=True) 
 
-                        pngfile = \
-                            jsondata['results']['graphtbls'][l]['metadata'][ipng]['pngfile']
-                        
-                        pngurl = url_prefix + '/' + pngfile
-                        pngpath = pngsubdir + '/' + pngfile
+        except Exception as e:
+            
+            msg = f'Failed to create {outdir:s}: {str(e):s}'
+            print (msg)
+            return
 
+        if debug:
+            _log.debug ('\nreturned os.makedirs for lev1 data subdir')
 
-                        if debug:
-                            logging.debug ('')
-                            logging.debug (f'ipng= {ipng:d}')
-                            logging.debug (f'pngfile= {pngfile:s}') 
-                            logging.debug (f'pngpath= {pngpath:s}') 
-                            logging.debug (f'pngurl= {pngurl:s}') 
+#
+#    calib subdir 
+#
+        outdir_calib = outdir
+        if (calibfile == 1):
+            
+            if (lev0file == 0):
+                outdir_calib = outdir + '/calib'
+            else:
+                if (calibdir == 1):
+                    outdir_calib = outdir + '/calib'
+                else:
+                    outdir_calib = outdir + '/lev0'
+
+        try:
+            os.makedirs (outdir_calib, mode=d1, exist_ok=True) 
+
+        except Exception as e:
+            
+            msg = f'Failed to create {outdir:s}: {str(e):s}'
+            print (msg)
+            return
+
+        if debug:
+            _log.debug ('\nreturned os.makedirs for calib data subdir')
+
+        if debug:
+            _log.debug ('\noutdir_lev0= %s' \
+                '\noutdir_lev1= %s' \
+                '\noutdir_calib= %s', \
+                outdir_lev0, outdir_lev1, outdir_calib)
+
+        if debug:
+            _log.debug ('\ngetkoa_url= %s' \
+                '\ncaliblist_url= %s', \
+                self.getkoa_url, self.caliblist_url)
+
+
+        instrument = '' 
+        ndnloaded_lev0 = 0
+        
+        nlev1list = 0
+        ndnloaded_lev1 = 0
+        
+        ncaliblist = 0
+        ndnloaded_calib = 0
+      
+        nfile = erow - srow + 1   
+        
+        print (f'Start downloading {nfile:d} koaid data you requested;')
+        print (f'please check your outdir: {outdir:s} for  progress ....')
+
+#
+#    the rows are downloaded by a thread pool; requests releases the GIL 
+#    while waiting on the socket.  The results are collected in table 
+#    order, so the messages print as they would in a serial run.
+#
+        dnload = {'debug': debug, \
+            'cookiejar': cookiejar, \
+            'srow': srow, \
+            'lev0file': lev0file, \
+            'lev1file': lev1file, \
+            'calibfile': calibfile, \
+            'revalidate': revalidate, \
+            'outdir_lev0': outdir_lev0, \
+            'outdir_lev1': outdir_lev1, \
+            'outdir_calib': outdir_calib, \
+            'existing': _list_files (outdir_lev0, outdir_lev1, outdir_calib), \
+            'claims': _PathClaims ()}
+
+#
+#    the three columns are sliced and decoded once, column first, instead 
+#    of building an astropy Row for every value
+#
+        instruments = self.__column_values (astropytbl, ind_instrume, \
+            srow, erow)
+        koaids = self.__column_values (astropytbl, ind_koaid, srow, erow)
+        filehands = self.__column_values (astropytbl, ind_filehand, \
+            srow, erow)
 
-                        try:
-                            self.__get_moss_resultfile (pngurl, pngpath)
-                
-                            if debug:
-                                logging.debug ('')
-                                logging.debug ('returned __get_moss_resultfile') 
-                            ndnloaded_png = ndnloaded_png + 1 
-                
-                        except Exception as e:
+#
+#    normalize the instrument names (e.g. HIRESb, LRISBLUE, NIRSPEC2) in 
+#    one vectorized pass
+#
+        if (len(instruments) > 0):
 
-                            if debug:
-                                logging.debug ('')
-                                logging.debug (\
-                                    f'get pngfile exception: {str(e):s}') 
-                            msg = f'get pngfile exception: {str(e):s}' 
-                            raise Exception (msg) 
+            instr_arr = np.asarray (instruments)
             
-     
-        if (ngraphtbl == 0):
-            print (f'{ndnloaded_metatbl:d} metadata tables downloaded.')
-        elif (ngraphtbl > 0):
-            print (f'{ndnloaded_metatbl:d} metadata tables and {ndnloaded_png:d} graph PNG files downloaded.') 
+            for key, name in (('HIRES', 'HIRES'), ('LRIS', 'LRIS'), \
+                ('NIRS', 'NIRSPEC')):
+                instr_arr = np.where (np.char.find (instr_arr, key) >= 0, \
+                    name, instr_arr)
             
+            instruments = instr_arr.tolist()
+
 #
-# } end download graph metadata tables
+#    koaid without its extension, for the lev1list and caliblist names: 
+#    the part before the last '.', or the whole koaid when it has no '.'
+#    past its first character
 #
+        koaid_bases = koaids
+        
+        if (len(koaids) > 0):
 
-        return
+            koaid_arr = np.asarray (koaids)
+            
+            koaid_bases = np.where (np.char.rfind (koaid_arr, '.') > 0, \
+                np.char.rpartition (koaid_arr, '.')[:,0], koaid_arr).tolist()
 
 #
-#} end Archive.download_moving_object_metadata
+#    a koaid listed in several rows is downloaded by its first row only;
+#    the other rows would request the same lev1 and calibration lists 
+#    again, concurrently.  Calibration files shared by different koaids 
+#    are fetched once through dnload['claims'] and dnload['existing'].
 #
+        rows = []
+        seen = set ()
+        for l in range (srow, erow+1):
+            
+            if (koaids[l-srow] not in seen):
+                seen.add (koaids[l-srow])
+                rows.append (l)
 
-    
-    def __get_moss_resultfile (self, resulturl, outpath, **kwargs):
 #
-#{ Archive.__get_moss_resultfile
+#    the calibration files of all the rows share a second pool: a row 
+#    waiting on its calibration files holds no connection
 #
-        response = None
-        status = ''
-        msg = ''
-        
-        debug = 0 
+        with ThreadPoolExecutor (max_workers=nthreads) as executor, \
+            ThreadPoolExecutor (max_workers=8) as calibpool:
 
-        if ('debug' in kwargs):
-            debug = int(kwargs.get ('debug'))
+            dnload['calibpool'] = calibpool
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('Enter __get_moss_resultfile:')
-            logging.debug (f'XXX> resulturl= {resulturl:s}')
-            logging.debug (f'outpath= {outpath:s}')
+            futures = [executor.submit (self.__download_row, l, \
+                instruments[l-srow], koaids[l-srow], koaid_bases[l-srow], \
+                filehands[l-srow], dnload) for l in rows]
+
+            for future in futures:
+               
+                instrument, nlev0, nlist1, nlev1, nlistc, ncalib, msgs = \
+                    future.result ()
+                
+                ndnloaded_lev0 = ndnloaded_lev0 + nlev0
+                nlev1list = nlev1list + nlist1
+                ndnloaded_lev1 = ndnloaded_lev1 + nlev1
+                ncaliblist = ncaliblist + nlistc
+                ndnloaded_calib = ndnloaded_calib + ncalib
 
+                for msg in msgs:
+                    print (msg)
 
+        if debug:
+            _log.debug ('\n%d files in the table;' \
+                '\n%d lev0 files downloaded.' \
+                '\n%d lev1list downloaded.' \
+                '\n%d lev1files downloaded.' \
+                '\n%d calibration list downloaded.' \
+                '\n%d calibration files downloaded.', \
+                len_tbl, ndnloaded_lev0, nlev1list, ndnloaded_lev1, \
+                ncaliblist, ndnloaded_calib)
+        #
+        #    print out total count of downloaded files
+        #
+        print ('')
+        if (lev0file == 1):
+            print (f'A total of {ndnloaded_lev0:d} new lev0 FITS files downloaded.')
+ 
+        if (lev1file == 1):
+            
+            if ((instrument.lower() == "nirc2") or \
+                (instrument.lower() == "osiris") or \
+                (instrument.lower() == "lws") or \
+                (instrument.lower() == "hires") or \
+                (instrument.lower() == "nirspec")):
+               
+                print (f'{nlev1list:d} new lev1 list downloaded.')
+                print (f'{ndnloaded_lev1:d} new lev1 files downloaded.')
+        
+        if (calibfile == 1):
+            print (f'{ncaliblist:d} new calibration list downloaded.')
+            print (f'{ndnloaded_calib:d} new calibration FITS files downloaded.')
+        return
 #
-#   send resulturl to retrieve result table
+#} end Archive.download
 #
-        try:
-            response = requests.get (resulturl, stream=True)
-        
-            if debug:
-                logging.debug ('')
-                logging.debug ('resulturl request sent')
 
-        except Exception as e:
-           
-            status = 'error'
-            msg = str(e)
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            raise Exception (msg)    
-     
-       
+
+    def __download_row (self, l, instrument, koaid, koaid_base, filehand, \
+        dnload):
 #
-# save table to file
+#{ Archive.__download_row
 #
-        if debug:
-            logging.debug ('')
-            logging.debug ('save data to outpath')
+        """
+        '__download_row' downloads the lev0, lev1, and calibration files 
+        of row l of the metadata table, given its (decoded) instrume, 
+        koaid, and filehand values and the koaid without its extension
+        (koaid_base); download runs it in a thread pool.
+
+        dnload is the dict of download settings shared by all the rows.
+        The messages for the user are returned with the instrument and the
+        file counts instead of being printed, so that download prints them
+        in table order.
+        """
 
-        try:
-            fp = open (outpath, "wb")
+        debug = dnload['debug']
+        cookiejar = dnload['cookiejar']
+        outdir_lev0 = dnload['outdir_lev0']
+        outdir_lev1 = dnload['outdir_lev1']
+        outdir_calib = dnload['outdir_calib']
+        existing = dnload['existing']
         
-        except Exception as e:
+        ndnloaded_lev0 = 0
+        nlev1list = 0
+        ndnloaded_lev1 = 0
+        ncaliblist = 0
+        ndnloaded_calib = 0
+        
+        msgs = []
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'save_data error: {str(e):s}')
-            
-            msg = 'Failed to open file [' + outpath + '] for write.'
-            raise Exception (msg)    
+        if debug:
+            _log.debug ('\nl= %d\ninstrument= \n%s', l, instrument)
 
-        try:
-            for data in response.iter_content(4096):
-                
-                len_data = len(data)            
-        
-                if (len_data < 1):
-                    break
+        if debug:
+            _log.debug ('\nl= %d koaid= %s' \
+                '\nfilehand= %s' \
+                '\ninstrument= %s', \
+                l, koaid, filehand, instrument)
 
-                fp.write (data)
+        #
+        #   get lev0 files
+        #
+        if (dnload['lev0file'] == 1):
         
-            fp.close()
+            url = f'{self.getkoa_url}filehand={filehand}'
+            filepath = outdir_lev0 + '/' + koaid
+            
+            if debug:
+                _log.debug ('\nfilepath= %s\nurl= %s', filepath, url)
 
-        except Exception as e:
+            #
+            #    if file doesn't exist: download
+            #
+            isExist = (filepath in existing)
+	    
+            if ((not isExist) and dnload['claims'].claim (filepath)):
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'save_data error: {str(e):s}')
-            
-            self.msg = 'save_data error: ' + str(e)
-            raise Exception (msg)    
+                try:
+                    self.__submit_request (url, filepath, cookiejar)
+                    ndnloaded_lev0 = ndnloaded_lev0 + 1
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'data written to file: {outpath:s}')
+                    if debug:
+                        _log.debug ('\nreturned __submit_request')
                 
-        #msg = 'Result downloaded to file [' + outpath + ']'
-        #print (msg)
-        return
+                except Exception as e:
+                    msgs.append ( \
+                        f'File [{koaid:s}] download error: {str(e):s}')
+        
 
-#
-#} end Archive.__get_moss_resultfile
-#
+        if (dnload['lev1file'] == 1):
+        #
+        # { if leve1file == 1   
+        #
+            if ((instrument.lower() != "nirc2") and \
+                (instrument.lower() != "osiris") and \
+                (instrument.lower() != "lws") and \
+                (instrument.lower() != "hires") and \
+                (instrument.lower() != "nirspec")):
+           
+                if (l == dnload['srow']):
+                    msgs.append ( \
+                        f'Instrument [{instrument:s}] does not have level1 data.')
+            else:
+            #
+            # {   this instrument might have lev1 data
+            #
+                #
+                # { get lev1 list 
+                #
+                if debug:
+                    _log.debug ('\nlev1file=1: downloading lev1list')
+	  
+                if debug:
+                    _log.debug ('\nkoaid_base= %s', koaid_base)
+	    
+                lev1list = outdir_lev1 + '/' + koaid_base + '.lev1list.json'
+            
+                if debug:
+                    _log.debug ('\nlev1list= %s', lev1list)
 
+                isExist = (lev1list in existing)
+	    
+                if (not isExist):
 
-    def __get_moss_status (self, statusurl, **kwargs):
-#
-#{ Archive.__get_moss_status
-#
-        status = ''
-        msg = ''
+                    if debug:
+                        _log.debug ('\ndownloading lev1list')
+	    
+                    url = f'{self.lev1list_url}' \
+                        f'instrument={instrument}&koaid={koaid}' \
+                        f'&filehand={filehand}'
 
-        debug = 0
+
+                    if debug:
+                        _log.debug ('\nlev1list url= %s', url)
+
+                    try:
+                        #self.__submit_request (url, lev1list, cookiejar, \
+                        #    debug=1)
+                        self.__submit_request (url, lev1list, cookiejar)
+                        existing.add (lev1list)
+                        
+                        nlev1list = nlev1list + 1
+
+                        msg =  'Returned file written to: ' + lev1list 
+       
+                        if debug:
+                            _log.debug ('\nreturned __submit_request' \
+                                '\nmsg= %s' \
+                                '\nnlev1list= %d', \
+                                msg, nlev1list)
         
-        if ('debug' in kwargs):
-            debug = int(kwargs.get ('debug'))
+                    except Exception as e:
+                    
+                        msg = 'Failed to get level 1 file list ' \
+                            + 'for koaid: ' + koaid
+                    
+                        msgs.append (f'{msg:s}')
+                        msgs.append (str(e))
+                    
+                #
+                # } end get lev1 list 
+                #
+                #
+                #    check again after lev1list is successfully downloaded, 
+                #     
+            
+                nlev1file = 0
+            
+                isExist = (lev1list in existing)
+            
+                if (not isExist):
+                    msg = 'Failed to get level 1 data list ' \
+                        + 'for koaid: ' + koaid
+                    
+                    msgs.append (f'{msg:s}')
+            
+                else:
+                #     
+                #  extract koaid and nlev1file from json strcuture
+                #     
+            
+                    jsonData = None
+                    koaid = ''
+                    try:
+                        with open (lev1list, 'rb') as fp:
+	    
+                            jsonData = _json.loads (fp.read()) 
+                            koaid = jsonData["input"]["koaid"]
+                            nlev1file = int(jsonData["result"]["nlev1file"])
+                        
+                    except Exception as e:
+    
+                        if debug:
+                            _log.debug ('\nlev1list: %s load error: %s', \
+                                lev1list, e)
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('Enter Koa.__get_moss_status:')
+                        msg = 'Failed to read ' + lev1list	
+                        msgs.append (f'{msg:s}')
 
-#
-#    get status from statusurl
-#
-        response = None
-        try:
-            response = requests.get (statusurl, stream=True)
+                    if debug:
+                        _log.debug ('\nkoaid= %s' \
+                            '\nnlev1file= %d', \
+                            koaid, nlev1file)
+  
+                if (nlev1file == 0):
+                
+                    if debug:
+                        _log.debug ('\ngot here:\nnlev1file= %d', nlev1file)
+  
+                    msg = 'No level 1 data found for koaid: [' \
+                        + koaid + ']'
+                
+                    msgs.append (f'{msg:s}')
+            
+                else:   
+                #
+                # { nlev1file > 0: download lev1file
+                #
+                    if debug:
+                        _log.debug ('\nlist exist: downloading lev1files')
+
+                
+                    #if ((instrument.lower() != "hires") or \
+                    #    (instrument.lower() != "nirspec")):
+                    #    print ('')
+                    #    print ( \
+                    #        f'Downloading [{koaid:s}] level 1 files ....')
+                    
+                    #print ('')
+                    #print (f'Downloading [{koaid:s}] level 1 files ....')
+                    
+                    try:
+                        nlev1 = self.__download_lev1files (jsonData, \
+                            cookiejar, outdir_lev1, msgs=msgs)
+                    
+                        #nlev1 = self.__download_lev1files (jsonData, \
+                        #    cookiejar, outdir_lev1, debug=1)
+                
+                        if debug:
+                            _log.debug ('\nreturned __download_lev1files' \
+                                '\nnlev1= %d', \
+                                nlev1)
+                    
+                        ndnloaded_lev1 = ndnloaded_lev1 + nlev1
+                
+                        if debug:
+                            _log.debug ('\nndnloaded_lev1= %d', ndnloaded_lev1)
+                       
+                        msg = str(nlev1) + ' level1 files downloaded ' \
+                            + 'for koaid: [' + koaid + ']'
+
+                        if debug:
+                            _log.debug ('\nmsg= %s', msg)
+                       
+                        #print (f'{msg:s}')
+     
+                        if debug:
+                            _log.debug ('\nreturned __download_lev1files' \
+                                '\n%d downloaded' \
+                                '\nndnloaded_lev1= %d', \
+                                nlev1, ndnloaded_lev1)
+            
+                    except Exception as e:
             
+                        msg = 'Error downloading files in lev1list [' + \
+                            lev1list + ']: ' +  str(e)
+                        msgs.append (f'{msg:s}')
+                    
+                        if debug:
+                            _log.debug ('\nerrmsg= %s', msg)
+
+                #
+                # } download lev1 files
+                #     
+            #
+            # } end lev1 files dnload for the instrument
+            #     
+        # 
+        #} endif (lev1file == 1):
+        #
+                    
             if debug:
-                logging.debug ('')
-                logging.debug ('statusurl request sent')
+                _log.debug ('\ndone lev1 dnload' \
+                    '\nndnloaded= %d', \
+                    ndnloaded_lev1)
+            
 
-        except Exception as e:
-           
-            msg = str(e)
+        if (dnload['calibfile'] == 1):
+        #
+        # {   if calibfile == 1: download calibfile
+        #
+
+            if debug:
+                _log.debug ('\ncalibfile=1: downloading calibfiles')
 	    
             if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\nkoaid_base= %s', koaid_base)
+	    
+            caliblist = outdir_calib + '/' + koaid_base + '.caliblist.json'
+            caliblist_ipac = outdir_calib + '/' + koaid_base + '.caliblist.tbl'
             
-            raise Exception (msg)    
+            if debug:
+                _log.debug ('\ncaliblist= %s' \
+                    '\ncaliblist_ipac= %s', \
+                    caliblist, caliblist_ipac)
+
+            #
+            #    download caliblist (json)
+            #
+            isExist = (caliblist in existing)
+	    
+            if (not isExist):
+
+                if debug:
+                    _log.debug ('\ndownloading caliblist')
+	    
+                url = f'{self.caliblist_url}' \
+                    f'instrument={instrument}&koaid={koaid}'
+
+                if debug:
+                    _log.debug ('\ncaliblist url= %s', url)
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('statusurl response returned')
-            logging.debug ('response= ')
-            logging.debug (response)
+                try:
+                    self.__submit_request (url, caliblist, cookiejar)
+                    existing.add (caliblist)
+                    ncaliblist = ncaliblist + 1
+
+                    msg =  'Returned file written to: ' + caliblist   
        
-        jsondata = None
-        try:
-            jsondata = response.json()
+                    if debug:
+                        _log.debug ('\nreturned __submit_request' \
+                            '\nmsg= %s', \
+                            msg)
+        
+                except Exception as e:
+                    #print (f'File [{caliblist:s}] download: {str(e):s}')
+                    #msg = 'Error downloading caliblist [' + \
+                    #    caliblist + ']:' + str(e)
                     
-        except Exception as e:
-                
-            if debug:
-                logging.debug ('')
-                logging.debug (f'JSON object parse error: {str(e):s}')
-      
-            status = 'error'
-            msg = 'JSON parse error: ' + str(e)
-                
-            raise Exception (msg)    
+                    msg = 'No associated calibration list for ' + \
+                        koaid
+                    msgs.append (f'{msg:s}')
+                    return (instrument, ndnloaded_lev0, nlev1list, \
+                        ndnloaded_lev1, ncaliblist, ndnloaded_calib, msgs) 
+                     
 
-            if debug:
-                logging.debug ('')
-                logging.debug (f'status= {status:s}')
-                logging.debug (f'msg= {msg:s}')
+            #
+            #    download caliblist_ipac
+            #
+            isExist = (caliblist_ipac in existing)
+	    
+            if (not isExist):
 
-        #status = jsondata['status']
-        return (jsondata)
-        
-#
-#} end Archive.__get_moss_status
-#
+                if debug:
+                    _log.debug ('\ndownloading caliblist_ipac')
+	    
+                url = f'{self.caliblist_url}' \
+                    f'instrument={instrument}&koaid={koaid}&format=ipac'
 
+                if debug:
+                    _log.debug ('\ncaliblist_ipac url= %s', url)
+
+                try:
+                    self.__submit_request (url, caliblist_ipac, cookiejar)
+                    existing.add (caliblist_ipac)
+                    msg =  'Returned file written to: ' + caliblist_ipac   
+       
+                    if debug:
+                        _log.debug ('\nreturned __submit_request' \
+                            '\nmsg= %s', \
+                            msg)
+        
+                except Exception as e:
+                    #print (f'File [{caliblist:s}] download: {str(e):s}')
+                    #msg = 'Error downloading caliblist_ipac [' + \
+                    #    caliblist_ipac + ']:' + str(e)
+                    
+                    msg = 'No associated calibration list for ' + \
+                        koaid
+                    msgs.append (f'{msg:s}')
+                    return (instrument, ndnloaded_lev0, nlev1list, \
+                        ndnloaded_lev1, ncaliblist, ndnloaded_calib, msgs) 
+                     
 
-    def print_data (self):
 #
-#{ Archive.print_date
+#    both lists are in place here (a failed list download returned above):
+#    download the calibfiles
 #
+            if debug:
+                _log.debug ('\nlist exist: downloading calibfiles')
+	   
+            #if ((instrument.lower() != "hires") or \
+            #    (instrument.lower() != "nirspec")):
+            #    print ('')
+            #    print ( \
+            #        f'Downloading [{koaid:s}] calibration files ....')
+            
+            #print ('')
+            #print (f'Downloading [{koaid:s}] calibration files ....')
+                
+            try:
+                #ncalibs = self.__download_calibfiles ( \
+                #    caliblist, cookiejar, outdir_calib)
+                
+                ncalibs = self.__download_calibfiles ( \
+                    caliblist, cookiejar, outdir_calib, deubg=1, \
+                    msgs=msgs, claims=dnload['claims'], \
+                    existing=existing, pool=dnload['calibpool'], \
+                    revalidate=dnload['revalidate'])
+                ndnloaded_calib = ndnloaded_calib + ncalibs
+            
+                if debug:
+                    _log.debug ('\nreturned __download_calibfiles' \
+                        '\n%d downloaded', \
+                        ncalibs)
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter Koa.print_data:')
+                msg = str(ncalibs) + ' calibration files downloaded ' \
+                    + 'for koaid: [' + koaid + ']'
+                #print (msg)
 
-        try:
-            self.tap.print_data ()
-        except Exception as e:
+            except Exception as e:
+            
+                msg = 'Error downloading files in caliblist [' + \
+                    caliblist + ']: ' +  str(e)
                 
-            msg = 'Error print data: ' + str(e)
-            print (msg)
-        
-        return
+                if debug:
+                    _log.debug ('\nerrmsg= %s', msg)
+            
+        # 
+        #} endif (calibfile == 1):
+        #
+
+        return (instrument, ndnloaded_lev0, nlev1list, ndnloaded_lev1, \
+            ncaliblist, ndnloaded_calib, msgs)
 #
-#} end Archive.print_date
+#} end Archive.__download_row
 #
 
 
-    def download (self, metapath, format, outdir, **kwargs):
+
+    async def adownload (self, metapath, format, outdir, **kwargs):
 #
-#{ Archive.download
+#{ Archive.adownload
 #
-    
         """
-        'download' method allows download of FITS files shown in the 
-        metadata file. The same method has the option of download the
-        associated calibration files and level 1 files. 
+        'adownload' is the asyncio counterpart of the 'download' method for 
+        the level 0 (raw) FITS files: the files listed in the metadata table
+        are fetched concurrently instead of one after the other.  It 
+        requires the optional 'aiohttp' package (pip install aiohttp), or
+        'httpx[http2]' when HTTP/2 is enabled.
 
-        *** Requirement: 
+        Calling synopsis:
+        
+            asyncio.run (Koa.adownload (metapath, 'ipac', outdir)), or
             
-            To download FITS files, the following two columns: 
-            instrume and filehand must be included in the metadata file.
-
-            To download associated calibrated files, the following three 
-            columns: instrume, koaid, and filehand must be included in the 
-            metadata file.
-
+            await Koa.adownload (metapath, 'ipac', outdir) in a notebook.
 
 	Required input:
 	-----
@@ -2719,10 +4314,6 @@ class Archive:
 	
         outdir (string):   the directory for depositing the returned files      
 
-        At least one of the following three optional parameters:
-        lev1file, lev1file, and calibfile should be set to 1.:
-
-	
         Optional input:
         ----------------
         cookiepath (string): cookie file path for downloading the proprietary 
@@ -2733,62 +4324,33 @@ class Archive:
         end_row (integer): default is end_row = nrows - 1 where nrows is the 
                            number of rows in the metadata file;
 
-        lev0file (integer): 1/0; 
-            1: download level0 files (i.e. raw data) in 'lev0' directory;
-            0: do not download level0 files.
-            default is 1.
-        
-        calibfile (integer): 1/0;
-            1: download calibration files;
-            0: do not download calibration files.
-            default is 0.
-         
-            Note: The calibration files are saved in the directory determined 
-            by paramter 'calibdir' -- either in the 'calib' sub-directory, or
-            in the same directory as the raw data files.
+        nconcurrent (integer): maximum number of simultaneous downloads;
+                           default is 64.
 
-        lev1file (integer): 1/0;
-            1: download level1 files in 'lev1' directory;
-            0: do not download level1 files.
-            default is 0.
+        http2 (integer): 1 to download over one multiplexed HTTP/2 
+                           connection with httpx; default is the http2 
+                           flag given to the constructor.
         
-        calibdir (integer): 1/0; 
-            1: put calibration files in their own directory named 'calib'; 
-            0: put the calibration files in the 'lev0' directory with other 
-                raw, science files.
-            default is 1.
+        The files are written to the 'lev0' sub-directory of outdir; use 
+        the 'download' method for the calibration and level 1 files.
         """
        
-        debug = 0
-        debugfname = ''
-        if ('debugfile' in kwargs):
-            
-            debug = 1
-            debugfname = kwargs.get ('debugfile')
+        debug = self._ensure_debug (kwargs)
 
-            if (len(debugfname) > 0):
-      
-                logging.basicConfig (filename=debugfname, \
-                    level=logging.DEBUG)
-    
-                with open (debugfname, 'w') as fdebug:
-                    pass
+        http2 = self.http2
+        if ('http2' in kwargs):
+            http2 = int(kwargs.get('http2'))
 
-#
-#    retrieve baseurl from conf class;
-#
-#    during dev or test, baseurl will be a keyword input
-#
-        self.baseurl = conf.server
+        if (http2 and (httpx is None)):
+            print ('http2 requires the httpx package: ' + \
+                "pip install 'httpx[http2]'; using aiohttp")
+            http2 = 0
 
-        if ('server' in kwargs):
-            self.baseurl = kwargs.get ('server')
+        if ((not http2) and (aiohttp is None)):
+            print ('adownload requires the aiohttp package: ' + \
+                'pip install aiohttp')
+            return
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'baseurl= {self.baseurl:s}')
-            logging.debug ('Enter download:')
-        
         if (len(metapath) == 0):
             print ('Failed to find required input parameter: metapath')
             return
@@ -2801,838 +4363,522 @@ class Archive:
             print ('Failed to find required input parameter: outdir')
             return
  
-
+        self._set_urls (kwargs)
+        
         if debug:
-            logging.debug ('')
-            logging.debug (f'metapath= {metapath:s}')
-            logging.debug (f'format= {format:s}')
-            logging.debug (f'outdir= {outdir:s}')
+            _log.debug ('\nEnter adownload:' \
+                '\nmetapath= %s' \
+                '\nformat= %s' \
+                '\noutdir= %s', \
+                metapath, format, outdir)
 
-        
+        nconcurrent = 64
+        if ('nconcurrent' in kwargs): 
+            nconcurrent = int(kwargs.get('nconcurrent'))
+
+#
+#    aiohttp cannot read a MozillaCookieJar: pass the cookies by name
+#
+        cookies = None
         cookiepath = ''
-        cookiejar = None
-        
         if ('cookiepath' in kwargs): 
             cookiepath = kwargs.get('cookiepath')
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'cookiepath= {cookiepath:s}')
-
         if (len(cookiepath) > 0):
    
-            cookiejar = http.cookiejar.MozillaCookieJar (cookiepath)
-
             try: 
-                cookiejar.load (ignore_discard=True, ignore_expires=True)
+                cookiejar = _load_jar (cookiepath, \
+                    os.path.getmtime (cookiepath))
+                cookies = {cookie.name: cookie.value for cookie in cookiejar}
     
-                if debug:
-                    logging.debug (\
-                        f'cookie loaded from file: {cookiepath:s}')
-        
-                for cookie in cookiejar:
-                    
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('cookie=')
-                        logging.debug (cookie)
-                        logging.debug (f'cookie.name= {cookie.name:s}')
-                        logging.debug (f'cookie.value= {cookie.value:s}')
-                        logging.debug (f'cookie.domain= {cookie.domain:s}')
-
             except Exception as e:
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'loadCookie exception: {str(e):s}')
-                pass
-
-#        endif (cookiepath)
+                    _log.debug ('\nloadCookie exception: %s', e)
 
-        fmt_astropy = format
-        if (format == 'tsv'):
-            fmt_astropy = 'ascii.tab'
-        if (format == 'csv'):
-            fmt_astropy = 'ascii.csv'
-        if (format == 'ipac'):
-            fmt_astropy = 'ascii.ipac'
+        rows = {key: kwargs.get (key) for key in ('start_row', 'end_row') \
+            if (key in kwargs)}
 
-#
-#    read metadata to astropy table
-#
-        astropytbl = None
         try:
-            astropytbl = Table.read (metapath, format=fmt_astropy)
+            astropytbl, ind_instrume, ind_koaid, ind_filehand = \
+                self.__read_metadata (metapath, format, debug=debug, \
+                    **rows)
+
+        except Exception as e:
+            print (str(e))
+            return
+
+        len_tbl = astropytbl.meta.get ('nrows', len(astropytbl))
+
+        srow = 0
+        erow = len_tbl - 1
+
+        if ('start_row' in kwargs): 
+            srow = kwargs.get('start_row')
+
+        if ('end_row' in kwargs): 
+            erow = kwargs.get('end_row')
         
+        if (srow < 0):
+            srow = 0 
+        if (erow > len_tbl - 1):
+            erow = len_tbl - 1 
+ 
+        outdir_lev0 = outdir + '/lev0'
+            
+        try:
+            os.makedirs (outdir_lev0, mode=int ('0775', 8), exist_ok=True) 
+
         except Exception as e:
-            msg = 'Failed to read metadata table to astropy table:' + \
-                str(e) 
+            
+            msg = f'Failed to create {outdir:s}: {str(e):s}'
             print (msg)
             return
-            #sys.exit()
 
-        len_tbl = len(astropytbl)
+#
+#    collect the files not yet downloaded
+#
+        koaids = []
+        urls = []
+        filepaths = []
+        
+        col_koaid = self.__column_values (astropytbl, ind_koaid, srow, erow)
+        col_filehand = self.__column_values (astropytbl, ind_filehand, \
+            srow, erow)
+        
+        existing = _list_files (outdir_lev0)
+        
+        for koaid, filehand in zip (col_koaid, col_filehand):
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('astropytbl read')
-            logging.debug (f'len_tbl= {len_tbl:d}')
+            filepath = outdir_lev0 + '/' + koaid
+                
+            if (filepath not in existing):
+                koaids.append (koaid)
+                urls.append (f'{self.getkoa_url}filehand={filehand}')
+                filepaths.append (filepath)
 
+        nfile = erow - srow + 1   
         
-        colnames = astropytbl.colnames
+        print (f'Start downloading {nfile:d} koaid data you requested;')
+        print (f'please check your outdir: {outdir:s} for  progress ....')
 
-        if debug:
-            logging.debug ('')
-            logging.debug ('colnames:')
-            logging.debug (colnames)
-  
-        len_col = len(colnames)
+        sem = asyncio.Semaphore (nconcurrent)
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'len_col= {len_col:d}')
+#
+#    share the rate limiter of the requests session
+#
+        limiter = self._get_session().limiter
 
- 
-        ind_instrume = -1
-        ind_koaid = -1
-        ind_filehand = -1
-        for i in range (len_col):
+        if http2:
+#
+#    the client is bound to the running event loop, so it lives for this
+#    call only; all the requests share its HTTP/2 connection
+#
+            limits = httpx.Limits (max_connections=100, \
+                max_keepalive_connections=20)
+            
+            hooks = {'request': [limiter.on_request], \
+                'response': [limiter.on_response]}
 
-            if (colnames[i].lower() == 'instrume'):
-                ind_instrume = i
+            async with httpx.AsyncClient (http2=True, limits=limits, \
+                timeout=30.0, cookies=cookies, \
+                event_hooks=hooks) as client:
 
-            if (ind_instrume == -1): 
-                if (colnames[i].lower() == 'instrument'):
-                    ind_instrume = i
-            
-            if (colnames[i].lower() == 'koaid'):
-                ind_koaid = i
+                results = await asyncio.gather ( \
+                    *[self.__afetch (client, sem, url, filepath) \
+                    for url, filepath in zip (urls, filepaths)], \
+                    return_exceptions=True)
 
-            if (colnames[i].lower() == 'filehand'):
-                ind_filehand = i
-             
-        if debug:
-            logging.debug ('')
-            logging.debug (f'ind_instrume= {ind_instrume:d}')
-            logging.debug (f'ind_koaid= {ind_koaid:d}')
-            logging.debug (f'ind_filehand= {ind_filehand:d}')
-      
-        if (ind_instrume == -1):
-            print ('Column [instrume] is required in the metadata file for downloading data.')
-            return
-            #sys.exit()
-        
-        if (ind_koaid == -1):
-            print ('Column [koaid] is required in the metadata file for downloading data.')
-            return
-            #sys.exit()
-        
-        if (ind_filehand == -1):
-            print ('Column [filehand] is required in the metadata file for downloading data.')
-            return
-            #sys.exit()
-    
-        if (len_tbl == 0):
-            print ('There is no data in the metadata table.')
-            return
-            #sys.exit()
+            return (self.__report_afetch (koaids, results, debug))
+
+        connector = aiohttp.TCPConnector (limit_per_host=nconcurrent, \
+            ttl_dns_cache=300)
         
-        lev0file = 1 
-        if ('lev0file' in kwargs): 
-            lev0file = kwargs.get('lev0file')
-         
-        calibfile = 0 
-        if ('calibfile' in kwargs): 
-            calibfile = kwargs.get('calibfile')
-         
-        lev1file = 0 
-        if ('lev1file' in kwargs): 
-            lev1file = kwargs.get('lev1file')
-         
-        calibdir = 1 
-        if ('calibdir' in kwargs): 
-            calibdir = kwargs.get('calibdir')
-         
+        timeout = aiohttp.ClientTimeout (total=None, sock_read=60)
+
+        trace = aiohttp.TraceConfig ()
+        trace.on_request_start.append (limiter.on_request_start)
+        trace.on_request_end.append (limiter.on_request_end)
+
+        async with aiohttp.ClientSession (connector=connector, \
+            timeout=timeout, cookies=cookies, \
+            trace_configs=[trace]) as session:
+
+            results = await asyncio.gather ( \
+                *[self.__afetch (session, sem, url, filepath) \
+                for url, filepath in zip (urls, filepaths)], \
+                return_exceptions=True)
+
+        return (self.__report_afetch (koaids, results, debug))
+#
+#} end Archive.adownload
+#
+
+
+    def __report_afetch (self, koaids, results, debug):
+#
+#{ Archive.__report_afetch
+#
+        """
+        '__report_afetch' prints the download errors gathered by adownload
+        and the total count of lev0 files downloaded.
+        """
+
+        ndnloaded_lev0 = 0
+        for koaid, result in zip (koaids, results):
+
+            if isinstance (result, Exception):
+                print (f'File [{koaid:s}] download error: {str(result):s}')
+            else:
+                ndnloaded_lev0 = ndnloaded_lev0 + 1
+
         if debug:
-            logging.debug ('')
-            logging.debug (f'lev0file= {lev0file:d}')
-            logging.debug (f'calibfile= {calibfile:d}')
-            logging.debug (f'lev1file= {lev1file:d}')
-            logging.debug (f'calibdir= {calibdir:d}')
+            _log.debug ('\n%d lev0 files downloaded.', ndnloaded_lev0)
+
+        print ('')
+        print (f'A total of {ndnloaded_lev0:d} new lev0 FITS files downloaded.')
+        return
+#
+#} end Archive.__report_afetch
+#
 
+
+    async def __afetch (self, session, sem, url, filepath):
+#
+#{ Archive.__afetch
+#
         """
-        if ((lev0file == 0) and \
-            (lev1file == 0) and \
-            (calibfile == 0)):
-            
-            print ('Please choose which types of data you wish to download: lev0file, lev1file, and calibfile, more than one choice is allowed.')
-            return
+        '__afetch' is the asyncio version of __submit_request, for an 
+        aiohttp session or an httpx client (whose transfers are streams 
+        multiplexed over its HTTP/2 connection): it streams one file to 
+        filepath, holding the semaphore while the transfer is in progress;
+        429 and 5xx replies are retried with an exponential backoff 
+        (honouring Retry-After) before giving up.
         """
 
-        srow = 0;
-        erow = len_tbl - 1
+        ntry = 0
+        maxtry = 5
+
+        async with sem:
 
-        if ('start_row' in kwargs): 
-            srow = kwargs.get('start_row')
+            while True:
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'srow= {srow:d}')
-     
-        if ('end_row' in kwargs): 
-            erow = kwargs.get('end_row')
-        
-        if debug:
-            logging.debug ('')
-            logging.debug (f'erow= {erow:d}')
-     
-        if (srow < 0):
-            srow = 0 
-        if (erow > len_tbl - 1):
-            erow = len_tbl - 1 
- 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'srow= {srow:d}')
-            logging.debug (f'erow= {erow:d}')
-     
+                async with _AsyncGet (session, url) as \
+                    (status_code, headers, chunks):
+
+                    if (((status_code == 429) or (status_code >= 500)) \
+                        and (ntry < maxtry)):
+
+                        delay = 0.5 * (2 ** ntry)
+                        
+                        retry_after = headers.get ('Retry-After')
+                        if ((retry_after is not None) and \
+                            retry_after.isdigit()):
+                            delay = max (delay, int(retry_after))
+
+                        ntry = ntry + 1
+                        await asyncio.sleep (delay)
+                        continue
+
+                    if (status_code != 200):
+                        raise Exception ('Failed to submit the request')
 
+                    content_type = headers.get ('Content-Type', '')
+                    
+                    body = None
+                    if (content_type == 'application/json'):
 #
-#    create outdir for lev0, lev1, calib data if it doesn't exist
+#    a json structure: might be error message
 #
-#    decimal mode work for both python2.7 and python3;
+                        body = b''.join ([chunk async for chunk in chunks])
+                        jsondata = _json.loads (body)
+
+                        status = jsondata.get ('status', '')
+                        msg = jsondata.get ('msg', '')
+                        
+                        errmsg = jsondata.get ('error', '')
+                        if (len(errmsg) > 0):
+                            status = 'error'
+                            msg = errmsg
+
+                        if (status == 'error'):
+                            raise Exception (msg)
+
+                    partpath = filepath + '.part'
+                    
+                    try:
+                        with open (partpath, 'wb', \
+                            buffering=_DOWNLOAD_CHUNK) as fd:
+
+                            if (body is not None):
+                                fd.write (body)
+                            else:
+                                async for chunk in chunks:
+                                    fd.write (chunk)
+                            
+                            _drop_cache (fd)
+		
+                        os.replace (partpath, filepath)
+                    
+                    except Exception as e:
+
+                        _discard (partpath)
+
+                        msg = 'Failed to save returned data to file: %s' \
+                            % filepath
+                        raise Exception (msg)
+
+                    return
 #
-#    0755 also works for python 2.7 but not python3
-#  
-#    convert octal 0775 to decimal: 493 
+#} end Archive.__afetch
 #
-        d1 = int ('0775', 8)
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'd1= {d1:d}')
+
+    def __read_metadata (self, metapath, format, **kwargs):
 #
-#    lev0 subdir 
+#{ Archive.__read_metadata
 #
-        outdir_lev0 = outdir
-        if (lev0file == 1):
-            outdir_lev0 = outdir + '/lev0'
-            
-        try:
-            os.makedirs (outdir_lev0, mode=d1, exist_ok=True) 
+        """
+        '__read_metadata' reads the metadata table given to the download 
+        methods into an astropy table and locates the instrume, koaid, and 
+        filehand columns required for downloading the data.
 
-        except Exception as e:
-            
-            msg = f'Failed to create {outdir:s}: {str(e):s}'
-            print (msg)
-            return
-            #sys.exit()
-   
-        if debug:
-            logging.debug ('')
-            logging.debug ('returned os.makedirs for lev0 data subdir') 
+        It returns the astropy table and the indices of the three columns; 
+        an exception is raised if the table cannot be read, if any of the 
+        three columns is missing, or if the table is empty.
+
+        When start_row or end_row is given for a csv/tsv table, only that 
+        window of rows and the three columns are read.
+        """
+
+        debug = 0
+        
+        if ('debug' in kwargs):
+            debugstr = kwargs.get ('debug')
+            debug = int(debugstr)
+
+        fmt_astropy = _FMT_MAP.get (format, format)
 
 #
-#    lev1 subdir 
+#    read metadata to astropy table
 #
-        outdir_lev1 = outdir
-        if (lev1file == 1):
-            outdir_lev1 = outdir + '/lev1'
-            
+        astropytbl = None
         try:
-            os.makedirs (outdir_lev1, mode=d1, exist_ok=True) 
-
-        except Exception as e:
+            if (format == 'votable'):
+                astropytbl = self.__read_votable (metapath)
             
-            msg = f'Failed to create {outdir:s}: {str(e):s}'
-            print (msg)
-            return
-
-        if debug:
-            logging.debug ('')
-            logging.debug ('returned os.makedirs for lev1 data subdir') 
-
+            elif (format == 'ipac'):
 #
-#    calib subdir 
+#    astropy has no C reader for IPAC tables; skip format guessing at least
 #
-        outdir_calib = outdir
-        if (calibfile == 1):
+                astropytbl = Table.read (metapath, format=fmt_astropy, \
+                    guess=False)
             
-            if (lev0file == 0):
-                outdir_calib = outdir + '/calib'
+            elif ((format in ('csv', 'tsv')) and \
+                (('start_row' in kwargs) or ('end_row' in kwargs))):
+#
+#    a row window of a csv/tsv table: stream the file and keep only the 
+#    three columns used for downloading and the rows inside the window
+#
+                astropytbl = self.__read_delimited (metapath, format, \
+                    kwargs.get ('start_row', 0), kwargs.get ('end_row'))
             else:
-                if (calibdir == 1):
-                    outdir_calib = outdir + '/calib'
-                else:
-                    outdir_calib = outdir + '/lev0'
+                astropytbl = Table.read (metapath, format=fmt_astropy, \
+                    guess=False, fast_reader={'use_fast_converter': True})
+        
+        except Exception as e:
+            msg = 'Failed to read metadata table to astropy table:' + \
+                str(e) 
+            raise Exception (msg)
 
-        try:
-            os.makedirs (outdir_calib, mode=d1, exist_ok=True) 
+        len_tbl = astropytbl.meta.get ('nrows', len(astropytbl))
 
-        except Exception as e:
-            
-            msg = f'Failed to create {outdir:s}: {str(e):s}'
-            print (msg)
-            return
+        if debug:
+            _log.debug ('\nastropytbl read\nlen_tbl= %d', len_tbl)
+
+        
+        colnames = astropytbl.colnames
 
         if debug:
-            logging.debug ('')
-            logging.debug ('returned os.makedirs for calib data subdir') 
+            _log.debug ('\ncolnames:\n%s', colnames)
+  
+        len_col = len(colnames)
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'outdir_lev0= {outdir_lev0:s}')
-            logging.debug (f'outdir_lev1= {outdir_lev1:s}')
-            logging.debug (f'outdir_calib= {outdir_calib:s}')
+            _log.debug ('\nlen_col= %d', len_col)
 
+ 
 #
-#    urls for nph-getKoa, and nph-getCaliblist
+#    one pass over the column names: lowercase name -> index
 #
-        self.getkoa_url = self.baseurl + \
-            'cgi-bin/getKOA/nph-getKOA?return_mode=json&'
-        self.caliblist_url = self.baseurl + \
-            'cgi-bin/KoaAPI/nph-getCaliblist?'
-        self.lev1list_url = self.baseurl + 'cgi-bin/KoaAPI/nph-getL1list?'
+        name_to_idx = {name.lower(): i for i, name in enumerate (colnames)}
 
+        ind_instrume = name_to_idx.get ('instrume', \
+            name_to_idx.get ('instrument', -1))
+        ind_koaid = name_to_idx.get ('koaid', -1)
+        ind_filehand = name_to_idx.get ('filehand', -1)
+             
         if debug:
-            logging.debug ('')
-            logging.debug (f'getkoa_url= {self.getkoa_url:s}')
-            logging.debug (f'caliblist_url= {self.caliblist_url:s}')
-
-
-        instrument = '' 
-        koaid = ''
-        filehand = ''
-        ndnloaded_lev0 = 0
-        
-        nlev1list = 0
-        ndnloaded_lev1 = 0
-        
-        ncaliblist = 0
-        ndnloaded_calib = 0
+            _log.debug ('\nind_instrume= %d' \
+                '\nind_koaid= %d' \
+                '\nind_filehand= %d', \
+                ind_instrume, ind_koaid, ind_filehand)
       
-        nfile = erow - srow + 1   
-        
-        print (f'Start downloading {nfile:d} koaid data you requested;')
-        print (f'please check your outdir: {outdir:s} for  progress ....')
- 
-        for l in range (srow, erow+1):
-        #
-        #{ for loop for download all files (lev0, lev1, calib)
-        #
-            if debug:
-                logging.debug ('')
-                logging.debug (f'l= {l:d}')
-                logging.debug ('')
-                logging.debug ('astropytbl[l]= ')
-                logging.debug (astropytbl[l])
-                logging.debug ('instrument= ')
-                logging.debug (astropytbl[l][ind_instrume])
-
-            instrument = astropytbl[l][ind_instrume]
-            koaid = astropytbl[l][ind_koaid]
-            filehand = astropytbl[l][ind_filehand]
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug ('type(instrument)= ')
-                logging.debug (type(instrument))
-                logging.debug (type(instrument) is bytes)
-            
-            if (type (instrument) is bytes):
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('bytes: decode')
-
-                instrument = instrument.decode("utf-8")
-                koaid = koaid.decode("utf-8")
-                filehand = filehand.decode("utf-8")
-           
-            ind = -1
-            ind = instrument.find ('HIRES')
-            if (ind >= 0):
-                instrument = 'HIRES'
-            
-            ind = -1
-            ind = instrument.find ('LRIS')
-            if (ind >= 0):
-                instrument = 'LRIS'
- 
-            ind = -1
-            ind = instrument.find ('NIRS')
-            if (ind >= 0):
-                instrument = 'NIRSPEC'
-  
-            if debug:
-                logging.debug ('')
-                logging.debug (f'l= {l:d} koaid= {koaid:s}')
-                logging.debug (f'filehand= {filehand:s}')
-                logging.debug (f'instrument= {instrument:s}')
-
-            #
-            #   get lev0 files
-            #
-            if (lev0file == 1):
-            
-                url = self.getkoa_url + 'filehand=' + filehand
-                filepath = outdir_lev0 + '/' + koaid
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'filepath= {filepath:s}')
-                    logging.debug (f'url= {url:s}')
+        missing = [name for name, ind in (('instrume', ind_instrume), \
+            ('koaid', ind_koaid), ('filehand', ind_filehand)) if (ind == -1)]
 
-                #
-                #    if file doesn't exist: download
-                #
-                isExist = os.path.exists (filepath)
-	    
-                if (not isExist):
+        if (len(missing) > 0):
+            raise Exception ('Column [' + missing[0] + '] is required ' + \
+                'in the metadata file for downloading data.')
+    
+        if (len_tbl == 0):
+            raise Exception ('There is no data in the metadata table.')
 
-                    try:
-                        self.__submit_request (url, filepath, cookiejar)
-                        ndnloaded_lev0 = ndnloaded_lev0 + 1
+        return (astropytbl, ind_instrume, ind_koaid, ind_filehand)
+#
+#} end Archive.__read_metadata
+#
 
-                        msg =  'Returned file written to: ' + filepath   
-           
-                        if debug:
-                            logging.debug ('')
-                            logging.debug ('returned __submit_request')
-                            logging.debug (f'self.msg= {msg:s}')
-            
-                    except Exception as e:
-                        print (f'File [{koaid:s}] download error: {str(e):s}')
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'ndnloaded_lev0= {ndnloaded_lev0:d}')
-            
+    def __read_delimited (self, metapath, format, srow, erow):
+#
+#{ Archive.__read_delimited
+#
+        """
+        '__read_delimited' streams a csv or tsv metadata file and returns 
+        an astropy table holding only the instrume, koaid, and filehand 
+        columns of rows srow to erow (to the end if erow is None).
 
-            if (lev1file == 1):
-            #
-            # { if leve1file == 1   
-            #
-                if ((instrument.lower() != "nirc2") and \
-                    (instrument.lower() != "osiris") and \
-                    (instrument.lower() != "lws") and \
-                    (instrument.lower() != "hires") and \
-                    (instrument.lower() != "nirspec")):
-               
-                    if (l == srow):
-                        print (f'Instrument [{instrument:s}] does not have level1 data.')
-                else:
-                #
-                # {   this instrument might have lev1 data
-                #
-                    #
-                    # { get lev1 list 
-                    #
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('lev1file=1: downloading lev1list')
-	  
-                    koaid_base = '' 
-                    ind = -1
-                    ind = koaid.rfind ('.')
-                    if (ind > 0):
-                        koaid_base = koaid[0:ind]
-                    else:
-                        koaid_base = koaid
+        The table meta records the first row read ('row0') and the number 
+        of data rows in the whole file ('nrows').
+        """
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'koaid_base= {koaid_base:s}')
-	    
-                    lev1list = outdir_lev1 + '/' + koaid_base + '.lev1list.json'
-                
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'lev1list= {lev1list:s}')
+        delimiter = ','
+        if (format == 'tsv'):
+            delimiter = '\t'
 
-                    isExist = os.path.exists (lev1list)
-	    
-                    if (not isExist):
+        row0 = max (srow, 0)
 
-                        if debug:
-                            logging.debug ('')
-                            logging.debug ('downloading lev1list')
-	    
-                        url = self.lev1list_url \
-                            + 'instrument=' + instrument \
-                            + '&koaid=' + koaid \
-                            + '&filehand=' + filehand
+        with open (metapath, 'r', newline='') as fp:
+        
+            records = (values for values in \
+                csv.reader (fp, delimiter=delimiter) \
+                if ((len(values) > 0) and \
+                    (not values[0].lstrip().startswith ('#'))))
 
+            colnames = [name.strip() for name in next (records)]
+            
+            keep = [i for i, name in enumerate (colnames) \
+                if (name.lower() in \
+                    ('instrume', 'instrument', 'koaid', 'filehand'))]
 
-                        if debug:
-                            logging.debug ('')
-                            logging.debug (f'lev1list url= {url:s}')
+            nrows = sum (1 for values in itertools.islice (records, row0))
+            
+            window = records
+            if (erow is not None):
+                window = itertools.islice (records, max (erow-row0+1, 0))
 
-                        try:
-                            #self.__submit_request (url, lev1list, cookiejar, \
-                            #    debug=1)
-                            self.__submit_request (url, lev1list, cookiejar)
-                            
-                            nlev1list = nlev1list + 1
+            rows = [[values[i].strip() for i in keep] for values in window]
 
-                            msg =  'Returned file written to: ' + lev1list 
-           
-                            if debug:
-                                logging.debug ('')
-                                logging.debug ('returned __submit_request')
-                                logging.debug (f'msg= {msg:s}')
-                                logging.debug (f'nlev1list= {nlev1list:d}')
-            
-                        except Exception as e:
-                        
-                            msg = 'Failed to get level 1 file list ' \
-                                + 'for koaid: ' + koaid
-                        
-                            print (f'{msg:s}')
-                            print (str(e))
-                        
-                    #
-                    # } end get lev1 list 
-                    #
-                    #
-                    #    check again after lev1list is successfully downloaded, 
-                    #     
-                
-                    nlev1file = 0
-                
-                    isExist = os.path.exists (lev1list)
-                
-                    if (not isExist):
-                        msg = 'Failed to get level 1 data list ' \
-                            + 'for koaid: ' + koaid
-                        
-                        print (f'{msg:s}')
-                
-                    else:
-                    #     
-                    #  extract koaid and nlev1file from json strcuture
-                    #     
-                
-                        jsonData = None
-                        koaid = ''
-                        try:
-                            with open (lev1list) as fp:
-	    
-                                jsonData = json.load (fp) 
-                                koaid = jsonData["input"]["koaid"]
-                                nlev1file = int(jsonData["result"]["nlev1file"])
-                            fp.close() 
-                            
-                        except Exception as e:
-        
-                            if debug:
-                                logging.debug ('')
-                                logging.debug ( \
-                                    f'lev1list: {lev1list:s} load error')
+            nrows += len(rows) + sum (1 for values in records)
 
-                            msg = 'Failed to read ' + lev1list	
-                            print (f'{msg:s}')
-                            fp.close() 
+        astropytbl = Table (rows=rows, names=[colnames[i] for i in keep], \
+            dtype=[str]*len(keep))
 
-                        if debug:
-                            logging.debug ('')
-                            logging.debug (f'koaid= {koaid:s}')
-                            logging.debug (f'nlev1file= {nlev1file:d}')
-  
-                    if (nlev1file == 0):
-                    
-                        if debug:
-                            logging.debug ('')
-                            logging.debug (f'got here:')
-                            logging.debug (f'nlev1file= {nlev1file:d}')
-  
-                        msg = 'No level 1 data found for koaid: [' \
-                            + koaid + ']'
-                    
-                        print (f'{msg:s}')
-                
-                    else:   
-                    #
-                    # { nlev1file > 0: download lev1file
-                    #
-                        if debug:
-                            logging.debug ('')
-                            logging.debug ('list exist: downloading lev1files')
+        astropytbl.meta['row0'] = row0
+        astropytbl.meta['nrows'] = nrows
 
-                    
-                        #if ((instrument.lower() != "hires") or \
-                        #    (instrument.lower() != "nirspec")):
-                        #    print ('')
-                        #    print ( \
-                        #        f'Downloading [{koaid:s}] level 1 files ....')
-                        
-                        #print ('')
-                        #print (f'Downloading [{koaid:s}] level 1 files ....')
-                        
-                        try:
-                            nlev1 = self.__download_lev1files (jsonData, \
-                                cookiejar, outdir_lev1)
-                        
-                            #nlev1 = self.__download_lev1files (jsonData, \
-                            #    cookiejar, outdir_lev1, debug=1)
-                    
-                            if debug:
-                                logging.debug ('')
-                                logging.debug (f'returned __download_lev1files')
-                                logging.debug (f'nlev1= {nlev1:d}')
-                        
-                            ndnloaded_lev1 = ndnloaded_lev1 + nlev1
-                    
-                            if debug:
-                                logging.debug ('')
-                                logging.debug ( \
-                                    f'ndnloaded_lev1= {ndnloaded_lev1:d}')
-                           
-                            msg = str(nlev1) + ' level1 files downloaded ' \
-                                + 'for koaid: [' + koaid + ']'
+        return (astropytbl)
+#
+#} end Archive.__read_delimited
+#
 
-                            if debug:
-                                logging.debug ('')
-                                logging.debug (f'msg= {msg:s}')
-                           
-                            #print (f'{msg:s}')
-         
-                            if debug:
-                                logging.debug ('')
-                                logging.debug ('returned __download_lev1files')
-                                logging.debug (f'{nlev1:d} downloaded')
-                                logging.debug ( \
-                                    f'ndnloaded_lev1= {ndnloaded_lev1:d}')
-                
-                        except Exception as e:
-                
-                            msg = 'Error downloading files in lev1list [' + \
-                                lev1list + ']: ' +  str(e)
-                            print (f'{msg:s}')
-                        
-                            if debug:
-                                logging.debug ('')
-                                logging.debug (f'errmsg= {msg:s}')
 
-                    #
-                    # } download lev1 files
-                    #     
-                #
-                # } end lev1 files dnload for the instrument
-                #     
-            # 
-            #} endif (lev1file == 1):
-            #
-                        
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('done lev1 dnload')
-                    logging.debug (f'ndnloaded= {ndnloaded_lev1:d}')
-                
+    def __column_values (self, astropytbl, ind, srow, erow):
+#
+#{ Archive.__column_values
+#
+        """
+        '__column_values' returns rows srow to erow of column ind of the
+        metadata table as a list of str; a bytes column is decoded in one
+        vectorized numpy call.  Row numbers count from the table's 'row0' 
+        meta when the table holds only a window of the metadata file.
+        """
 
-            if (calibfile == 1):
-            #
-            # {   if calibfile == 1: download calibfile
-            #
-    
-                if debug:
-                    logging.debug ('')
-                    logging.debug ('calibfile=1: downloading calibfiles')
-	    
-                koaid_base = '' 
-                ind = -1
-                ind = koaid.rfind ('.')
-                if (ind > 0):
-                    koaid_base = koaid[0:ind]
-                else:
-                    koaid_base = koaid
+        row0 = astropytbl.meta.get ('row0', 0)
 
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'koaid_base= {koaid_base:s}')
-	    
-                caliblist = outdir_calib + '/' + koaid_base + '.caliblist.json'
-                caliblist_ipac = outdir_calib + '/' + koaid_base + '.caliblist.tbl'
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'caliblist= {caliblist:s}')
-                    logging.debug (f'caliblist_ipac= {caliblist_ipac:s}')
+        col = astropytbl.columns[ind][srow-row0:erow-row0+1]
 
-                #
-                #    download caliblist (json)
-                #
-                isExist = os.path.exists (caliblist)
-	    
-                if (not isExist):
+        if (col.dtype.kind == 'S'):
+            return (np.char.decode (np.asarray (col), 'utf-8').tolist())
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('downloading caliblist')
-	    
-                    url = self.caliblist_url \
-                        + 'instrument=' + instrument \
-                        + '&koaid=' + koaid
+        values = col.tolist()
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'caliblist url= {url:s}')
+        return ([v.decode ('utf-8') if (type (v) is bytes) else v \
+            for v in values])
+#
+#} end Archive.__column_values
+#
 
-                    try:
-                        self.__submit_request (url, caliblist, cookiejar)
-                        ncaliblist = ncaliblist + 1
 
-                        msg =  'Returned file written to: ' + caliblist   
-           
-                        if debug:
-                            logging.debug ('')
-                            logging.debug ('returned __submit_request')
-                            logging.debug (f'msg= {msg:s}')
-            
-                    except Exception as e:
-                        #print (f'File [{caliblist:s}] download: {str(e):s}')
-                        #msg = 'Error downloading caliblist [' + \
-                        #    caliblist + ']:' + str(e)
-                        
-                        msg = 'No associated calibration list for ' + \
-                            koaid
-                        print (f'{msg:s}')
-                        continue 
-                         
+    def __read_votable (self, metapath):
+#
+#{ Archive.__read_votable
+#
+        """
+        '__read_votable' streams a VOTable metadata file through lxml's
+        iterparse and keeps only the columns the download methods use 
+        (instrume/instrument, koaid, and filehand).  Each row element is 
+        cleared as soon as its values are taken, so memory stays flat 
+        however long the table is.
+
+        A table that is not serialized as TABLEDATA (e.g. BINARY) yields
+        no rows here and is handed to astropy's VOTable reader instead.
+        """
 
-                #
-                #    download caliblist_ipac
-                #
-                isExist = os.path.exists (caliblist_ipac)
-	    
-                if (not isExist):
+        wanted = ('instrume', 'instrument', 'koaid', 'filehand')
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('downloading caliblist_ipac')
-	    
-                    url = self.caliblist_url \
-                        + 'instrument=' + instrument \
-                        + '&koaid=' + koaid + '&format=ipac'
+        names = []
+        keep = None
+        rows = []
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug (f'caliblist_ipac url= {url:s}')
+        context = etree.iterparse (metapath, events=('end',), \
+            tag=('{*}FIELD', '{*}TR', '{*}TABLE'))
 
-                    try:
-                        self.__submit_request (url, caliblist_ipac, cookiejar)
-                        msg =  'Returned file written to: ' + caliblist_ipac   
-           
-                        if debug:
-                            logging.debug ('')
-                            logging.debug ('returned __submit_request')
-                            logging.debug (f'msg= {msg:s}')
-            
-                    except Exception as e:
-                        #print (f'File [{caliblist:s}] download: {str(e):s}')
-                        #msg = 'Error downloading caliblist_ipac [' + \
-                        #    caliblist_ipac + ']:' + str(e)
-                        
-                        msg = 'No associated calibration list for ' + \
-                            koaid
-                        print (f'{msg:s}')
-                        continue 
-                         
-
-#
-#    check again after caliblist is successfully downloaded, if caliblist 
-#    exists: download calibfiles
-#     
-                isExist = os.path.exists (caliblist)
-                                  
-                if (isExist):
-                #
-                #{ download_calibfiles:
-                #
+        for event, elem in context:
 
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('list exist: downloading calibfiles')
-	   
-                    #if ((instrument.lower() != "hires") or \
-                    #    (instrument.lower() != "nirspec")):
-                    #    print ('')
-                    #    print ( \
-                    #        f'Downloading [{koaid:s}] calibration files ....')
-                    
-                    #print ('')
-                    #print (f'Downloading [{koaid:s}] calibration files ....')
-                        
-                    try:
-                        #ncalibs = self.__download_calibfiles ( \
-                        #    caliblist, cookiejar, outdir_calib)
-                        
-                        ncalibs = self.__download_calibfiles ( \
-                            caliblist, cookiejar, outdir_calib, deubg=1)
-                        ndnloaded_calib = ndnloaded_calib + ncalibs
-                
-                        if debug:
-                            logging.debug ('')
-                            logging.debug ('returned __download_calibfiles')
-                            logging.debug (f'{ncalibs:d} downloaded')
+            tag = etree.QName (elem).localname
 
-                        msg = str(ncalibs) + ' calibration files downloaded ' \
-                            + 'for koaid: [' + koaid + ']'
-                        #print (msg)
+#
+#    only the first table is read, as astropy does
+#
+            if (tag == 'TABLE'):
+                break
 
-                    except Exception as e:
-                
-                        msg = 'Error downloading files in caliblist [' + \
-                            filepath + ']: ' +  str(e)
-                        
-                        if debug:
-                            logging.debug ('')
-                            logging.debug (f'errmsg= {msg:s}')
-                
-                #
-                #} endif (download_calibfiles):
-                #
-            # 
-            #} endif (calibfile == 1):
-            #
+            if (tag == 'FIELD'):
+                names.append (elem.get ('name', ''))
             
-        #
-        #}        endfor l in range (srow, erow+1)
-        #
+            else:
+                if (keep is None):
+                    keep = [i for i in range (len(names)) \
+                        if (names[i].lower() in wanted)]
 
-        if debug:
-            logging.debug ('')
-            logging.debug (f'{len_tbl:d} files in the table;')
-            logging.debug (f'{ndnloaded_lev0:d} lev0 files downloaded.')
-            logging.debug (f'{nlev1list:d} lev1list downloaded.')
-            logging.debug (\
-                f'{ndnloaded_lev1:d} lev1files downloaded.')
-            logging.debug (f'{ncaliblist:d} calibration list downloaded.')
-            logging.debug (\
-                f'{ndnloaded_calib:d} calibration files downloaded.')
-        #
-        #    print out total count of downloaded files
-        #
-        print ('')
-        if (lev0file == 1):
-            print (f'A total of {ndnloaded_lev0:d} new lev0 FITS files downloaded.')
- 
-        if (lev1file == 1):
-            
-            if ((instrument.lower() == "nirc2") or \
-                (instrument.lower() == "osiris") or \
-                (instrument.lower() == "lws") or \
-                (instrument.lower() == "hires") or \
-                (instrument.lower() == "nirspec")):
-               
-                print (f'{nlev1list:d} new lev1 list downloaded.')
-                print (f'{ndnloaded_lev1:d} new lev1 files downloaded.')
-        
-        if (calibfile == 1):
-            print (f'{ncaliblist:d} new calibration list downloaded.')
-            print (f'{ndnloaded_calib:d} new calibration FITS files downloaded.')
-        return
+                values = [(td.text or '').strip() \
+                    for td in elem.iterchildren ('{*}TD')]
+
+                rows.append ([values[i] for i in keep])
+
+            elem.clear()
+            while (elem.getprevious() is not None):
+                del elem.getparent()[0]
+
+        del context
+
+        if (len(rows) == 0):
+            return (Table.read (metapath, format='votable'))
+
+        return (Table (rows=rows, names=[names[i] for i in keep]))
 #
-#} end Archive.download
+#} end Archive.__read_votable
 #
     
 
@@ -3647,10 +4893,17 @@ class Archive:
             debugstr = kwargs.get ('debug')
             debug = int(debugstr)
    
+#
+#    msgs: a list collecting the error messages instead of printing them
+#
+        msgs = None
+        if ('msgs' in kwargs):
+            msgs = kwargs.get ('msgs')
+
         if debug:
-            logging.debug ('')
-            logging.debug (f'Enter __download_lev1files:')
-            logging.debug (f'outdir_lev1= {outdir_lev1:s}')
+            _log.debug ('\nEnter __download_lev1files:' \
+                '\noutdir_lev1= %s', \
+                outdir_lev1)
 
 #
 #    read input lev1list JSON file
@@ -3662,12 +4915,12 @@ class Archive:
         lev1subdir_prefix = jsonData["result"]["lev1subdir_prefix"]
                 
         if debug:
-            logging.debug ('')
-            logging.debug (f'lev1subdir_prefix= {lev1subdir_prefix:s}')
-            logging.debug (f'instrument= {instrument:s}')
-            logging.debug (f'koaid= {koaid:s}')
-            logging.debug (f'filehand= {filehand:s}')
-            logging.debug (f'nlev1file= {nlev1file:d}')
+            _log.debug ('\nlev1subdir_prefix= %s' \
+                '\ninstrument= %s' \
+                '\nkoaid= %s' \
+                '\nfilehand= %s' \
+                '\nnlev1file= %d', \
+                lev1subdir_prefix, instrument, koaid, filehand, nlev1file)
         
         data = ''
         if ((instrument.lower() == 'nirc2') or \
@@ -3682,16 +4935,14 @@ class Archive:
             data = jsonData["result"]["data"]
                     
         if debug:
-            logging.debug ('')
-            logging.debug (f'data:')
-            logging.debug (data)
+            _log.debug ('\ndata:\n%s', data)
 
 
 #
 #    retrieve koaid from lev1list json structure and download files
 #
         if debug:
-            logging.debug ('Start downloading from lev1list:')
+            _log.debug ('Start downloading from lev1list:')
         
 
         filehand_lev1 = ''
@@ -3708,27 +4959,28 @@ class Archive:
         # { if n2, os, lw
         #
             if debug:
-                logging.debug ('here0')
+                _log.debug ('here0')
             
             if debug:
-                logging.debug (f'nlev1file= {nlev1file:d}')
+                _log.debug ('nlev1file= %d', nlev1file)
 
             for ind in range (nlev1file):
 
                 if debug:
-                    logging.debug (f'downloadlev1files: ind= {ind:d}')
+                    _log.debug ('downloadlev1files: ind= %d', ind)
 
                 lev1file = data[ind]
                 filehand_lev1 = lev1subdir_prefix + '/' + lev1file 
   
                 if debug:
-                    logging.debug (f'lev1file= {lev1file:s}')
-                    logging.debug (f'filehand_lev1= {filehand_lev1:s}')
+                    _log.debug ('lev1file= %s' \
+                        '\nfilehand_lev1= %s', \
+                        lev1file, filehand_lev1)
 
                 filepath = outdir_lev1 + '/' + lev1file 
             
                 if debug:
-                    logging.debug (f'filepath= {filepath:s}')
+                    _log.debug ('filepath= %s', filepath)
 
                 
 #
@@ -3738,17 +4990,16 @@ class Archive:
 	    
                 if (isExist):
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'isExist: {isExist:d}: skip')
+                        _log.debug ('\nisExist: %d: skip', isExist)
                      
                     continue
               
-                url = self.baseurl + 'cgi-bin/KoaAPI/nph-dnloadL1data?' \
-                    + 'instrument=' + instrument + '&koaid=' + koaid \
-                    + '&filehand=' + filehand_lev1
+                url = f'{self.baseurl}cgi-bin/KoaAPI/nph-dnloadL1data?' \
+                    f'instrument={instrument}&koaid={koaid}' \
+                    f'&filehand={filehand_lev1}'
                  
                 if debug:
-                    logging.debug (f'url= {url:s}')
+                    _log.debug ('url= %s', url)
 
                 try:
                     self.__submit_request (url, filepath, cookiejar)
@@ -3757,20 +5008,24 @@ class Archive:
                     msg = 'lev1 file [' + filepath + '] downloaded.'
 
                     if debug:
-                        logging.debug ('')
-                        logging.debug ('returned __submit_request')
-                        logging.debug (f'msg: {msg:s}')
-                        logging.debug (f'nrec_total= {nrec_total:d}')
+                        _log.debug ('\nreturned __submit_request' \
+                            '\nmsg: %s' \
+                            '\nnrec_total= %d', \
+                            msg, nrec_total)
             
             
                 except Exception as e:
                 
-                    print (f'lev1 file download error: {str(e):s}')
+                    msg = f'lev1 file download error: {str(e):s}'
+                    if (msgs is None):
+                        print (msg)
+                    else:
+                        msgs.append (msg)
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'instrument: {instrument:s}')
-                logging.debug (f'{nrec_total:d} files downloaded.')
+                _log.debug ('\ninstrument: %s' \
+                    '\n%d files downloaded.', \
+                    instrument, nrec_total)
             
         #
         # } end if (n2,lws,os)
@@ -3784,9 +5039,9 @@ class Archive:
             nsubdir = len (data)
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'nsubdir= {nsubdir:d}')
-                logging.debug (f'lev1subdir_prefix= {lev1subdir_prefix:s}')
+                _log.debug ('\nnsubdir= %d' \
+                    '\nlev1subdir_prefix= %s', \
+                    nsubdir, lev1subdir_prefix)
             
             lev1filepath = ''
             subdir = ''
@@ -3803,11 +5058,11 @@ class Archive:
                 nrec = len (lev1files) 
               
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'l= {l:d} subdir= {subdir:s}')
-                    logging.debug (f'nrec= {nrec:d}')
-                    #logging.debug (f'lev1files=')
-                    #logging.debug (lev1files)
+                    _log.debug ('\nl= %d subdir= %s' \
+                        '\nnrec= %d', \
+                        l, subdir, nrec)
+                    #_log.debug ('lev1files=')
+                    #_log.debug (lev1files)
         
         
                 for i in range (nrec):
@@ -3815,42 +5070,38 @@ class Archive:
 
 
                     if debug:
-                        logging.debug (f'downloadlev1files: i= {i:d}')
+                        _log.debug ('downloadlev1files: i= %d', i)
 
                     lev1file = lev1files[i]
                     
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'lev1file= {lev1file:s}')
+                        _log.debug ('\nlev1file= %s', lev1file)
                     
                     filehand_lev1 = \
                         lev1subdir_prefix + '/' + subdir + '/' + lev1file 
                     
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'filehand_lev1= {filehand_lev1:s}')
+                        _log.debug ('\nfilehand_lev1= %s', filehand_lev1)
                     
                     lev1filepath = outdir_lev1 + '/' + subdir
                     
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'lev1filepath= {lev1filepath:s}')
+                        _log.debug ('\nlev1filepath= %s', lev1filepath)
                     
                     os.makedirs (lev1filepath, mode=d1, exist_ok=True) 
 
                     filepath = lev1filepath + '/'+ lev1file 
             
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'filepath= {filepath:s}')
+                        _log.debug ('\nfilepath= %s', filepath)
 
-                    url = self.baseurl + 'cgi-bin/KoaAPI/nph-dnloadL1data?' \
-                        + 'instrument=' + instrument + '&koaid=' + koaid \
-                        + '&filehand=' + filehand_lev1
+                    url = \
+                        f'{self.baseurl}cgi-bin/KoaAPI/nph-dnloadL1data?' \
+                        f'instrument={instrument}&koaid={koaid}' \
+                        f'&filehand={filehand_lev1}'
                     
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'url= {url:s}')
+                        _log.debug ('\nurl= %s', url)
                      
 #
 #    if file exists, skip
@@ -3859,8 +5110,7 @@ class Archive:
 	    
                     if (isExist):
                         if debug:
-                            logging.debug ('')
-                            logging.debug (f'isExist: {isExist:d}: skip')
+                            _log.debug ('\nisExist: %d: skip', isExist)
                      
                         continue
 
@@ -3871,26 +5121,30 @@ class Archive:
                         nrec_total = nrec_total + 1
 
                         if debug:
-                            logging.debug ('')
-                            logging.debug ('returned __submit_request')
-                            logging.debug (f'msg: {msg:s}')
-                            logging.debug (f'nrec_total= {nrec_total:d}')
+                            _log.debug ('\nreturned __submit_request' \
+                                '\nmsg: %s' \
+                                '\nnrec_total= %d', \
+                                msg, nrec_total)
             
                     except Exception as e:
                 
-                        print (f'error downloading lev1 file {lev1file:s}: {str(e):s}')
+                        msg = f'error downloading lev1 file {lev1file:s}: ' \
+                            + str(e)
+                        if (msgs is None):
+                            print (msg)
+                        else:
+                            msgs.append (msg)
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'instrument: {instrument:s}')
-                logging.debug (f'{nrec_total:d} files downloaded.')
+                _log.debug ('\ninstrument: %s' \
+                    '\n%d files downloaded.', \
+                    instrument, nrec_total)
         
         #
         # } end elif ns, hi
         #
         if debug:
-            logging.debug ('')
-            logging.debug (f'{nrec_total:d} files downloaded.')
+            _log.debug ('\n%d files downloaded.', nrec_total)
 
         return (nrec_total)
 #
@@ -3909,10 +5163,35 @@ class Archive:
             debugstr = kwargs.get ('debug')
             debug = int(debugstr)
     
+#
+#    msgs: a list collecting the error messages instead of printing them;
+#    claims: the _PathClaims of a threaded download;
+#    existing: the set of file paths already in outdir_calib (_list_files);
+#    pool: the ThreadPoolExecutor fetching the files of a threaded download;
+#    revalidate: 1 to send a conditional request for the files on disk
+#
+        msgs = None
+        if ('msgs' in kwargs):
+            msgs = kwargs.get ('msgs')
+    
+        pool = None
+        if ('pool' in kwargs):
+            pool = kwargs.get ('pool')
+    
+        revalidate = 0
+        if ('revalidate' in kwargs):
+            revalidate = int(kwargs.get ('revalidate'))
+    
+        claims = None
+        if ('claims' in kwargs):
+            claims = kwargs.get ('claims')
+    
+        existing = None
+        if ('existing' in kwargs):
+            existing = kwargs.get ('existing')
     
         if debug:
-            logging.debug ('')
-            logging.debug (f'Enter __download_calibfiles: {listpath:s}')
+            _log.debug ('\nEnter __download_calibfiles: %s', listpath)
 
 #
 #    read input caliblist JSON file
@@ -3920,23 +5199,21 @@ class Archive:
         nrec = 0
         data = ''
         try:
-            with open (listpath) as fp:
+#
+#    bytes straight to orjson (json when orjson is not installed)
+#
+            with open (listpath, 'rb') as fp:
 	    
-                jsonData = json.load (fp) 
+                jsonData = _json.loads (fp.read()) 
                 data = jsonData["table"]
 
-            fp.close() 
-
         except Exception as e:
         
             if debug:
-                logging.debug ('')
-                logging.debug (f'caliblist: {caliblist:s} load error')
+                _log.debug ('\ncaliblist: %s load error: %s', listpath, e)
 
             errmsg = 'Failed to read ' + listpath	
 	
-            fp.close() 
-            
             raise Exception (errmsg)
 
             return
@@ -3944,8 +5221,7 @@ class Archive:
         nrec = len(data)
     
         if debug:
-            logging.debug ('')
-            logging.debug (f'downloadCalibfiles: nrec= {nrec:d}')
+            _log.debug ('\ndownloadCalibfiles: nrec= %d', nrec)
 
         if (nrec == 0):
 
@@ -3959,65 +5235,87 @@ class Archive:
 #    retrieve koaid from caliblist json structure and download files
 #
         if debug:
-            logging.debug ('')
-            logging.debug (f'got here: nrec= {nrec:d}')
-
-        ndnloaded = 0
-        for ind in range (nrec):
-
-            if debug:
-                logging.debug (f'downloadCalibfiles: ind= {ind:d}')
+            _log.debug ('\ngot here: nrec= %d', nrec)
 
-            koaid = data[ind]['koaid']
-            instrument = data[ind]['instrument']
-            filehand = data[ind]['filehand']
-            
-            if debug:
-                logging.debug (f'instrument= {instrument:s}')
-                logging.debug (f'koaid= {koaid:s}')
-                logging.debug (f'filehand= {filehand:s}')
+#
+#    one directory listing for the existence checks, unless the caller 
+#    passed its own snapshot
+#
+        if (existing is None):
+            existing = _list_files (outdir_calib)
 
 #
-#   get lev0 files
+#    the url and file path of every file in the list, built in one pass
 #
-            url = self.getkoa_url + 'filehand=' + filehand
-                
-            filepath = outdir_calib + '/' + koaid
-                
+        tasks = [(self.getkoa_url + 'filehand=' + rec['filehand'], \
+            outdir_calib + '/' + rec['koaid']) for rec in data]
+
+        todo = []
+        for url, filepath in tasks:
+
             if debug:
-                logging.debug ('')
-                logging.debug (f'filepath= {filepath:s}')
-                logging.debug (f'url= {url:s}')
+                _log.debug ('\nfilepath= %s\nurl= %s', filepath, url)
 
 #
-#    if file exists, skip
+#    if file exists, skip; with revalidate, a file is only asked for again
+#    when its '.meta' sidecar holds the validators to make it conditional
 #
-            isExist = os.path.exists (filepath)
+            isExist = (filepath in existing)
 	    
-            if (isExist):
+            if (isExist and ((not revalidate) or \
+                ((filepath + '.meta') not in existing))):
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'isExist: {isExist:d}: skip')
+                    _log.debug ('\nisExist: %d: skip', isExist)
                      
                 continue
 
+#
+#    calibration files shared by several rows are fetched by one thread
+#
+            if ((claims is not None) and (not claims.claim (filepath))):
+                continue
+
+            todo.append ((url, filepath))
+
+#
+#    the files are fetched concurrently on the pool of a threaded download
+#    (in this thread otherwise); the results are read in list order
+#
+        futures = None
+        if (pool is not None):
+            futures = [pool.submit (self.__submit_request, url, filepath, \
+                cookiejar, revalidate=revalidate) for url, filepath in todo]
+
+        ndnloaded = 0
+        for ind, (url, filepath) in enumerate (todo):
+
             try:
-                self.__submit_request (url, filepath, cookiejar)
+                if (futures is not None):
+                    modified = futures[ind].result ()
+                else:
+                    modified = self.__submit_request (url, filepath, \
+                        cookiejar, revalidate=revalidate)
+                
+                if not modified:
+                    continue
+
                 ndnloaded = ndnloaded + 1
                 
                 msg = 'calib file [' + filepath + '] downloaded.'
 
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('returned __submit_request')
-                    logging.debug (f'msg: {msg:s}')
+                    _log.debug ('\nreturned __submit_request\nmsg: %s', msg)
             
             except Exception as e:
-                print (f'calib file download error: {str(e):s}')
+                
+                msg = f'calib file download error: {str(e):s}'
+                if (msgs is None):
+                    print (msg)
+                else:
+                    msgs.append (msg)
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'nfnlosfrf= {ndnloaded:d}')
+            _log.debug ('\nnfnlosfrf= %d', ndnloaded)
 
         return (ndnloaded)
 #
@@ -4036,45 +5334,51 @@ class Archive:
             debug = int(debugstr)
 
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter database.__submit_request:')
-            logging.debug (f'url= {url:s}')
-            logging.debug (f'filepath= {filepath:s}')
+            _log.debug ('\nEnter database.__submit_request:' \
+                '\nurl= %s' \
+                '\nfilepath= %s', \
+                url, filepath)
        
             if not (cookiejar is None):  
             
                 for cookie in cookiejar:
                     
-                    if debug:
-                        logging.debug ('')
-                        logging.debug ('cookie saved:')
-                        logging.debug (f'cookie.name= {cookie.name:s}')
-                        logging.debug (f'cookie.value= {cookie.value:s}')
-                        logging.debug (f'cookie.domain= {cookie.domain:s}')
+                    _log.debug ('\ncookie saved:' \
+                        '\ncookie.name= %s' \
+                        '\ncookie.value= %s' \
+                        '\ncookie.domain= %s', \
+                        cookie.name, cookie.value, cookie.domain)
             
-        try:
-            self.response =  requests.get (url, stream=True, cookies=cookiejar)
+#
+#    revalidate: make the request conditional on the validators saved with
+#    the file already on disk
+#
+        revalidate = 0
+        if ('revalidate' in kwargs):
+            revalidate = int(kwargs.get ('revalidate'))
 
-            #self.response =  requests.get (url, cookies=cookiejar, \
-            #    stream=True)
+        headers = {}
+        if revalidate:
+            headers = _load_validators (filepath)
+
+        try:
+            response = self._get_http().get (url, stream=True, \
+                cookies=cookiejar, headers=headers)
 
             if debug:
-                logging.debug ('')
-                logging.debug ('-------------------------------------')
-                logging.debug ('URL:' + url)
-                logging.debug ('Cookiejar type:')
-                logging.debug (type(cookiejar))
+                _log.debug ('\n-------------------------------------' \
+                    '\nURL:%s' \
+                    '\nCookiejar type:' \
+                    '\n%s', \
+                    url, type(cookiejar))
                 
-                logging.debug ('request sent')
-                logging.debug ('done')
-                logging.debug ('')
+                _log.debug ('request sent\ndone\n')
         
         
         except Exception as e:
             
             if debug:
-                logging.debug ('')
-                logging.debug (f'exception: {str(e):s}')
+                _log.debug ('\nexception: %s', e)
 
             msg = 'Failed to submit the request: ' + str(e)
 	    
@@ -4082,104 +5386,65 @@ class Archive:
             return
                        
         if debug:
-            logging.debug ('')
-            logging.debug ('status_code:')
-            logging.debug (self.response.status_code)
+            _log.debug ('\nstatus_code:\n%s', response.status_code)
       
       
-        if (self.response.status_code == 200):
+        if (response.status_code == 304):
+            response.close ()
+
+            if debug:
+                _log.debug ('\nnot modified: %s', filepath)
+            
+            return (False)
+
+        if (response.status_code == 200):
             msg = ''
         else:
-            msg = 'Failed to submit the request'
+            response.close ()
+
+            msg = 'Failed to submit the request: status ' \
+                + str (response.status_code)
 	    
             raise Exception (msg)
             return
                        
         if debug:
-            logging.debug ('')
-            logging.debug ('headers: ')
-            logging.debug (self.response.headers)
+            _log.debug ('\nheaders: \n%s', response.headers)
       
         content_type = ''
         try:
-            content_type = self.response.headers['Content-type']
+            content_type = response.headers['Content-type']
         except Exception as e:
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'exception extract content-type: {str(e):s}')
+                _log.debug ('\nexception extract content-type: %s', e)
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'content_type= {content_type:s}')
+            _log.debug ('\ncontent_type= %s', content_type)
             
 
         if (content_type == 'application/json'):
             
             if debug:
-                logging.debug ('')
-                logging.debug (\
-                    'return is a json structure: might be error message')
+                _log.debug ('\nreturn is a json structure: ' \
+                    'might be error message')
             
-            jsondata = json.loads (self.response.text)
+            jsondata = _json.loads (response.content)
           
             if debug:
-                logging.debug ('')
-                logging.debug ('jsondata:')
-                logging.debug (jsondata)
+                _log.debug ('\njsondata:\n%s', jsondata)
 
  
-            status = ''
-            try: 
-                status = jsondata['status']
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'status= {status:s}')
-
-            except Exception as e:
-
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'get status exception: e= {str(e):s}')
-
-            msg = '' 
-            try: 
-                msg = jsondata['msg']
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'msg= {msg:s}')
-
-            except Exception as e:
-
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'extract msg exception: e= {str(e):s}')
-
-            errmsg = ''        
-            try: 
-                errmsg = jsondata['error']
-                
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'errmsg= {errmsg:s}')
-
-                if (len(errmsg) > 0):
-                    status = 'error'
-                    msg = errmsg
-
-            except Exception as e:
-
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'get error exception: e= {str(e):s}')
-
+            status = jsondata.get ('status', '')
+            msg = jsondata.get ('msg', '')
+            
+            errmsg = jsondata.get ('error', '')
+            if (len(errmsg) > 0):
+                status = 'error'
+                msg = errmsg
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'status= {status:s}')
-                logging.debug (f'msg= {msg:s}')
+                _log.debug ('\nstatus= %s\nmsg= %s', status, msg)
 
 
             if (status == 'error'):
@@ -4190,40 +5455,77 @@ class Archive:
 #    save to filepath
 #
         if debug:
-            logging.debug ('')
-            logging.debug ('save_to_file:')
+            _log.debug ('\nsave_to_file:')
        
+#
+#    copy the raw stream in _DOWNLOAD_CHUNK blocks; decode_content keeps 
+#    the Content-Encoding handling iter_content used to do.  A json reply
+#    has already been read for its status: write the cached content.
+#
+#    A zero-copy os.sendfile from the socket is not possible: Linux only 
+#    sends from a regular file, and the socket carries TLS records and 
+#    chunked or gzip framing, not the bytes of the file.
+#
+#    The data go to a '.part' file renamed into place once complete, so an
+#    interrupted download never leaves a partial file under the final name
+#    for the next run to skip.
+#
+        partpath = filepath + '.part'
+        
         try:
-            with open (filepath, 'wb') as fd:
+            with open (partpath, 'wb', buffering=_DOWNLOAD_CHUNK) as fd:
 
-                for chunk in self.response.iter_content (chunk_size=1024):
-                    fd.write (chunk)
+#
+#    a small reply (as its Content-Length says) is written in one call 
+#
+                length = response.headers.get ('Content-Length', '')
+                
+                if ((content_type == 'application/json') or \
+                    (length.isdigit () and (int(length) < _DOWNLOAD_CHUNK))):
+                    fd.write (response.content)
+                else:
+                    response.raw.decode_content = True
+                    _copy_stream (response.raw, fd)
+                    _drop_cache (fd)
             
+            os.replace (partpath, filepath)
+
             msg =  'Returned file written to: ' + filepath   
 #            print (self.msg)
             
             if debug:
-                logging.debug ('')
-                logging.debug (msg)
+                _log.debug ('\n%s', msg)
 	
         except Exception as e:
 
+            _discard (partpath)
+
             if debug:
-                logging.debug ('')
-                logging.debug (f'exception: {str(e):s}')
+                _log.debug ('\nexception: %s', e)
 
             msg = 'Failed to save returned data to file: %s' % filepath
             
             raise Exception (msg)
             return
 
-        return
+#
+#    the validators are kept for every file, so that a later download with
+#    revalidate=1 can ask for it conditionally
+#
+        try:
+            _save_validators (filepath, response.headers)
+        
+        except OSError as e:
+            if debug:
+                _log.debug ('\nsave validators exception: %s', e)
+
+        return (True)
 #
 #} end Archive.__submit_request
 #
                        
 
-    def __make_query (self, url, **kwargs):
+    def __make_query (self, url, param, **kwargs):
 #
 #{ Archive.__make_query
 #
@@ -4235,25 +5537,22 @@ class Archive:
     
        
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter __make_query:')
-            logging.debug (f'url= {url:s}')
+            _log.debug ('\nEnter __make_query:\nurl= %s', url)
 
         response = None
         try:
-            response = requests.get (url, stream=True)
+            response = self._get_http().get (url + \
+                _query_string (param))
 
             if debug:
-                logging.debug ('')
-                logging.debug ('request sent')
+                _log.debug ('\nrequest sent: %s', response.url)
 
         except Exception as e:
            
             msg = 'Error: ' + str(e)
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\nexception: e= %s', e)
             
             raise Exception (msg)
 
@@ -4261,46 +5560,39 @@ class Archive:
         content_type = response.headers['content-type']
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'content_type= {content_type:s}')
+            _log.debug ('\ncontent_type= %s', content_type)
        
         if (content_type == 'application/json'):
                 
             if debug:
-                logging.debug ('')
-                logging.debug (f'response.text: {response.text:s}')
+                _log.debug ('\nresponse.text: %s', response.text)
 
 #
 #    error message
 #
             try:
-                jsondata = json.loads (response.text)
+                jsondata = _json.loads (response.content)
                  
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('jsondata loaded')
+                    _log.debug ('\njsondata loaded')
                 
                 status = jsondata['status']
                 msg = jsondata['msg']
                 
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'status: {status:s}')
-                    logging.debug (f'msg: {msg:s}')
+                    _log.debug ('\nstatus: %s\nmsg: %s', status, msg)
 
             except Exception:
                 msg = 'returned JSON object parse error'
                 
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('JSON object parse error')
+                    _log.debug ('\nJSON object parse error')
       
                 
             raise Exception (msg)
             
             if debug:
-                logging.debug ('')
-                logging.debug (f'msg= {msg:s}')
+                _log.debug ('\nmsg= %s', msg)
      
         return (response.text)
 #
@@ -4326,6 +5618,11 @@ class objLookup:
     Required input:
 
         object (char):  object name to be resolved
+
+    Optional input:
+
+        session:  a requests.Session whose pooled connection is reused for
+                  the lookup; default is a new connection
     """
 
 
@@ -4356,39 +5653,36 @@ class objLookup:
 
         self.object = object
 
+        session = requests
+        if ('session' in kwargs):
+            session = kwargs.get('session')
+
         if ('debug' in kwargs):
             self.debug = kwargs['debug']
 
         self.url = self.lookupurl + 'location=' + self.object
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'url={self.url:s}')
+            _log.debug ('\nurl=%s', self.url)
 
 
         self.response = None 
         try:
-            self.response = requests.get (self.url, stream=True)
+            self.response = session.get (self.url)
 
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'response:')
-                logging.debug (self.response)
+                _log.debug ('\nresponse:\n%s', self.response)
 
         except Exception as e:
             self.msg = f'submit request exception: {str(e):s}'
             raise Exception (self.msg)
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (
-                f'response.statu_code= {self.response.status_code:d}')
-
-            logging.debug ('response.headers:')
-            logging.debug (self.response.headers)
-
-            logging.debug ('response.text:')
-            logging.debug (self.response.text)
+            _log.debug ('\nresponse.status_code= %d' \
+                '\nresponse.headers:\n%s' \
+                '\nresponse.text:\n%s', \
+                self.response.status_code, self.response.headers, \
+                self.response.text)
 
 
         content_type = ''
@@ -4396,8 +5690,7 @@ class objLookup:
             content_type = self.response.headers['Content-type']
         
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'content_type= {content_type:s}')
+                _log.debug ('\ncontent_type= %s', content_type)
 
         except Exception as e:
             self.msg = f'extract content_type exception: {str(e):s}'
@@ -4406,119 +5699,56 @@ class objLookup:
 
         jsondata = None
         try:
-            jsondata = json.loads (self.response.text)
+            jsondata = _json.loads (self.response.content)
 
         except Exception as e:
             self.msg = f'load jsondata exception: {str(e):s}'
             raise Exception (self.msg)
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('jsondata:')
-            logging.debug (jsondata)
+            _log.debug ('\njsondata:\n%s', jsondata)
 
         
         self.status = ''
         try:
             self.status = jsondata['stat']
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'self.status= {self.status:s}')
+                _log.debug ('\nself.status= %s', self.status)
 
         except Exception as e:
 
             self.msg = f'extract stat exception: {str(e):s}'
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'self.msg= {self.msg:s}')
+                _log.debug ('\nself.msg= %s', self.msg)
             
             raise Exception (self.msg)
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'got here: status= {self.status:s}')
+            _log.debug ('\ngot here: status= %s', self.status)
        
     
         if (self.status.lower() == 'ok'):
 #
 #{  objLookup OK, extract parameters
         
-            try:
-                self.source = jsondata['source']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract source exception: {str(e):s}')
-    
-            try:
-                self.objname = jsondata['objname']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract objname exception: {str(e):s}')
-                
-            try:
-                self.objtype = jsondata['objtype']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract objtype exception: {str(e):s}')
-                
-            try:
-                self.objdesc = jsondata['objdesc']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract objdesc exception: {str(e):s}')
-                
-            try:
-                self.parsename = jsondata['parsename']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract parsename exception: {str(e):s}')
-                
-            try:
-                self.ra2000 = jsondata['ra2000']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract ra2000 exception: {str(e):s}')
-                
-            try:
-                self.dec2000 = jsondata['dec2000']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract dec2000 exception: {str(e):s}')
-                
-            try:
-                self.cra2000 = jsondata['cra2000']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract cra2000 exception: {str(e):s}')
-                
-            try:
-                self.cdec2000 = jsondata['cdec2000']
-            except Exception as e:
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'extract cdec20000 exception: {str(e):s}')
+            for key in ('source', 'objname', 'objtype', 'objdesc', \
+                'parsename', 'ra2000', 'dec2000', 'cra2000', 'cdec2000'):
+                setattr (self, key, jsondata.get (key, ''))
                 
             if self.debug:
-                logging.debug ('')
-                
-                logging.debug (f'dec2000= {self.dec2000:s}')
-                logging.debug (f'source= {self.source:s}')
-                logging.debug (f'objname= {self.objname:s}')
-                logging.debug (f'objtype= {self.objtype:s}')
-                logging.debug (f'objdesc= {self.objdesc:s}')
-                logging.debug (f'parsename= {self.parsename:s}')
-                logging.debug (f'ra2000= {self.ra2000:s}')
-                logging.debug (f'dec2000= {self.dec2000:s}')
-                logging.debug (f'cra2000= {self.cra2000:s}')
-                logging.debug (f'cdec2000= {self.cdec2000:s}')
+                _log.debug ('\ndec2000= %s' \
+                    '\nsource= %s' \
+                    '\nobjname= %s' \
+                    '\nobjtype= %s' \
+                    '\nobjdesc= %s' \
+                    '\nparsename= %s' \
+                    '\nra2000= %s' \
+                    '\ndec2000= %s' \
+                    '\ncra2000= %s' \
+                    '\ncdec2000= %s', \
+                    self.dec2000, self.source, self.objname, self.objtype, \
+                    self.objdesc, self.parsename, self.ra2000, self.dec2000, \
+                    self.cra2000, self.cdec2000)
 
 #
 #}  end objLookup OK, extract parameters
@@ -4532,8 +5762,7 @@ class objLookup:
                 self.msg = jsondata['msg']
                 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'errmsg= {self.msg:s}')
+                    _log.debug ('\nerrmsg= %s', self.msg)
         
             except Exception as e:
 
@@ -4541,8 +5770,7 @@ class objLookup:
                 raise Exception (self.msg)
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('got here3')
+            _log.debug ('\ngot here3')
         
 #
 #}  end extract errmsg
@@ -4593,6 +5821,10 @@ class KoaTap:
     format  -- default 'ipac',
     maxrec  -- maximum records to be returned 
 	       default: -1 or not specified will return all requested records
+
+    session -- a requests.Session whose pooled connections are reused by
+               the job submission, polling and result requests; default 
+               is the pooled session shared by the Archive methods
        
     debug      -- default is no debug written
     """
@@ -4623,25 +5855,29 @@ class KoaTap:
 
 #
 #    koajob contains async job's status;
-#    resulttbl is the result of sync saved an astropy table 
+#    resulttbl is the result of sync saved an astropy table; a result 
+#    saved to resultpath is only read into astropytbl when asked for
 #
         self.koajob = None
-        self.astropytbl = None
+        self._astropytbl = None
+        self._resultpath = ''
+        
+        if ('session' in kwargs):
+            self.session = kwargs.get('session')
+        else:
+            self.session = Archive._get_session()
         
         if ('debug' in kwargs):
             self.debug = kwargs.get('debug') 
  
         if self.debug:
-            logging.debug ('')
-            logging.debug ('')
-            logging.debug ('Enter koatap.init (debug on)')
+            _log.debug ('\n\nEnter koatap.init (debug on)')
                                 
         if ('cookiefile' in kwargs):
             self.cookiepath = kwargs.get('cookiefile')
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'cookiepath= {self.cookiepath:s}')
+            _log.debug ('\ncookiepath= %s', self.cookiepath)
 
         self.request = 'doQuery'
         if ('request' in kwargs):
@@ -4664,10 +5900,10 @@ class KoaTap:
            self.maxrec = kwargs.get('maxrec')
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'url= {self.url:s}')
-            logging.debug (f'cookiepath= {self.cookiepath:s}')
-            logging.debug (f'self.maxrec= {self.maxrec:d}')
+            _log.debug ('\nurl= %s' \
+                '\ncookiepath= %s' \
+                '\nself.maxrec= %d', \
+                self.url, self.cookiepath, self.maxrec)
 
 #
 #    turn on server debug
@@ -4682,37 +5918,40 @@ class KoaTap:
         for key in self.datadict:
 
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'key= {key:s} val= {str(self.datadict[key]):s}')
+                _log.debug ('\nkey= %s val= %s', key, self.datadict[key])
     
         self.datadict['debug'] = 1              
+
+#
+#    the parameters every query starts from, see __new_query
+#
+        self._initdict = dict (self.datadict)
         
         self.cookiejar = http.cookiejar.MozillaCookieJar (self.cookiepath)
-         
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('cookiejar')
-            logging.debug (self.cookiejar)
    
         if (len(self.cookiepath) > 0):
         
+#
+#    the parsed jar is shared with the Archive methods, cached by the 
+#    cookie file's path and mtime (_load_jar)
+#
             try:
-                self.cookiejar.load (ignore_discard=True, ignore_expires=True);
+                self.cookiejar = _load_jar (self.cookiepath, \
+                    os.path.getmtime (self.cookiepath))
             
                 if self.debug:
-                    logging.debug (
-                        'cookie loaded from %s' % self.cookiepath)
+                    _log.debug ('cookie loaded from %s', self.cookiepath)
         
                     for cookie in self.cookiejar:
-                        logging.debug ('cookie:')
-                        logging.debug (cookie)
+                        _log.debug ('cookie:\n%s', cookie)
                         
-                        logging.debug (f'cookie.name= {cookie.name:s}')
-                        logging.debug (f'cookie.value= {cookie.value:s}')
-                        logging.debug (f'cookie.domain= {cookie.domain:s}')
+                        _log.debug ('cookie.name= %s' \
+                            '\ncookie.value= %s' \
+                            '\ncookie.domain= %s', \
+                            cookie.name, cookie.value, cookie.domain)
             except:
                 if self.debug:
-                    logging.debug ('KoaTap: loadCookie exception')
+                    _log.debug ('KoaTap: loadCookie exception')
  
                 self.msg = 'Error: failed to load cookie file.'
                 raise Exception (self.msg) 
@@ -4721,6 +5960,68 @@ class KoaTap:
 #
 #} end KoaTap.init
 #
+
+
+    @property
+    def astropytbl (self):
+#
+#{ KoaTap.astropytbl
+#
+        """
+        'astropytbl' is the result as an astropy table.  A result written
+        to an outpath is not parsed by save_data: the file is read here 
+        the first time the table is asked for.
+        """
+
+        if ((self._astropytbl is None) and (len(self._resultpath) > 0)):
+            
+            if (self.format == 'votable'):
+                self._astropytbl = \
+                    parse_single_table (self._resultpath).to_table ()
+            else:
+                self._astropytbl = Table.read (self._resultpath, \
+                    format=_FMT_MAP.get (self.format, 'votable'))
+
+        return (self._astropytbl)
+
+
+    @astropytbl.setter
+    def astropytbl (self, table):
+
+        self._astropytbl = table
+        self._resultpath = ''
+#
+#} end KoaTap.astropytbl
+#
+
+
+    def __new_query (self):
+#
+#{ KoaTap.__new_query
+#
+        """
+        '__new_query' clears what the previous query left in a KoaTap that
+        Archive reuses (_get_tap): its job, response, result table and 
+        query parameters, so that a failed query never shows the result 
+        of the one before.
+        """
+
+        self.response = None
+        self.response_result = None
+        self.koajob = None
+        
+        self._astropytbl = None
+        self._resultpath = ''
+
+        self.datadict = dict (self._initdict)
+
+        self.status = ''
+        self.msg = ''
+        
+        return
+#
+#} end KoaTap.__new_query
+#
        
 
     def send_async (self, query, **kwargs):
@@ -4734,18 +6035,22 @@ class KoaTap:
             debug = kwargs.get('debug') 
  
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter send_async:')
+            _log.debug ('\nEnter send_async:')
  
+        self.__new_query ()
+
+        if (len(query) == 0):
+            self.status = 'error'
+            self.msg = 'Failed to find required input parameter: query'
+            return (self.msg)
+
         self.async_job = 1
         self.sync_job = 0
 
         url = self.url + '/async'
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'url= {url:s}')
-            logging.debug (f'query= {query:s}')
+            _log.debug ('\nurl= %s\nquery= %s', url, query)
 
         self.datadict['query'] = query 
 
@@ -4757,8 +6062,7 @@ class KoaTap:
             self.datadict['format'] = self.format              
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'format= {self.format:s}')
+                _log.debug ('\nformat= %s', self.format)
             
         if ('maxrec' in kwargs):
             
@@ -4766,8 +6070,7 @@ class KoaTap:
             self.datadict['maxrec'] = self.maxrec              
             
             if debug:
-                logging.debug ('')
-                logging.debug (f'maxrec= {self.maxrec:d}')
+                _log.debug ('\nmaxrec= %d', self.maxrec)
         
         if ('propflag' in kwargs):
             
@@ -4775,48 +6078,37 @@ class KoaTap:
             self.datadict['propflag'] = self.propflag              
             
             if debug:
-                logging.debug ('')
-                logging.debug (f'propflag= {self.propflag:d}')
+                _log.debug ('\npropflag= %d', self.propflag)
         
-        self.oupath = ''
+        self.outpath = ''
         if ('outpath' in kwargs):
             self.outpath = kwargs.get('outpath')
   
+        cookies = None
+        if (len(self.cookiepath) > 0):
+            cookies = self.cookiejar
+  
         try:
-
-            if (len(self.cookiepath) > 0):
-        
-                self.response = requests.post (url, data= self.datadict, \
-	            cookies=self.cookiejar, allow_redirects=False)
-            else: 
-                self.response = requests.post (url, data= self.datadict, \
-	            allow_redirects=False)
+            self.response = self.session.post (url, data=self.datadict, \
+                cookies=cookies, allow_redirects=False, \
+                timeout=(conf.timeout, None))
 
             if debug:
-                logging.debug ('')
-                logging.debug ('request sent')
+                _log.debug ('\nrequest sent')
 
         except Exception as e:
-           
-            self.status = 'error'
-            self.msg = str(e)
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            return (self.msg)
+            return (_fail (self, e, debug))
 
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'status_code= {self.response.status_code:d}')
-            logging.debug ('self.response: ')
-            logging.debug (self.response)
-            logging.debug ('self.response.headers: ')
-            logging.debug (self.response.headers)
-            logging.debug ('')
-            logging.debug (f'status_code= {self.response.status_code:d}')
+            _log.debug ('\nstatus_code= %d' \
+                '\nself.response: ' \
+                '\n%s' \
+                '\nself.response.headers: ' \
+                '\n%s' \
+                '\n\nstatus_code= %d', \
+                self.response.status_code, self.response, \
+                self.response.headers, self.response.status_code)
             
 #
 # {   if status_code != 303: probably error message
@@ -4824,17 +6116,16 @@ class KoaTap:
         if (self.response.status_code != 303):
             
             if debug:
-                logging.debug ('')
-                logging.debug ('case: not re-direct')
+                _log.debug ('\ncase: not re-direct')
        
             self.content_type = self.response.headers['Content-type']
             self.encoding = self.response.encoding
         
             if debug:
-                logging.debug ('')
-                logging.debug (f'content_type= {self.content_type:s}')
-                logging.debug ('encoding= ')
-                logging.debug (self.encoding)
+                _log.debug ('\ncontent_type= %s' \
+                    '\nencoding= ' \
+                    '\n%s', \
+                    self.content_type, self.encoding)
 
 
             data = None
@@ -4842,32 +6133,28 @@ class KoaTap:
             self.msg = ''
            
             if debug:
-                logging.debug ('')
-                logging.debug ('self.response:')
-                logging.debug (self.response.text)
+                _log.debug ('\nself.response:\n%s', self.response.text)
       
             if (self.content_type == 'application/json'):
                 
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('case json errmsg:')
+                    _log.debug ('\ncase json errmsg:')
       
                 try:
-                    data = self.response.json()
+                    data = _json.loads (self.response.content)
                     
                 except Exception as e:
                 
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'JSON object parse error: {str(e):s}')
+                        _log.debug ('\nJSON object parse error: %s', e)
       
                     self.status = 'error'
                     self.msg = 'JSON parse error: ' + str(e)
                 
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'status= {self.status:s}')
-                        logging.debug (f'msg= {self.msg:s}')
+                        _log.debug ('\nstatus= %s' \
+                            '\nmsg= %s', \
+                            self.status, self.msg)
 
                     return (self.response.text)
 
@@ -4875,33 +6162,28 @@ class KoaTap:
                 self.msg = data['msg']
                 
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'status= {self.status:s}')
-                    logging.debug (f'msg= {self.msg:s}')
+                    _log.debug ('\nstatus= %s\nmsg= %s', self.status, self.msg)
 
                 return (self.msg)
 
             elif (self.content_type == 'text/xml'):
 
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('case xml errmsg:')
+                    _log.debug ('\ncase xml errmsg:')
       
                 self.msg = ''
                 try:
-                    self.msg = self.extract_xmlerr (self.response.text)
+                    self.msg = self.extract_xmlerr (self.response.content)
                     
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'returned extract_xmlerr: {self.msg:s}')
+                        _log.debug ('\nreturned extract_xmlerr: %s', self.msg)
             
                     return (self.msg)
 
                 except Exception as e:
 
                     if debug:
-                        logging.debug ('')
-                        logging.debug (f'parse errmsg exception: {str(e):s}')
+                        _log.debug ('\nparse errmsg exception: %s', e)
     
                     return (self.response.text)
 
@@ -4909,8 +6191,7 @@ class KoaTap:
                 return (self.response.text)
         
         if debug:
-            logging.debug ('')
-            logging.debug ('here')
+            _log.debug ('\nhere')
     
 #
 #} end dealing with status_code != 303
@@ -4924,8 +6205,7 @@ class KoaTap:
             self.statusurl = self.response.headers['Location']
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'statusurl= {self.statusurl:s}')
+            _log.debug ('\nstatusurl= %s', self.statusurl)
 
         if (len(self.statusurl) == 0):
             self.msg = 'Error: failed to retrieve statusurl from re-direct'
@@ -4937,27 +6217,19 @@ class KoaTap:
         try:
             if debug:
                 self.koajob = KoaJob (\
-                    self.statusurl, debug=1)
+                    self.statusurl, session=self.session, debug=1)
             else:
                 self.koajob = KoaJob (\
-                    self.statusurl)
+                    self.statusurl, session=self.session)
         
             if debug:
-                logging.debug ('')
-                logging.debug (f'koajob instantiated')
-                logging.debug (f'phase= {self.koajob.phase:s}')
+                _log.debug ('\nkoajob instantiated' \
+                    '\nphase= %s', \
+                    self.koajob.phase)
        
        
         except Exception as e:
-           
-            self.status = 'error'
-            self.msg = str(e)
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            return (self.msg)    
+            return (_fail (self, e, debug))
         
 #
 #    loop until job is complete and download the data
@@ -4966,144 +6238,72 @@ class KoaTap:
         phase = self.koajob.phase
         
         if debug:
-            logging.debug ('')
-            logging.debug (f'phase: {phase:s}')
+            _log.debug ('\nphase: %s', phase)
             
-        if ((phase.lower() != 'completed') and (phase.lower() != 'error')):
+        if (self.koajob._phase_lc not in _TERMINAL_PHASES):
             
-            while ((phase.lower() != 'completed') and \
-                (phase.lower() != 'error')):
+            delays = _poll_delays ()
+
+            while (self.koajob._phase_lc not in _TERMINAL_PHASES):
                 
-                time.sleep (2)
+                time.sleep (max (next (delays), self.koajob.retry_after))
                 phase = self.koajob.get_phase()
         
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('here0-1')
-                    logging.debug (f'phase= {phase:s}')
+                    _log.debug ('\nhere0-1\nphase= %s', phase)
             
         if debug:
-            logging.debug ('')
-            logging.debug ('here0-2')
-            logging.debug (f'phase= {phase:s}')
+            _log.debug ('\nhere0-2\nphase= %s', phase)
             
 #
 #    phase == 'error'
 #
-        if (phase.lower() == 'error'):
+        if (self.koajob._phase_lc == 'error'):
 	   
             self.status = 'error'
             self.msg = self.koajob.errorsummary
         
             if debug:
-                logging.debug ('')
-                logging.debug (f'returned get_errorsummary: {self.msg:s}')
+                _log.debug ('\nreturned get_errorsummary: %s', self.msg)
             
             return (self.msg)
 
         if debug:
-            logging.debug ('')
-            logging.debug ('here2: phase is completed')
+            _log.debug ('\nhere2: phase is completed')
             
 #
 #   phase == 'completed' 
 #
         self.resulturl = self.koajob.resulturl
         if debug:
-            logging.debug ('')
-            logging.debug (f'resulturl= {self.resulturl:s}')
+            _log.debug ('\nresulturl= %s', self.resulturl)
 
 #
 #   send resulturl to retrieve result table
 #
         try:
-            self.response_result = requests.get (self.resulturl, stream=True)
+            self.response_result = self.session.get (self.resulturl, \
+                stream=True, timeout=(conf.timeout, None))
         
             if debug:
-                logging.debug ('')
-                logging.debug ('resulturl request sent')
+                _log.debug ('\nresulturl request sent')
 
         except Exception as e:
-           
-            self.status = 'error'
-            self.msg = str(e)
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            raise Exception (self.msg)    
+            raise Exception (_fail (self, e, debug))
      
        
 #
 # save table to file
 #
         if debug:
-            logging.debug ('')
-            logging.debug ('got here')
+            _log.debug ('\ngot here')
 
         self.msg = self.save_data (self.outpath)
             
         if debug:
-            logging.debug ('')
-            logging.debug (f'returned save_data: msg= {self.msg:s}')
+            _log.debug ('\nreturned save_data: msg= %s', self.msg)
 
         return (self.msg)
-
-
-#
-#    outpath is not given: return resulturl
-#
-        """
-        if (len(self.outpath) == 0):
-           
-            self.resulturl = self.koajob.resulturl
-            if debug:
-                logging.debug ('')
-                logging.debug (f'resulturl= {self.resulturl:s}')
-
-            return (self.resulturl)
-
-        try:
-            self.koajob.get_result (self.outpath)
-
-            if debug:
-                logging.debug ('')
-                logging.debug (f'returned self.koajob.get_result')
-        
-        except Exception as e:
-            
-            self.status = 'error'
-            self.msg = str(e)
-	    
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            return (self.msg)    
-        
-        if debug:
-            logging.debug ('')
-            logging.debug ('got here: download result successful')
-      
-        self.status = 'ok'
-        self.msg = 'Result downloaded to file: [' + self.outpath + ']'
-	    
-        if debug:
-            logging.debug ('')
-            logging.debug (f'self.msg = {self.msg:s}')
-       
-        
-	self.msg = self.save_data (self.outpath)
-            
-	
-        if debug:
-            logging.debug ('')
-            logging.debug (f'returned save_data: msg= {self.msg:s}')
-
-
-        return (self.msg) 
-        """
 #
 #} end KoaTap.send_async
 #
@@ -5117,15 +6317,19 @@ class KoaTap:
         debug = 0
 
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter send_sync:')
-            logging.debug (f'query= {query:s}')
+            _log.debug ('\nEnter send_sync:\nquery= %s', query)
  
+        self.__new_query ()
+
+        if (len(query) == 0):
+            self.status = 'error'
+            self.msg = 'Failed to find required input parameter: query'
+            return (self.msg)
+
         url = self.url + '/sync'
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'url= {url:s}')
+            _log.debug ('\nurl= %s', url)
 
         self.sync_job = 1
         self.async_job = 0
@@ -5143,8 +6347,7 @@ class KoaTap:
 
         
             if debug:
-                logging.debug ('')
-                logging.debug (f'format= {self.format:s}')
+                _log.debug ('\nformat= %s', self.format)
             
         if ('maxrec' in kwargs):
             
@@ -5152,40 +6355,29 @@ class KoaTap:
             self.datadict['maxrec'] = self.maxrec              
             
             if debug:
-                logging.debug ('')
-                logging.debug (f'maxrec= {self.maxrec:d}')
+                _log.debug ('\nmaxrec= %d', self.maxrec)
         
         self.outpath = ''
         if ('outpath' in kwargs):
             self.outpath = kwargs.get('outpath')
         
         if debug:
-            logging.debug ('')
-            logging.debug (f'outpath= {self.outpath:s}')
+            _log.debug ('\noutpath= %s', self.outpath)
+	
+        cookies = None
+        if (len(self.cookiepath) > 0):
+            cookies = self.cookiejar
 	
         try:
-            if (len(self.cookiepath) > 0):
-        
-                self.response = requests.post (url, data= self.datadict, \
-                    cookies=self.cookiejar, allow_redirects=False, stream=True)
-            else: 
-                self.response = requesrs.post (url, data= self.datadict, \
-                    allow_redicts=False, stream=True)
+            self.response = self.session.post (url, data=self.datadict, \
+                cookies=cookies, allow_redirects=False, stream=True, \
+                timeout=(conf.timeout, None))
 
             if debug:
-                logging.debug ('')
-                logging.debug ('request sent')
+                _log.debug ('\nrequest sent')
 
         except Exception as e:
-           
-            self.status = 'error'
-            self.msg = str(e)
-
-            if debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            return (self.msg)
+            return (_fail (self, e, debug))
 
 #
 #    re-direct case not implemented for send_sync
@@ -5197,8 +6389,7 @@ class KoaTap:
         self.encoding = self.response.encoding
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'content_type= {self.content_type:s}')
+            _log.debug ('\ncontent_type= %s', self.content_type)
        
         data = None
         self.status = ''
@@ -5208,11 +6399,10 @@ class KoaTap:
 #    error message
 #
             try:
-                data = self.response.json()
+                data = _json.loads (self.response.content)
             except Exception:
                 if debug:
-                    logging.debug ('')
-                    logging.debug ('JSON object parse error')
+                    _log.debug ('\nJSON object parse error')
       
                 self.status = 'error'
                 self.msg = 'returned JSON object parse error'
@@ -5220,29 +6410,25 @@ class KoaTap:
                 return (self.msg)
             
             if debug:
-                logging.debug ('')
-                logging.debug (f'status= {self.status:s}')
-                logging.debug (f'msg= {self.msg:s}')
+                _log.debug ('\nstatus= %s\nmsg= %s', self.status, self.msg)
      
 #
 # download resulturl and save table to file
 #
         if debug:
-            logging.debug ('')
-            logging.debug ('send request to get resulturl')
+            _log.debug ('\nsend request to get resulturl')
 
 #
-# save table to file
+# save table to file: the sync reply is the result itself
 #
         if debug:
-            logging.debug ('')
-            logging.debug ('got here')
+            _log.debug ('\ngot here')
 
+        self.response_result = self.response
         self.msg = self.save_data (self.outpath)
             
         if debug:
-            logging.debug ('')
-            logging.debug (f'returned save_data: msg= {self.msg:s}')
+            _log.debug ('\nreturned save_data: msg= %s', self.msg)
 
         return (self.msg)
 #
@@ -5260,122 +6446,69 @@ class KoaTap:
         debug = 0
 
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter extract_xmlerr:')
-            logging.debug (f'xmlstruct= {xmlstruct:s}')
+            _log.debug ('\nEnter extract_xmlerr:\nxmlstruct= %s', xmlstruct)
       
 #
-#    convert status xml structure to dictionary doc 
+#    parse the reply (bytes) with lxml and find the INFO element of the
+#    error VOTable with the compiled XPath
 #
-        doc = None
+        if isinstance (xmlstruct, str):
+            xmlstruct = xmlstruct.encode ('utf-8')
+
+        root = None
         try:
-            doc = xmltodict.parse (xmlstruct)
+            root = etree.fromstring (xmlstruct, _xml_parser ())
 
         except Exception as e:
 
-            self.msg = 'Failed to parse xmltodict: ' + str(e)
+            self.msg = 'Failed to parse xml: ' + str(e)
 
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\nexception: e= %s', e)
 
             raise Exception (self.msg)
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('doc: ')
-            logging.debug (doc)
-        
-#
-#    check if this is a error message: in the structure of a votable
-#
-        votbl = None
-        try: 
-            votbl = doc['VOTABLE']
-	
-        except Exception as e:
-           
+        if (etree.QName (root).localname != 'VOTABLE'):
+            
             self.msg = 'Failed to extract votbl from doc '
 	    
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            raise Exception (self.msg)    
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('votbl found so it is an errmsg')
-            logging.debug (votbl)
-
-        
-        if (votbl is None):
-            self.msg = 'Not a votbl format.'
-	    
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\nroot element: %s', root.tag)
             
             raise Exception (self.msg)    
-     
         
-        info = None
-        try: 
-            info = votbl['RESOURCE']['INFO']
+        infos = _xmlerr_info (root)
 
-        except Exception as e:
-           
+        if (len(infos) == 0):
+            
             self.msg = 'Failed to extract INFO from doc '
 	    
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            raise Exception (self.msg)    
-     
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('info found: extract errmsg')
-            logging.debug (info)
-        
-        if (info is None):
-            
-            self.msg = 'No error message found.'
-            
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'self.msg= {self.msg:s}')
+                _log.debug ('\n%s', self.msg)
             
             raise Exception (self.msg)    
      
-        
-        infoval = ''
-        errmsg = ''
-        try: 
-            infoval = info['@value'] 
-            errmsg = info['#text'] 
-	
-        except Exception as e:
+        infoval = infos[0].get ('value')
+        errmsg = infos[0].text
+
+        if ((infoval is None) or (errmsg is None)):
            
             self.msg = 'Failed to extract infoval and text from doc '
 	    
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\n%s', self.msg)
             
             raise Exception (self.msg)    
      
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'infoval= {infoval:s}')
-            logging.debug (f'errmsg= {errmsg:s}')
+            _log.debug ('\ninfoval= %s\nerrmsg= %s', infoval, errmsg)
 
         if (infoval.lower() != 'error'):
             
             self.msg = 'No error message found.'
         
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'infoval not error: {infoval.lower():s}')
+                _log.debug ('\ninfoval not error: %s', infoval.lower())
 
             raise Exception (self.msg)    
         
@@ -5397,85 +6530,77 @@ class KoaTap:
         debug = 0
 
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter save_data:')
-            logging.debug (f'outpath= {outpath:s}')
+            _log.debug ('\nEnter save_data:\noutpath= %s', outpath)
       
-        tmpfile_created = 0
+        if (len(outpath) == 0):
+#
+#    parse the votable from the response body in memory: no temporary 
+#    file is written, read back and removed.  The votable reader seeks,
+#    so it is given a BytesIO rather than the raw socket stream; 
+#    parse_single_table stops at the first TABLE instead of building 
+#    the tree of the whole document.
+#
+            try:
+                self.astropytbl = parse_single_table ( \
+                    io.BytesIO (self.response_result.content)).to_table ()
 
-        fpath = ''
-        if (len(outpath) >  0):
-            fpath = outpath
-        else:
-            fd, fpath = tempfile.mkstemp(suffix='.xml', dir='./')
-            tmpfile_created = 1 
+            except Exception as e:
+
+                if debug:
+                    _log.debug ('\nsave_data error: %s', str(e))
             
+                self.msg = 'save_data error: ' + str(e)
+                return (self.msg)
+
+            self.msg = 'Result saved in memory (astropy table).'
+      
             if debug:
-                logging.debug ('')
-                logging.debug (f'tmpfile_created = {tmpfile_created:d}')
+                _log.debug ('\n%s', self.msg)
+     
+            return (self.msg)
+
+        fpath = outpath
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'fpath= {fpath:s}')
+            _log.debug ('\nfpath= %s', fpath)
     
         try:
-            fp = open (fpath, "wb")
+            fp = open (fpath, "wb", buffering=_DOWNLOAD_CHUNK)
         
         except Exception as e:
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'save_data error: {str(e):s}')
+                _log.debug ('\nsave_data error: %s', e)
             
             self.msg = 'Failed to open file [' + fpath + '] for write.'
             return (self.msg)
 
         
         try:
-            for data in self.response_result.iter_content(4096):
-                
-                len_data = len(data)            
-        
-                if (len_data < 1):
-                    break
-
-                fp.write (data)
+            self.response_result.raw.decode_content = True
+            _copy_stream (self.response_result.raw, fp)
         
             fp.close()
 
         except Exception as e:
 
             if debug:
-                logging.debug ('')
-                logging.debug (f'save_data error: {str(e):s}')
+                _log.debug ('\nsave_data error: %s', e)
             
             self.msg = 'save_data error: ' + str(e)
             return (self.msg)
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'data written to file: {fpath:s}')
+            _log.debug ('\ndata written to file: %s', fpath)
                 
-        if (len(self.outpath) >  0):
-            self.msg = 'Result downloaded to file [' + self.outpath + ']'
-        else:
-#
-#    read temp outpath to astropy table
-#
-            self.astropytbl = Table.read (fpath, format='votable')	    
-            self.msg = 'Result saved in memory (astropy table).'
+        self._astropytbl = None
+        self._resultpath = fpath
+
+        self.msg = 'Result downloaded to file [' + self.outpath + ']'
       
         if debug:
-            logging.debug ('')
-            logging.debug (f'{self.msg:s}')
+            _log.debug ('\n%s', self.msg)
      
-        if (tmpfile_created == 1):
-            os.remove (fpath)
-            
-            if debug:
-                logging.debug ('')
-                logging.debug ('tmpfile {fpath:s} deleted')
-
         return (self.msg)
 #
 #} end KoaTap.save_date
@@ -5490,24 +6615,9 @@ class KoaTap:
         debug = 0
 
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter print_data:')
+            _log.debug ('\nEnter print_data:')
 
         try:
-
-            """
-            len_table = len (self.astropytbl)
-        
-            if debug:
-                logging.debug ('')
-                logging.debug (f'len_table= {len_table:d}')
-       
-            for i in range (len_table):
-	    
-                row = self.astropytbl[i]
-                print (row)
-            """
-
             self.astropytbl.pprint()
 
         except Exception as e:
@@ -5532,22 +6642,23 @@ class KoaTap:
         debug = 0
         
         if debug:
-            logging.debug ('')
-            logging.debug ('Enter get_data:')
-            logging.debug (f'async_job = {self.async_job:d}')
-            logging.debug (f'resultpath = {resultpath:s}')
+            _log.debug ('\nEnter get_data:' \
+                '\nasync_job = %d' \
+                '\nresultpath = %s', \
+                self.async_job, resultpath)
 
 
 
         if (self.async_job == 0):
 #
-#    sync data is in astropytbl
+#    sync data is in astropytbl: write it in the format of the query, as
+#    the async result is, rather than one guessed from the file name 
 #
-            self.astropytbl.write (resultpath)
+            self.astropytbl.write (resultpath, \
+                format=_FMT_MAP.get (self.format, 'votable'), overwrite=True)
 
             if debug:
-                logging.debug ('')
-                logging.debug ('astropytbl written to resultpath')
+                _log.debug ('\nastropytbl written to resultpath')
 
             self.msg = 'Result written to file: [' + resultpath + ']'
         
@@ -5555,30 +6666,28 @@ class KoaTap:
             phase = self.koajob.get_phase()
         
             if debug:
-                logging.debug ('')
-                logging.debug (f'returned koajob.get_phase: phase= {phase:s}')
+                _log.debug ('\nreturned koajob.get_phase: phase= %s', phase)
 
-            while ((phase.lower() != 'completed') and \
-	        (phase.lower() != 'error')):
-                time.sleep (2)
+            delays = _poll_delays ()
+
+            while (self.koajob._phase_lc not in _TERMINAL_PHASES):
+                time.sleep (max (next (delays), self.koajob.retry_after))
                 phase = self.koajob.get_phase()
         
                 if debug:
-                    logging.debug ('')
-                    logging.debug (\
-                        f'returned koajob.get_phase: phase= {phase:s}')
+                    _log.debug ('\nreturned koajob.get_phase: phase= %s', \
+                        phase)
 
 #
 #    phase == 'error'
 #
-            if (phase.lower() == 'error'):
+            if (self.koajob._phase_lc == 'error'):
 	   
                 self.status = 'error'
                 self.msg = self.koajob.errorsummary
         
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'returned get_errorsummary: {self.msg:s}')
+                    _log.debug ('\nreturned get_errorsummary: %s', self.msg)
             
                 return (self.msg)
 
@@ -5589,34 +6698,154 @@ class KoaTap:
                 self.koajob.get_result (resultpath)
 
                 if debug:
-                    logging.debug ('')
-                    logging.debug (f'returned koajob.get_result')
+                    _log.debug ('\nreturned koajob.get_result')
         
             except Exception as e:
-            
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-            
-                return (self.msg)    
+                return (_fail (self, e, debug))
         
             if debug:
-                logging.debug ('')
-                logging.debug ('got here: download result successful')
+                _log.debug ('\ngot here: download result successful')
+
+            self.status = 'ok'
+            self.msg = 'Result downloaded to file: [' + resultpath + ']'
+
+        if debug:
+            _log.debug ('\nself.msg = %s', self.msg)
+       
+        return (self.msg) 
+#
+#} end KoaTap.get_data
+#
+
+
+    async def aget_data (self, resultpath, **kwargs):
+#
+#{ KoaTap.aget_data
+#
+        """
+        'aget_data' is the asyncio counterpart of get_data: the job is 
+        polled with asyncio.sleep between the status requests and the 
+        result is streamed with aiohttp, so the jobs of several KoaTap 
+        objects progress together, e.g.
+
+            await asyncio.gather (*[tap.aget_data (path) \
+                for tap, path in zip (taps, paths)])
+
+        It requires the optional 'aiohttp' package (pip install aiohttp), 
+        or 'httpx[http2]' when HTTP/2 is enabled.
+
+        Optional input:
+
+            session:  an aiohttp.ClientSession or httpx.AsyncClient to 
+                      share between the calls, so that the status polls 
+                      of all the jobs go over one connection pool (or one
+                      multiplexed HTTP/2 connection); default is a session
+                      opened for this call only
+
+            http2:    1 to open that session with httpx over HTTP/2; 
+                      default is 1 when the KoaTap object was given the 
+                      http2 session of an Archive created with http2=1
+        """
+
+        debug = 0
+        
+        if debug:
+            _log.debug ('\nEnter aget_data:\nasync_job = %d\n' \
+                'resultpath = %s', self.async_job, resultpath)
+
+        if (self.async_job == 0):
+            return (self.get_data (resultpath))
+
+        if ('session' in kwargs):
+            return (await self.__aget_data (kwargs.get('session'), \
+                resultpath, debug))
+        
+        http2 = int (isinstance (self.session, _Http2Session))
+        if ('http2' in kwargs):
+            http2 = int(kwargs.get('http2'))
+
+        if (http2 and (httpx is None)):
+            http2 = 0
+
+        if ((not http2) and (aiohttp is None)):
+            self.status = 'error'
+            self.msg = 'aget_data requires the aiohttp package: ' + \
+                'pip install aiohttp'
+            return (self.msg)
+
+#
+#    share the rate limiter of the requests session
+#
+        limiter = Archive._get_session().limiter
+
+        if http2:
+            
+            hooks = {'request': [limiter.on_request], \
+                'response': [limiter.on_response]}
+
+            timeout = httpx.Timeout (None, connect=conf.timeout, read=60)
+
+            async with httpx.AsyncClient (http2=True, timeout=timeout, \
+                event_hooks=hooks) as session:
+
+                return (await self.__aget_data (session, resultpath, debug))
+
+        trace = aiohttp.TraceConfig ()
+        trace.on_request_start.append (limiter.on_request_start)
+        trace.on_request_end.append (limiter.on_request_end)
+
+        timeout = aiohttp.ClientTimeout (total=None, \
+            sock_connect=conf.timeout, sock_read=60)
+
+        async with aiohttp.ClientSession (timeout=timeout, \
+            trace_configs=[trace]) as session:
+
+            return (await self.__aget_data (session, resultpath, debug))
+#
+#} end KoaTap.aget_data
+#
+
+
+    async def __aget_data (self, session, resultpath, debug):
+#
+#{ KoaTap.__aget_data
+#
+
+        delays = _poll_delays ()
+        
+        try:
+            phase = await self.koajob.aget_phase (session)
+        
+            while (self.koajob._phase_lc not in _TERMINAL_PHASES):
+                
+                await asyncio.sleep ( \
+                    max (next (delays), self.koajob.retry_after))
+                phase = await self.koajob.aget_phase (session)
+        
+                if debug:
+                    _log.debug ('\nreturned koajob.aget_phase: phase= %s', \
+                        phase)
+
+            if (self.koajob._phase_lc == 'error'):
+	   
+                self.status = 'error'
+                self.msg = self.koajob.errorsummary
+                return (self.msg)
 
-            self.status = 'ok'
-            self.msg = 'Result downloaded to file: [' + resultpath + ']'
+            await self.koajob.aget_result (session, resultpath)
+
+        except Exception as e:
+            return (_fail (self, e, debug))
+        
+        self.status = 'ok'
+        self.msg = 'Result downloaded to file: [' + resultpath + ']'
 
         if debug:
-            logging.debug ('')
-            logging.debug (f'self.msg = {self.msg:s}')
+            _log.debug ('\nself.msg = %s', self.msg)
        
-        return (self.msg) 
+        return (self.msg)    
 #
-#} end KoaTap.get_data
+#} end KoaTap.__aget_data
 #
 
 #
@@ -5645,7 +6874,13 @@ class KoaJob:
         self.status = ''
         self.msg = ''
         
-        self.statusstruct = ''
+#
+#    statusstruct is decoded from the undecoded status reply only when it
+#    is asked for, with the encoding lxml found in the document
+#
+        self._statusstruct = ''
+        self._statusbody = b''
+        self._statusencoding = 'utf-8'
         self.job = ''
 
 
@@ -5654,6 +6889,7 @@ class KoaJob:
         self.ownerid = 'None'
         self.quote = 'None'
         self.phase = ''
+        self._phase_lc = ''
         self.starttime = ''
         self.endtime = ''
         self.executionduration = ''
@@ -5663,41 +6899,76 @@ class KoaJob:
         self.parameters = ''
         self.resulturl = ''
 
+#
+#    validators of the last status document and the server's Retry-After
+#    wait
+#
+        self.etag = ''
+        self.last_modified = ''
+        self.retry_after = 0.0
+
+#
+#    set once the job fields of a finished job have been kept
+#
+        self._terminal_cached = False
+
+        if ('session' in kwargs):
+            self.session = kwargs.get('session')
+        else:
+            self.session = Archive._get_session()
+
         if ('debug' in kwargs):
            
             self.debug = kwargs.get('debug')
            
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter koajob (debug on)')
+            _log.debug ('\nEnter koajob (debug on)')
                                 
         try:
             self.__get_statusjob()
          
             if self.debug:
-                logging.debug ('')
-                logging.debug ('returned __get_statusjob')
+                _log.debug ('\nreturned __get_statusjob')
 
         except Exception as e:
-           
-            self.status = 'error'
-            self.msg = str(e)
-	    
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            raise Exception (self.msg)    
+            raise Exception (_fail (self, e, self.debug))
         
         if self.debug:
-            logging.debug ('')
-            logging.debug ('done KoaJob.init:')
+            _log.debug ('\ndone KoaJob.init:')
 
         return     
 #
 #} end KoaJob.init
 #
 
+
+    @property
+    def statusstruct (self):
+#
+#{ KoaJob.statusstruct
+#
+        """
+        'statusstruct' is the text of the last status document.  The 
+        polls parse the reply bytes directly; the text is decoded here 
+        the first time it is asked for.
+        """
+
+        if (self._statusstruct is None):
+            self._statusstruct = \
+                self._statusbody.decode (self._statusencoding, 'replace')
+
+        return (self._statusstruct)
+
+
+    @statusstruct.setter
+    def statusstruct (self, text):
+
+        self._statusstruct = text
+        self._statusbody = b''
+#
+#} end KoaJob.statusstruct
+#
+
    
     def get_status (self):
 #
@@ -5705,31 +6976,21 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_status')
-            logging.debug (f'phase= {self.phase:s}')
+            _log.debug ('\nEnter get_status\nphase= %s', self.phase)
 
-        if (self.phase.lower() != 'completed'):
+        if (self._phase_lc != 'completed'):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                 
-                raise Exception (self.msg)   
+                raise Exception (_fail (self, e, self.debug))
 
         return (self.statusstruct)
 #
@@ -5743,31 +7004,21 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_resulturl')
-            logging.debug (f'phase= {self.phase:s}')
+            _log.debug ('\nEnter get_resulturl\nphase= %s', self.phase)
 
-        if (self.phase.lower() != 'completed'):
+        if (self._phase_lc != 'completed'):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                 
-                raise Exception (self.msg)   
+                raise Exception (_fail (self, e, self.debug))
 
         return (self.resulturl)
 #
@@ -5781,10 +7032,10 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_result')
-            logging.debug (f'resulturl= {self.resulturl:s}')
-            logging.debug (f'outpath= {outpath:s}')
+            _log.debug ('\nEnter get_result' \
+                '\nresulturl= %s' \
+                '\noutpath= %s', \
+                self.resulturl, outpath)
 
         if (len(outpath) == 0):
             self.status = 'error'
@@ -5792,26 +7043,18 @@ class KoaJob:
             return
 
         
-        if (self.phase.lower() != 'completed'):
+        if (self._phase_lc != 'completed'):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned __get_statusjob')
-                    logging.debug (f'resulturl= {self.resulturl:s}')
+                    _log.debug ('\nreturned __get_statusjob' \
+                        '\nresulturl= %s', \
+                        self.resulturl)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                
-                raise Exception (self.msg)    
+                raise Exception (_fail (self, e, self.debug))
     
 
         if (len(self.resulturl) == 0):
@@ -5825,53 +7068,78 @@ class KoaJob:
 #   send resulturl to retrieve result table
 #
         try:
-            response = requests.get (self.resulturl, stream=True)
+            response = self.session.get (self.resulturl, stream=True, \
+                timeout=(conf.timeout, None))
         
             if self.debug:
-                logging.debug ('')
-                logging.debug ('resulturl request sent')
+                _log.debug ('\nresulturl request sent')
 
         except Exception as e:
-           
-            self.status = 'error'
-            self.msg = str(e)
-	    
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            raise Exception (self.msg)    
+            raise Exception (_fail (self, e, self.debug))
      
 #
 # retrieve table from response
 #
-        with open (outpath, "wb") as fp:
+        with open (outpath, "wb", buffering=_DOWNLOAD_CHUNK) as fp:
             
-            for data in response.iter_content(4096):
-                
-                len_data = len(data)            
+            response.raw.decode_content = True
+            _copy_stream (response.raw, fp)
+        
+        self.resultpath = outpath
+        self.status = 'ok'
+        self.msg = 'returned table written to output file: ' + outpath
+        
+        if self.debug:
+            _log.debug ('\ndone writing result to file')
             
-#                if debug:
-#                    logging.debug ('')
-#                    logging.debug (f'len_data= {len_data:d}')
- 
-                if (len_data < 1):
-                    break
+        return        
+#
+#} end KoaJob.get_result
+#
+
+
+    async def aget_result (self, session, outpath):
+#
+#{ KoaJob.aget_result
+#
+        """
+        'aget_result' is the asyncio counterpart of get_result: the result
+        table is streamed to outpath with the given aiohttp (or httpx) 
+        session.
+        """
+
+        if self.debug:
+            _log.debug ('\nEnter aget_result\nresulturl= %s\noutpath= %s', \
+                self.resulturl, outpath)
+
+        if (len(outpath) == 0):
+            self.status = 'error'
+            self.msg = 'Output file path is required.'
+            return
+
+        if (self._phase_lc != 'completed'):
+            await self.aget_phase (session)
+
+        if (len(self.resulturl) == 0):
+            self.msg = 'Failed to retrieve resulturl from status structure.'
+            raise Exception (self.msg)    
+
+        try:
+            await _astream (session, self.resulturl, outpath)
 
-                fp.write (data)
-        fp.close()
+        except Exception as e:
+            raise Exception (_fail (self, e, self.debug))
         
         self.resultpath = outpath
         self.status = 'ok'
         self.msg = 'returned table written to output file: ' + outpath
         
         if self.debug:
-            logging.debug ('')
-            logging.debug ('done writing result to file')
+            _log.debug ('\ndone writing result to file')
             
         return        
 #
-#} end KoaJob.get_result
+#} end KoaJob.aget_result
 #
 
     
@@ -5881,10 +7149,10 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_parameters')
-            logging.debug ('parameters:')
-            logging.debug (self.parameters)
+            _log.debug ('\nEnter get_parameters' \
+                '\nparameters:' \
+                '\n%s', \
+                self.parameters)
 
         return (self.parameters)
 #
@@ -5899,42 +7167,93 @@ class KoaJob:
 
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_phase')
-            logging.debug (f'self.phase= {self.phase:s}')
+            _log.debug ('\nEnter get_phase\nself.phase= %s', self.phase)
 
-        if ((self.phase.lower() != 'completed') and \
-	    (self.phase.lower() != 'error')):
+        if (self._phase_lc not in _TERMINAL_PHASES):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                 
-                raise Exception (self.msg)   
+                raise Exception (_fail (self, e, self.debug))
 
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'phase= {self.phase:s}')
+                _log.debug ('\nphase= %s', self.phase)
 
         return (self.phase)
 #
 #} end KoaJob.get_phase
 #
     
+
+    async def aget_phase (self, session):
+#
+#{ KoaJob.aget_phase
+#
+        """
+        'aget_phase' is the asyncio counterpart of get_phase: the status 
+        document is requested with the given aiohttp (or httpx) session, 
+        so that the jobs of several KoaTap objects can be polled 
+        concurrently.
+        """
+
+        if self.debug:
+            _log.debug ('\nEnter aget_phase\nself.phase= %s', self.phase)
+
+        if (self._phase_lc in _TERMINAL_PHASES):
+            return (self.phase)
+
+        headers = self.__status_headers ()
+
+        limiter = Archive._get_session ().limiter
+        ntry = 0
+
+        try:
+            while True:
+
+                status, replyheaders, content = \
+                    await _aget (session, self.statusurl, headers)
+
+                self.retry_after = _retry_after (replyheaders)
+
+                if (status not in (429, 503)):
+                    break
+#
+#    as in _KoaSession.request, a 429/503 reply is not parsed: the poll 
+#    is sent again once the Retry-After and the limiter's wait are over,
+#    up to _RATE_RETRIES times, and then left to the next poll
+#
+                if (ntry >= _RATE_RETRIES):
+                    return (self.phase)
+
+                await asyncio.sleep (self.retry_after)
+                await limiter.aacquire ()
+                ntry = ntry + 1
+
+            if (status == 304):
+                return (self.phase)
+
+            self.__keep_validators (replyheaders)
+            
+            self.__parse_statusjob (content)
+
+        except Exception as e:
+            raise Exception (_fail (self, e, self.debug))
+
+        if self.debug:
+            _log.debug ('\nphase= %s', self.phase)
+
+        return (self.phase)
+#
+#} end KoaJob.aget_phase
+#
+    
     
     def get_jobid (self):
 #
@@ -5942,15 +7261,13 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_jobid')
+            _log.debug ('\nEnter get_jobid')
 
-        if (len(self.jobid) == 0):
+        if ((not self._terminal_cached) and (len(self.jobid) == 0)):
             self.jobid = self.job['uws:jobId']
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'jobid= {self.jobid:s}')
+            _log.debug ('\njobid= %s', self.jobid)
 
         return (self.jobid)
 #
@@ -5963,15 +7280,13 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_processid')
+            _log.debug ('\nEnter get_processid')
 
-        if (len(self.processid) == 0):
+        if ((not self._terminal_cached) and (len(self.processid) == 0)):
             self.processid = self.job['uws:processId']
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'processid= {self.processid:s}')
+            _log.debug ('\nprocessid= %s', self.processid)
 
         return (self.processid)
 #
@@ -5993,15 +7308,13 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_starttime')
+            _log.debug ('\nEnter get_starttime')
 
-        if (len(self.starttime) == 0):
+        if ((not self._terminal_cached) and (len(self.starttime) == 0)):
             self.starttime = self.job['uws:startTime']
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'starttime= {self.starttime:s}')
+            _log.debug ('\nstarttime= %s', self.starttime)
 
         return (self.starttime)
 #
@@ -6015,36 +7328,27 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_endtime')
+            _log.debug ('\nEnter get_endtime')
 
-        if (self.phase.lower() != 'completed'):
+        if (self._phase_lc not in _TERMINAL_PHASES):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                 
-                raise Exception (self.msg)   
+                raise Exception (_fail (self, e, self.debug))
 
-        self.endtime = self.job['uws:endTime']
+        if (not self._terminal_cached):
+            self.endtime = self.job['uws:endTime']
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'endtime= {self.endtime:s}')
+            _log.debug ('\nendtime= %s', self.endtime)
 
         return (self.endtime)
 #
@@ -6058,37 +7362,28 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_executionduration')
+            _log.debug ('\nEnter get_executionduration')
 
         
-        if (self.phase.lower() != 'completed'):
+        if (self._phase_lc not in _TERMINAL_PHASES):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                 
-                raise Exception (self.msg)   
+                raise Exception (_fail (self, e, self.debug))
 
-        self.executionduration = self.job['uws:executionDuration']
+        if (not self._terminal_cached):
+            self.executionduration = self.job['uws:executionDuration']
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'executionduration= {self.executionduration:s}')
+            _log.debug ('\nexecutionduration= %s', self.executionduration)
 
         return (self.executionduration)
 #
@@ -6103,36 +7398,27 @@ class KoaJob:
 
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_destruction')
+            _log.debug ('\nEnter get_destruction')
 
-        if (self.phase.lower() != 'completed'):
+        if (self._phase_lc not in _TERMINAL_PHASES):
 
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
-           
-                self.status = 'error'
-                self.msg = str(e)
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-                 
-                raise Exception (self.msg)   
+                raise Exception (_fail (self, e, self.debug))
 
-        self.destruction = self.job['uws:destruction']
+        if (not self._terminal_cached):
+            self.destruction = self.job['uws:destruction']
 
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'destruction= {self.destruction:s}')
+            _log.debug ('\ndestruction= %s', self.destruction)
 
         return (self.destruction)
 #
@@ -6146,20 +7432,18 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter get_errorsummary')
+            _log.debug ('\nEnter get_errorsummary')
 
-        if ((self.phase.lower() != 'error') and \
-	    (self.phase.lower() != 'completed')):
+        if (self._phase_lc not in _TERMINAL_PHASES):
         
             try:
                 self.__get_statusjob ()
 
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug ('returned get_statusjob:')
-                    logging.debug ('job= ')
-                    logging.debug (self.job)
+                    _log.debug ('\nreturned get_statusjob:' \
+                        '\njob= ' \
+                        '\n%s', \
+                        self.job)
 
             except Exception as e:
            
@@ -6167,38 +7451,31 @@ class KoaJob:
        
 	    
                 if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
+                    _log.debug ('\nexception: e= %s', e)
                  
                 raise Exception (self.msg)   
 	
-        if ((self.phase.lower() != 'error') and \
-	    (self.phase.lower() != 'completed')):
+        if (self._phase_lc not in _TERMINAL_PHASES):
         
             self.msg = 'The process is still running.'
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'msg= {self.msg:s}')
+                _log.debug ('\nmsg= %s', self.msg)
 
             return (self.msg)
 	
-        elif (self.phase.lower() == 'completed'):
+        elif (self._phase_lc == 'completed'):
             
             self.msg = 'Process completed without error message.'
             
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'msg= {self.msg:s}')
+                _log.debug ('\nmsg= %s', self.msg)
 
             return (self.msg)
         
-        elif (self.phase.lower() == 'error'):
-
-            self.errorsummary = self.job['uws:errorSummary']['uws:message']
+        elif (self._phase_lc == 'error'):
 
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'errorsummary= {self.errorsummary:s}')
+                _log.debug ('\nerrorsummary= %s', self.errorsummary)
 
             return (self.errorsummary)
 #
@@ -6212,236 +7489,235 @@ class KoaJob:
 #
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('Enter __get_statusjob')
-            logging.debug (f'statusurl= {self.statusurl:s}')
+            _log.debug ('\nEnter __get_statusjob' \
+                '\nstatusurl= %s', \
+                self.statusurl)
 
 #
 #   self.status doesn't exist, call get_status
 #
+#
+#    an unchanged status document (same ETag or Last-Modified) is 
+#    answered with 304 and leaves the parsed job parameters as they are
+#
+        headers = self.__status_headers ()
+
         try:
-            self.response = requests.get (self.statusurl, stream=True)
+            self.response = self.session.get (self.statusurl, \
+                headers=headers, timeout=(conf.timeout, None))
             
             if self.debug:
-                logging.debug ('')
-                logging.debug ('statusurl request sent')
+                _log.debug ('\nstatusurl request sent')
 
         except Exception as e:
            
             self.msg = str(e)
 	    
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\nexception: e= %s', e)
             
             raise Exception (self.msg)    
      
         if self.debug:
-            logging.debug ('')
-            logging.debug ('response returned')
-            logging.debug (f'status_code= {self.response.status_code:d}')
+            _log.debug ('\nresponse returned' \
+                '\nstatus_code= %d', \
+                self.response.status_code)
+
+#
+#    a Retry-After (in seconds) sets the least wait before the next poll
+#
+        self.retry_after = _retry_after (self.response.headers)
+
+        if (self.response.status_code == 304):
+            return
+
+        self.__keep_validators (self.response.headers)
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('response.text= ')
-            logging.debug (self.response.text)
+            _log.debug ('\nresponse.text= \n%s', self.response.text)
         
-        self.statusstruct = self.response.text
+        self.__parse_statusjob (self.response.content)
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('statusstruct= ')
-            logging.debug (self.statusstruct)
-        
+            _log.debug ('\nstatusstruct= \n%s', self.statusstruct)
+
+        return
 #
-#    parse returned status xml structure for parameters
+#} end KoaJob.__get_statusjob
 #
-        try:
-            soup = bs.BeautifulSoup (self.statusstruct, 'xml')
-       
-            #soup = bs.BeautifulSoup (self.statusstruct, 'lxml')
-       
-        except Exception as e:
 
-            self.msg = 'Failed to initialize BeautifulSoup: ' + str(e)
-	    
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
-            raise Exception (self.msg)    
-     
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('soup initialized')
-       
+    def __status_headers (self):
 #
-#    get parameters from soup
+#{ KoaJob.__status_headers
 #
-        self.parameters = soup.find('uws:parameters')
+        """
+        '__status_headers' returns the conditional request headers built 
+        from the validators of the last status document.
+        """
+
+        headers = {}
         
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('self.parameters:')
-            logging.debug (self.parameters)
+        if (len(self.etag) > 0):
+            headers['If-None-Match'] = self.etag
+        
+        if (len(self.last_modified) > 0):
+            headers['If-Modified-Since'] = self.last_modified
+
+        return (headers)
+#
+#} end KoaJob.__status_headers
+#
+
+
+    def __keep_validators (self, headers):
+#
+#{ KoaJob.__keep_validators
+#
+
+        self.etag = headers.get ('ETag', '')
+        self.last_modified = headers.get ('Last-Modified', '')
         
+        return
 #
-#    convert status xml structure to dictionary doc 
+#} end KoaJob.__keep_validators
+#
+
+
+    def __parse_statusjob (self, content):
+#
+#{ KoaJob.__parse_statusjob
+#
+        """
+        '__parse_statusjob' extracts the job phase, result url and error 
+        summary from the status document; it is shared by the blocking 
+        and the asyncio status requests.
+
+        content: the undecoded reply body, so that lxml reads the 
+        document encoding from the xml declaration itself.
+        """
+
+        self._statusbody = content
+        self._statusstruct = None
+        self._statusencoding = 'utf-8'
+
+#
+#    parse the status document once with lxml
 #
         try:
-            doc = xmltodict.parse (self.response.text)
+            root = etree.fromstring (content, _xml_parser ())
+            
+            self._statusencoding = \
+                root.getroottree().docinfo.encoding or 'utf-8'
 
         except Exception as e:
 
-            self.msg = 'Failed to parse xmltodict: ' + str(e)
+            self.msg = 'Failed to parse xml: ' + str(e)
 
             if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
+                _log.debug ('\nexception: e= %s', e)
 
             raise Exception (self.msg)
 
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('doc: ')
-            logging.debug (doc)
-        
 #
 #    check if this is a error message: in the structure of a votable
 #
-        votbl = None
-        try: 
-            votbl = doc['VOTABLE']
-	
-        except Exception as e:
-           
-            self.msg = 'Failed to extract votbl from doc '
-	    
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            pass 
-        
-        if self.debug:
-            logging.debug ('')
-            logging.debug ('votbl found so it is an errmsg')
-            logging.debug (votbl)
-
-        
-        if (votbl is not None):
+        if (etree.QName (root).localname == 'VOTABLE'):
         
-            info = None
-            infoval = ''
-            errmsg = ''
+            if self.debug:
+                _log.debug ('\nvotbl found so it is an errmsg')
 
-            try: 
-                info = votbl['RESOURCE']['INFO']
+            infos = _xmlerr_info (root)
 
-            except Exception as e:
+            if (len(infos) == 0):
            
                 self.msg = 'Failed to extract INFO from doc '
-	    
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'exception: e= {str(e):s}')
-            
                 raise Exception (self.msg)    
      
-            if self.debug:
-                logging.debug ('')
-                logging.debug ('info found: extract errmsg')
-                logging.debug (info)
+            infoval = infos[0].get ('value')
+            errmsg = infos[0].text
 
-            errmsg = ''
-            if (info is not None):
-        
-                try: 
-                    infoval = info['@value'] 
-                    errmsg = info['#text'] 
-	
-                except Exception as e:
+            if ((infoval is None) or (errmsg is None)):
            
-                    self.msg = 'Failed to extract infoval and text from doc '
-	    
-                    if self.debug:
-                        logging.debug ('')
-                        logging.debug (f'exception: e= {str(e):s}')
-            
-                    raise Exception (self.msg)    
+                self.msg = 'Failed to extract infoval and text from doc '
+                raise Exception (self.msg)    
      
-                if self.debug:
-                    logging.debug ('')
-                    logging.debug (f'infoval= {infoval:s}')
-                    logging.debug (f'errmsg= {errmsg:s}')
+            if self.debug:
+                _log.debug ('\ninfoval= %s\nerrmsg= %s', infoval, errmsg)
 
-                if (infoval.lower() == 'error'):
-                    raise Exception (errmsg)    
+            if (infoval.lower() == 'error'):
+                raise Exception (errmsg)    
 
 #
 # end votbl not None
 #
 
-        try: 
-            self.job = doc['uws:job']
-	
-        except Exception as e:
+        if (etree.QName (root).localname != 'job'):
            
             self.msg = 'Failed to extract uws:job from doc '
-	    
-            if self.debug:
-                logging.debug ('')
-                logging.debug (f'exception: e= {str(e):s}')
-            
             raise Exception (self.msg)    
      
+        self.job = _UwsElement (root)
+
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'self.job= ')
-            logging.debug (self.job)
+            _log.debug ('\nself.job= \n%s', self.job)
+
+#
+#    the fields needed on every poll are read with the precompiled XPaths
+#
+        phase = _uws_phase (root)
 
+        if (len(phase) == 0):
+           
+            self.msg = 'Failed to extract uws:phase from doc '
+            raise Exception (self.msg)    
 
-        self.phase = self.job['uws:phase']
+        self.phase = str (phase)
+        self._phase_lc = self.phase.lower()
         
         if self.debug:
-            logging.debug ('')
-            logging.debug (f'self.phase.lower():{ self.phase.lower():s}')
-        
-       
-        if (self.phase.lower() == 'completed'):
-
-            results = self.job['uws:results']
+            _log.debug ('\nself._phase_lc:%s', self._phase_lc)
         
-            if self.debug:
-                logging.debug ('')
-                logging.debug ('results')
-                logging.debug (results)
-            
-            result = self.job['uws:results']['uws:result']
+        parameters = _uws_parameters (root)
         
-            if self.debug:
-                logging.debug ('')
-                logging.debug ('result')
-                logging.debug (result)
-            
+        self.parameters = ''
+        if (len(parameters) > 0):
+            self.parameters = _UwsElement (parameters[0])
 
-            self.resulturl = \
-                self.job['uws:results']['uws:result']['@xlink:href']
+        if (self._phase_lc == 'completed'):
+            self.resulturl = str (_uws_resulthref (root))
         
-        elif (self.phase.lower() == 'error'):
-            self.errorsummary = self.job['uws:errorSummary']['uws:message']
+        elif (self._phase_lc == 'error'):
+            self.errorsummary = str (_uws_errmsg (root))
+
+#
+#    the job fields no longer change once the job has finished: keep them
+#    so that the getters return them without looking them up again
+#
+        if ((self._phase_lc in _TERMINAL_PHASES) and \
+            (not self._terminal_cached)):
+
+            for attr, key in (('jobid', 'uws:jobId'), \
+                ('processid', 'uws:processId'), \
+                ('starttime', 'uws:startTime'), \
+                ('endtime', 'uws:endTime'), \
+                ('executionduration', 'uws:executionDuration'), \
+                ('destruction', 'uws:destruction')):
+                setattr (self, attr, self.job.get (key, getattr (self, attr)))
+
+            self._terminal_cached = True
 
 
         if self.debug:
-            logging.debug ('')
-            logging.debug ('self.job:')
-            logging.debug (self.job)
-            logging.debug (f'self.phase.lower(): {self.phase.lower():s}')
-            logging.debug (f'self.resulturl: {self.resulturl:s}')
+            _log.debug ('\nself.job:' \
+                '\n%s' \
+                '\nself._phase_lc: %s' \
+                '\nself.resulturl: %s', \
+                self.job, self._phase_lc, self.resulturl)
 
         return
 #
-#} end KoaJob.__get_statusjob
+#} end KoaJob.__parse_statusjob
 #
 
 #
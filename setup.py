@@ -2,7 +2,9 @@ from setuptools import setup, find_packages
 
 extensions = []
 
-reqs = ['requests', 'xmltodict', 'bs4', 'lxml']
+reqs = ['requests', 'lxml']
+
+extras = {'async': ['aiohttp'], 'fast': ['orjson'], 'http2': ['httpx[http2]']}
 
 with open ("README.md", "r") as fh:
     long_description = fh.read()
@@ -24,6 +26,7 @@ setup(
     packages=['pykoa', 'pykoa/koa'],
     data_files=[],
     install_requires=reqs,
+    extras_require=extras,
     python_requires='>= 3.6',
     include_package_data=False
 )
@@ -0,0 +1,79 @@
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubServer:
+    """
+    StubServer is a local HTTP server for the tests: every request is
+    recorded in hits and answered by the test's reply function, called
+    with (method, path, headers, body) and returning (status, headers,
+    body).  A reply may set its own Content-Length, e.g. to break off a 
+    transfer, with 'Connection: close'.
+    """
+
+    def __init__ (self):
+
+        self.hits = []
+        self.reply = lambda method, path, headers, body: (200, {}, b'')
+
+        stub = self
+
+        class Handler (BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def log_message (self, *args):
+                pass
+
+            def _answer (self):
+
+                length = int (self.headers.get ('Content-Length', 0))
+                body = self.rfile.read (length) if length else b''
+
+                stub.hits.append ((self.command, self.path, \
+                    dict (self.headers)))
+
+                status, headers, content = stub.reply (self.command, \
+                    self.path, self.headers, body)
+
+                self.send_response (status)
+                for key, value in headers.items ():
+                    self.send_header (key, value)
+                if ('Content-Length' not in headers):
+                    self.send_header ('Content-Length', str (len (content)))
+                self.end_headers ()
+
+                if (headers.get ('Connection') == 'close'):
+                    self.close_connection = True
+
+                if (self.command != 'HEAD'):
+                    self.wfile.write (content)
+
+            do_GET = _answer
+            do_POST = _answer
+            do_HEAD = _answer
+
+        self.httpd = ThreadingHTTPServer (('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+
+        self.thread = threading.Thread (target=self.httpd.serve_forever, \
+            daemon=True)
+        self.thread.start ()
+
+
+    def close (self):
+
+        self.httpd.shutdown ()
+        self.httpd.server_close ()
+
+
+@pytest.fixture
+def stub ():
+
+    server = StubServer ()
+    yield server
+    server.close ()
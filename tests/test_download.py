@@ -0,0 +1,285 @@
+import asyncio
+import io
+import json
+import os
+
+import pytest
+
+from pykoa.koa.core import Archive
+
+
+@pytest.fixture
+def archive (stub, monkeypatch):
+
+    monkeypatch.setattr (Archive, '_session', None)
+    return (Archive (server=stub.url))
+
+#
+#    an error reply is reported with its status code
+#
+def test_submit_request_error_status (stub, archive, tmp_path):
+
+    stub.reply = lambda method, path, headers, body: \
+        (404, {'Content-Type': 'text/html'}, b'<html>not found</html>')
+
+    filepath = str (tmp_path / 'missing.fits')
+
+    with pytest.raises (Exception, match='status 404'):
+        archive._Archive__submit_request (stub.url + \
+            '/cgi-bin/getKOA/nph-getKOA?filehand=missing.fits', filepath, \
+            None)
+
+    assert not os.path.exists (filepath)
+
+
+def fits_server (files):
+    """
+    fits_server serves files[filehand], and a json error message for a
+    filehand it does not have.
+    """
+
+    def reply (method, path, headers, body):
+
+        filehand = path.split ('filehand=')[-1]
+
+        if (filehand not in files):
+            return (200, {'Content-Type': 'application/json'}, \
+                json.dumps ({'status': 'error', \
+                'msg': 'file not found'}).encode ('utf-8'))
+
+        return (200, {'Content-Type': 'application/octet-stream'}, \
+            files[filehand])
+
+    return (reply)
+
+#
+#    adownload fetches the files listed in the metadata table with aiohttp
+#    or httpx; a json error reply leaves no file behind
+#
+@pytest.mark.parametrize ('http2', [0, 1])
+def test_adownload (stub, archive, tmp_path, capsys, http2):
+
+    pytest.importorskip ('httpx' if http2 else 'aiohttp')
+
+    files = {'/koadata/HI.1.fits': b'\x01' * 3000000, \
+        '/koadata/HI.2.fits': b'\x02' * 10}
+    stub.reply = fits_server (files)
+
+    metapath = str (tmp_path / 'meta.csv')
+    with open (metapath, 'w') as fp:
+        fp.write ('koaid,instrume,filehand\n')
+        for n in (1, 2, 3):
+            fp.write ('HI.%d.fits,HIRES,/koadata/HI.%d.fits\n' % (n, n))
+
+    outdir = str (tmp_path / 'out')
+
+    asyncio.run (archive.adownload (metapath, 'csv', outdir, \
+        server=stub.url, http2=http2))
+
+    lev0 = outdir + '/lev0'
+    
+    assert sorted (os.listdir (lev0)) == ['HI.1.fits', 'HI.2.fits']
+    
+    for n in (1, 2):
+        with open (lev0 + '/HI.%d.fits' % n, 'rb') as fp:
+            assert fp.read () == files['/koadata/HI.%d.fits' % n]
+
+    assert 'file not found' in capsys.readouterr ().out
+
+#
+#    a lev1list that cannot be opened is reported as such, with or 
+#    without debug
+#
+@pytest.mark.parametrize ('debug', [0, 1])
+def test_download_row_bad_lev1list (archive, tmp_path, debug):
+
+    from pykoa.koa.core import _PathClaims
+
+    outdir = str (tmp_path)
+    lev1list = outdir + '/HI.1.lev1list.json'
+
+    dnload = {'debug': debug, 'cookiejar': None, 'srow': 0, \
+        'lev0file': 0, 'lev1file': 1, 'calibfile': 0, \
+        'outdir_lev0': outdir, 'outdir_lev1': outdir, \
+        'outdir_calib': outdir, 'existing': {lev1list}, \
+        'claims': _PathClaims ()}
+
+    result = archive._Archive__download_row (0, 'HIRES', 'HI.1.fits', \
+        'HI.1', '/koadata/HI.1.fits', dnload)
+
+    assert ('Failed to read ' + lev1list) in result[-1]
+
+#
+#    _Http2Response.read honours the size of each call, and read () 
+#    returns the whole rest of the body
+#
+def test_http2_response_read ():
+
+    httpx = pytest.importorskip ('httpx')
+
+    from pykoa.koa.core import _Http2Response, _copy_stream
+
+    body = bytes (range (256)) * 10
+    request = httpx.Request ('GET', 'http://localhost/koadata/HI.1.fits')
+
+    response = _Http2Response (httpx.Response (200, content=body, \
+        request=request))
+    
+    assert response.url == 'http://localhost/koadata/HI.1.fits'
+    assert response.read (3) == body[:3]
+    assert response.read (300) == body[3:303]
+    assert response.read () == body[303:]
+    assert response.read (10) == b''
+
+    response = _Http2Response (httpx.Response (200, content=body, \
+        request=request))
+    
+    fd = io.BytesIO ()
+    _copy_stream (response.raw, fd)
+    
+    assert fd.getvalue () == body
+
+
+def file_server (files, etag='"v1"'):
+    """
+    file_server serves files[filehand] with an ETag, answering 304 to a
+    request made conditional on that ETag.
+    """
+
+    def reply (method, path, headers, body):
+
+        filehand = path.split ('filehand=')[-1]
+
+        if (headers.get ('If-None-Match') == etag):
+            return (304, {'ETag': etag}, b'')
+
+        return (200, {'Content-type': 'application/octet-stream', \
+            'ETag': etag}, files[filehand])
+
+    return (reply)
+
+
+def write_caliblist (path, koaids):
+
+    table = [{'koaid': koaid, 'instrument': 'HIRES', 'filehand': koaid} \
+        for koaid in koaids]
+
+    with open (path, 'w') as fp:
+        json.dump ({'table': table}, fp)
+
+#
+#    revalidate=1: a file with its '.meta' sidecar is asked for with its
+#    ETag, and the 304 is neither counted nor touches the file; a file
+#    without a sidecar is skipped; a missing file is downloaded and gets
+#    a sidecar
+#
+def test_calibfiles_revalidate (stub, archive, tmp_path):
+
+    files = {name: name.encode ('ascii') * 10 for name in \
+        ('CAL.1.fits', 'CAL.2.fits', 'CAL.3.fits')}
+
+    stub.reply = file_server (files)
+
+    outdir = str (tmp_path)
+    listpath = os.path.join (outdir, 'caliblist.json')
+    write_caliblist (listpath, list (files))
+
+    with open (outdir + '/CAL.1.fits', 'wb') as fp:
+        fp.write (b'kept')
+    with open (outdir + '/CAL.1.fits.meta', 'w') as fp:
+        json.dump ({'etag': '"v1"'}, fp)
+
+    with open (outdir + '/CAL.2.fits', 'wb') as fp:
+        fp.write (b'no sidecar')
+
+    ndnloaded = archive._Archive__download_calibfiles (listpath, None, \
+        outdir, revalidate=1)
+
+    assert ndnloaded == 1
+
+    requested = [path for method, path, headers in stub.hits]
+    assert len (requested) == 2
+    assert not any (path.endswith ('CAL.2.fits') for path in requested)
+
+    conditional = [headers for method, path, headers in stub.hits \
+        if path.endswith ('CAL.1.fits')]
+    assert conditional[0].get ('If-None-Match') == '"v1"'
+
+    with open (outdir + '/CAL.1.fits', 'rb') as fp:
+        assert fp.read () == b'kept'
+    with open (outdir + '/CAL.2.fits', 'rb') as fp:
+        assert fp.read () == b'no sidecar'
+    with open (outdir + '/CAL.3.fits', 'rb') as fp:
+        assert fp.read () == files['CAL.3.fits']
+
+    with open (outdir + '/CAL.3.fits.meta') as fp:
+        assert json.load (fp) == {'etag': '"v1"'}
+
+#
+#    without revalidate the files on disk are skipped; the sidecars are
+#    written anyway
+#
+def test_calibfiles_skip_existing (stub, archive, tmp_path):
+
+    files = {'CAL.1.fits': b'one', 'CAL.2.fits': b'two'}
+    stub.reply = file_server (files)
+
+    outdir = str (tmp_path)
+    listpath = os.path.join (outdir, 'caliblist.json')
+    write_caliblist (listpath, list (files))
+
+    with open (outdir + '/CAL.1.fits', 'wb') as fp:
+        fp.write (b'kept')
+
+    ndnloaded = archive._Archive__download_calibfiles (listpath, None, \
+        outdir)
+
+    assert ndnloaded == 1
+    assert len (stub.hits) == 1
+    assert os.path.exists (outdir + '/CAL.2.fits.meta')
+    assert not os.path.exists (outdir + '/CAL.1.fits.meta')
+
+
+#
+#    __submit_request writes to a '.part' file renamed into place once the
+#    transfer is complete; a broken-off transfer leaves neither behind
+#
+def test_submit_request_part_file (stub, archive, tmp_path):
+
+    body = b'\x03' * 1500000
+
+    def reply (method, path, headers, content):
+        if path.endswith ('broken.fits'):
+            return (200, {'Content-Type': 'application/octet-stream', \
+                'Content-Length': str (2*len (body)), \
+                'Connection': 'close'}, body)
+        return (200, {'Content-Type': 'application/octet-stream'}, body)
+
+    stub.reply = reply
+
+    outdir = str (tmp_path)
+    url = archive.getkoa_url + 'filehand='
+
+    assert archive._Archive__submit_request (url + 'whole.fits', \
+        outdir + '/whole.fits', None)
+
+    with open (outdir + '/whole.fits', 'rb') as fp:
+        assert fp.read () == body
+
+    with pytest.raises (Exception, match='Failed to save returned data'):
+        archive._Archive__submit_request (url + 'broken.fits', \
+            outdir + '/broken.fits', None)
+
+    assert sorted (os.listdir (outdir)) == ['whole.fits']
+
+#
+#    an unreadable caliblist is reported as such, with or without debug
+#
+@pytest.mark.parametrize ('debug', [0, 1])
+def test_calibfiles_bad_list (archive, tmp_path, debug):
+
+    listpath = str (tmp_path / 'missing.json')
+
+    with pytest.raises (Exception, match='Failed to read ' + listpath):
+        archive._Archive__download_calibfiles (listpath, None, \
+            str (tmp_path), debug=debug)
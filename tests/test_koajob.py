@@ -0,0 +1,153 @@
+import asyncio
+import os
+
+import pytest
+
+from pykoa.koa.core import Archive, KoaJob
+
+
+def job_doc (phase):
+
+    return (('<?xml version="1.0" encoding="UTF-8"?>'
+        '<uws:job xmlns:uws="http://www.ivoa.net/xml/UWS/v1.0" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink">'
+        '<uws:jobId>job7</uws:jobId><uws:phase>%s</uws:phase>'
+        '<uws:parameters>'
+        '<uws:parameter id="query">select koaid from koa_hires</uws:parameter>'
+        '<uws:parameter id="format">votable</uws:parameter>'
+        '</uws:parameters>'
+        '<uws:results><uws:result id="result" '
+        'xlink:href="http://localhost/result"/></uws:results>'
+        '</uws:job>' % phase).encode ('utf-8'))
+
+def aclient (http2):
+    """
+    aclient returns the httpx.AsyncClient or aiohttp.ClientSession class
+    to poll with, skipping the test when the package is missing.
+    """
+
+    if http2:
+        return (pytest.importorskip ('httpx').AsyncClient)
+
+    return (pytest.importorskip ('aiohttp').ClientSession)
+
+#
+#    the status poll is conditional on the ETag of the last document; a 
+#    304 keeps the parsed phase and document
+#
+def test_not_modified_keeps_phase (stub):
+
+    phases = ['EXECUTING', None, 'COMPLETED']
+
+    def reply (method, path, headers, body):
+
+        phase = phases[len (stub.hits) - 1]
+        
+        if (phase is None):
+            return (304, {'ETag': '"s1"'}, b'')
+        
+        return (200, {'Content-Type': 'text/xml', 'ETag': '"s1"', \
+            'Retry-After': '2'}, job_doc (phase))
+
+    stub.reply = reply
+
+    job = KoaJob (stub.url + '/TAP/async/job7')
+    
+    assert job.phase == 'EXECUTING'
+    assert job.etag == '"s1"'
+    assert job.retry_after == 2.0
+    
+    statusstruct = job.statusstruct
+
+    assert job.get_phase () == 'EXECUTING'
+    assert stub.hits[1][2].get ('If-None-Match') == '"s1"'
+    assert job.statusstruct == statusstruct
+    assert job.get_jobid () == 'job7'
+
+    assert job.get_phase () == 'COMPLETED'
+    assert job.resulturl == 'http://localhost/result'
+
+#
+#    a finished job is not polled again
+#
+    assert job.get_phase () == 'COMPLETED'
+    assert len (stub.hits) == 3
+
+#
+#    a repeated element is a list, as xmltodict returned it
+#
+def test_parameters_list (stub):
+
+    stub.reply = lambda method, path, headers, body: \
+        (200, {'Content-Type': 'text/xml'}, job_doc ('COMPLETED'))
+
+    job = KoaJob (stub.url + '/TAP/async/job7')
+
+    parameters = job.job['uws:parameters']['uws:parameter']
+
+    assert [p['@id'] for p in parameters] == ['query', 'format']
+    assert [p['#text'] for p in parameters] == \
+        ['select koaid from koa_hires', 'votable']
+
+    assert job.job['uws:jobId'] == 'job7'
+    assert job.job['uws:results']['uws:result']['@xlink:href'] == \
+        'http://localhost/result'
+    assert job.job.get ('uws:endTime', '') == ''
+
+#
+#    a 429 reply to an asyncio status poll is sent again after its
+#    Retry-After instead of being parsed as a status document
+#
+@pytest.mark.parametrize ('http2', [0, 1])
+def test_apoll_rate_limited (stub, monkeypatch, http2):
+
+    client = aclient (http2)
+
+    monkeypatch.setattr (Archive, '_session', None)
+
+    def reply (method, path, headers, body):
+        if (len (stub.hits) == 2):
+            return (429, {'Retry-After': '0.2'}, b'slow down')
+        return (200, {'Content-Type': 'text/xml'}, job_doc ('EXECUTING'))
+
+    stub.reply = reply
+
+    job = KoaJob (stub.url + '/TAP/async/job7')
+
+    async def poll ():
+        async with client () as session:
+            return (await job.aget_phase (session))
+
+    assert asyncio.run (poll ()) == 'EXECUTING'
+    assert len (stub.hits) == 3
+    assert job.status != 'error'
+
+#
+#    an error reply to the result request raises, and writes no file
+#
+@pytest.mark.parametrize ('http2', [0, 1])
+def test_aget_result_error_page (stub, tmp_path, http2):
+
+    client = aclient (http2)
+
+    def reply (method, path, headers, body):
+        if (path == '/result'):
+            return (404, {'Content-Type': 'text/html'}, b'<html>gone</html>')
+        return (200, {'Content-Type': 'text/xml'}, \
+            job_doc ('COMPLETED').replace (b'http://localhost', \
+            stub.url.encode ('ascii')))
+
+    stub.reply = reply
+
+    job = KoaJob (stub.url + '/TAP/async/job7')
+    outpath = str (tmp_path / 'result.xml')
+
+    async def fetch ():
+        async with client () as session:
+            await job.aget_result (session, outpath)
+
+    with pytest.raises (Exception, match='status 404'):
+        asyncio.run (fetch ())
+
+    assert job.status == 'error'
+    assert not os.path.exists (outpath)
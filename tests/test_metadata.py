@@ -0,0 +1,120 @@
+import pytest
+
+from astropy.table import Table
+
+from pykoa.koa.core import Archive
+
+
+NROWS = 12
+
+
+@pytest.fixture
+def metadata ():
+
+    return (Table ({ \
+        'koaid': ['HI.2020%04d.fits' % i for i in range (NROWS)], \
+        'ra': [10.0 + i for i in range (NROWS)], \
+        'instrume': ['HIRES'] * NROWS, \
+        'dec': [-5.0 - i for i in range (NROWS)], \
+        'filehand': ['/koadata/HI.2020%04d.fits' % i \
+            for i in range (NROWS)]}))
+
+
+@pytest.fixture
+def archive ():
+
+    return (Archive ())
+
+
+def write (table, path, format):
+
+    fmt = {'csv': 'ascii.csv', 'tsv': 'ascii.tab', \
+        'votable': 'votable'}[format]
+    
+    table.write (path, format=fmt, overwrite=True)
+
+    return (path)
+
+
+def columns (table):
+
+    return ({name: [str (v) for v in table[name]] for name in \
+        ('koaid', 'instrume', 'filehand')})
+
+#
+#    a row window of a csv/tsv table holds the same rows and values of the 
+#    three download columns as astropy's reader, in the file's order
+#
+@pytest.mark.parametrize ('format', ['csv', 'tsv'])
+@pytest.mark.parametrize ('srow, erow', [(0, None), (3, 7), (5, 5), \
+    (10, 40), (0, NROWS-1)])
+def test_read_delimited (archive, metadata, tmp_path, format, srow, erow):
+
+    path = write (metadata, str (tmp_path / ('meta.' + format)), format)
+
+    table = archive._Archive__read_delimited (path, format, srow, erow)
+
+    last = NROWS if (erow is None) else min (erow+1, NROWS)
+    expected = Table.read (path, format={'csv': 'ascii.csv', \
+        'tsv': 'ascii.tab'}[format])[srow:last]
+
+    assert table.colnames == ['koaid', 'instrume', 'filehand']
+    assert columns (table) == columns (expected)
+    
+    assert table.meta['row0'] == srow
+    assert table.meta['nrows'] == NROWS
+
+#
+#    __column_values counts rows from the start of the file
+#
+def test_column_values_window (archive, metadata, tmp_path):
+
+    path = write (metadata, str (tmp_path / 'meta.csv'), 'csv')
+
+    table = archive._Archive__read_delimited (path, 'csv', 4, 8)
+
+    values = archive._Archive__column_values (table, 0, 6, 8)
+
+    assert values == ['HI.2020%04d.fits' % i for i in (6, 7, 8)]
+
+#
+#    __read_votable keeps the three download columns, with the values 
+#    astropy's VOTable reader finds
+#
+def test_read_votable (archive, metadata, tmp_path):
+
+    path = write (metadata, str (tmp_path / 'meta.xml'), 'votable')
+
+    table = archive._Archive__read_votable (path)
+
+    assert table.colnames == ['koaid', 'instrume', 'filehand']
+    assert columns (table) == columns (Table.read (path, format='votable'))
+
+#
+#    __read_metadata finds the three columns of a windowed csv table and 
+#    reports the row count of the whole file
+#
+def test_read_metadata_window (archive, metadata, tmp_path):
+
+    path = write (metadata, str (tmp_path / 'meta.csv'), 'csv')
+
+    table, ind_instrume, ind_koaid, ind_filehand = \
+        archive._Archive__read_metadata (path, 'csv', start_row=2, \
+        end_row=3)
+
+    assert len (table) == 2
+    assert table.meta['nrows'] == NROWS
+    assert table.colnames[ind_koaid] == 'koaid'
+    assert table.colnames[ind_instrume] == 'instrume'
+    assert table.colnames[ind_filehand] == 'filehand'
+
+#
+#    a table without the filehand column cannot be downloaded
+#
+def test_read_metadata_missing_column (archive, metadata, tmp_path):
+
+    metadata.remove_column ('filehand')
+    path = write (metadata, str (tmp_path / 'meta.xml'), 'votable')
+
+    with pytest.raises (Exception, match='filehand'):
+        archive._Archive__read_metadata (path, 'votable')
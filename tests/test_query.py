@@ -0,0 +1,32 @@
+import logging
+
+import pytest
+
+from pykoa.koa.core import Archive
+
+
+@pytest.fixture
+def archive2 (stub, monkeypatch):
+
+    pytest.importorskip ('httpx')
+
+    monkeypatch.setattr (Archive, '_session', None)
+    monkeypatch.setattr (Archive, '_http2_session', None)
+    
+    return (Archive (server=stub.url, http2=1))
+
+#
+#    with http2=1 and debug on, __make_query logs the url of the reply
+#    and returns its text
+#
+def test_make_query_http2_debug (stub, archive2, caplog):
+
+    stub.reply = lambda method, path, headers, body: \
+        (200, {'Content-Type': 'text/plain'}, b'koaid\nHI.1.fits\n')
+
+    with caplog.at_level (logging.DEBUG):
+        text = archive2._Archive__make_query (archive2.makequery_url, \
+            {'instrument': 'hires'}, debug=1)
+
+    assert text == 'koaid\nHI.1.fits\n'
+    assert 'instrument=hires' in caplog.text
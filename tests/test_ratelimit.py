@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from pykoa.koa.core import _RateLimiter
+
+#
+#    a server that sends no rate-limit headers is never paced
+#
+def test_no_headers ():
+
+    limiter = _RateLimiter ()
+    limiter.update (200, {})
+
+    assert all (limiter._reserve () == 0.0 for i in range (100))
+
+#
+#    X-RateLimit-Remaining tokens are taken one per request; once they 
+#    are used up the next request waits for X-RateLimit-Reset
+#
+def test_tokens_and_reset ():
+
+    limiter = _RateLimiter ()
+    limiter.update (200, {'X-RateLimit-Remaining': '2', \
+        'X-RateLimit-Reset': '5'})
+
+    assert limiter._reserve () == 0.0
+    assert limiter._reserve () == 0.0
+
+    wait = limiter._reserve ()
+    assert 4.0 < wait <= 5.0
+
+#
+#    the wait is not lost: asking again before the reset gives the rest
+#
+    assert 0.0 < limiter._reserve () <= wait
+
+#
+#    no tokens left and no reset given: back off, doubling from a second
+#
+def test_tokens_without_reset ():
+
+    limiter = _RateLimiter ()
+    limiter.update (200, {'X-RateLimit-Remaining': '0'})
+
+    assert limiter._reserve () == pytest.approx (1.0, abs=0.05)
+    assert limiter._backoff == 2.0
+
+#
+#    a 429/503 waits for its Retry-After
+#
+@pytest.mark.parametrize ('status', [429, 503])
+def test_retry_after (status):
+
+    limiter = _RateLimiter ()
+    limiter.update (status, {'Retry-After': '3'})
+
+    assert limiter._reserve () == pytest.approx (3.0, abs=0.05)
+
+#
+#    a 429 without Retry-After backs off, doubling up to a minute, until
+#    a successful reply resets the backoff
+#
+def test_backoff ():
+
+    limiter = _RateLimiter ()
+
+    waits = []
+    for i in range (8):
+        limiter._resume = 0.0
+        limiter.update (429, {})
+        waits.append (limiter._resume - time.monotonic ())
+
+    assert waits[:3] == pytest.approx ([1.0, 2.0, 4.0], abs=0.05)
+    assert waits[-1] == pytest.approx (60.0, abs=0.05)
+
+    limiter.update (200, {})
+    assert limiter._backoff == 1.0
+
+#
+#    a later, shorter Retry-After does not cut an earlier wait short
+#
+def test_longest_wait_kept ():
+
+    limiter = _RateLimiter ()
+    limiter.update (429, {'Retry-After': '10'})
+    limiter.update (429, {'Retry-After': '1'})
+
+    assert limiter._reserve () > 9.0
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from pykoa.koa.core import Archive
+
+
+@pytest.fixture
+def session (monkeypatch):
+
+    monkeypatch.setattr (Archive, '_session', None)
+    return (Archive._get_session ())
+
+#
+#    a 429 reply is not retried inside the adapter: the limiter sees each
+#    one, waits for the Retry-After, and the last reply is returned
+#    instead of a RetryError
+#
+def test_429_reaches_the_limiter (stub, session):
+
+    stub.reply = lambda method, path, headers, body: \
+        (429, {'Retry-After': '0.1'}, b'slow down')
+
+    start = time.monotonic ()
+    response = session.get (stub.url + '/tap')
+    elapsed = time.monotonic () - start
+
+    assert response.status_code == 429
+    assert len (stub.hits) == 4
+    assert elapsed >= 0.3
+    assert session.limiter._resume > 0.0
+
+#
+#    a rate-limited request is sent again once the limiter lets it go
+#
+def test_429_then_ok (stub, session):
+
+    def reply (method, path, headers, body):
+        if (len (stub.hits) == 1):
+            return (429, {'Retry-After': '0.2'}, b'')
+        return (200, {'Content-Type': 'text/plain'}, b'ok')
+
+    stub.reply = reply
+
+    start = time.monotonic ()
+    response = session.get (stub.url + '/tap')
+
+    assert response.status_code == 200
+    assert response.text == 'ok'
+    assert len (stub.hits) == 2
+    assert time.monotonic () - start >= 0.2
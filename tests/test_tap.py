@@ -0,0 +1,102 @@
+import io
+import json
+
+from astropy.table import Table
+
+from pykoa.koa.core import KoaTap
+
+
+def votable_bytes (table):
+
+    fp = io.BytesIO ()
+    table.write (fp, format='votable')
+    return (fp.getvalue ())
+
+
+def job_doc (url, phase):
+
+    return (('<?xml version="1.0" encoding="UTF-8"?>'
+        '<uws:job xmlns:uws="http://www.ivoa.net/xml/UWS/v1.0" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink">'
+        '<uws:jobId>job1</uws:jobId><uws:phase>%s</uws:phase>'
+        '<uws:results><uws:result id="result" xlink:href="%s/TAP/result"/>'
+        '</uws:results></uws:job>' % (phase, url)).encode ('utf-8'))
+
+
+class TapService:
+    """
+    TapService answers the async TAP requests of a KoaTap: the job is
+    completed at once, unless error is set, in which case the query is
+    refused with a json error message.
+    """
+
+    def __init__ (self, stub, table):
+
+        self.url = stub.url
+        self.table = votable_bytes (table)
+        self.error = ''
+
+
+    def __call__ (self, method, path, headers, body):
+
+        if (method == 'POST'):
+
+            if (len (self.error) > 0):
+                return (200, {'Content-type': 'application/json'}, \
+                    json.dumps ({'status': 'error', \
+                    'msg': self.error}).encode ('utf-8'))
+
+            return (303, {'Location': self.url + '/TAP/async/job1', \
+                'Content-type': 'text/plain'}, b'')
+
+        if (path == '/TAP/async/job1'):
+            return (200, {'Content-type': 'text/xml'}, \
+                job_doc (self.url, 'COMPLETED'))
+
+        return (200, {'Content-type': 'text/xml'}, self.table)
+
+#
+#    a KoaTap reused for a second query (Archive._get_tap) must not keep
+#    the table of the first one when the second query fails
+#
+def test_failed_query_clears_previous_result (stub):
+
+    table = Table ({'koaid': ['HI.20200101.00001.fits'], 'ra': [10.5]})
+
+    service = TapService (stub, table)
+    stub.reply = service
+
+    tap = KoaTap (stub.url + '/TAP', format='votable')
+
+    tap.send_async ('select koaid, ra from koa_hires', format='votable')
+
+    assert tap.koajob is not None
+    assert list (tap.astropytbl['koaid']) == ['HI.20200101.00001.fits']
+
+    service.error = 'bad adql'
+
+    msg = tap.send_async ('select nothing from koa_hires', \
+        format='votable', propflag=1)
+
+    assert msg == 'bad adql'
+    assert tap.status == 'error'
+    assert tap.koajob is None
+    assert tap.astropytbl is None
+    assert tap.response_result is None
+
+#
+#    the query parameters of one query are not sent with the next
+#
+def test_query_parameters_not_kept (stub):
+
+    service = TapService (stub, Table ({'ra': [1.0]}))
+    stub.reply = service
+
+    tap = KoaTap (stub.url + '/TAP', format='votable')
+
+    tap.send_async ('select ra from koa_hires', format='votable', \
+        propflag=1)
+    assert 'propflag' in tap.datadict
+
+    tap.send_async ('select ra from koa_hires', format='votable')
+    assert 'propflag' not in tap.datadict